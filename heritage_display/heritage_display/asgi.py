@@ -3,6 +3,11 @@ ASGI config for heritage_display project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so the /events/ crawl progress stream runs as an
+async task instead of holding a worker thread per open tab:
+
+    uvicorn heritage_display.asgi:application --workers 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
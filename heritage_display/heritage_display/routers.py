@@ -0,0 +1,44 @@
+"""
+Database routing between the primary and an optional read replica
+
+Enabled by settings when REPLICA_DB_HOST is set. Reads of heritage sites (the
+list, detail, export and facet queries) go to the `replica` alias so a full
+crawl writing through PostgresPipeline does not slow the pages down;
+everything else reads and writes the primary:
+
+- crawl tasks, which the crawler updates continuously and the control views
+  check right before creating one (a lagging replica would allow two full
+  crawls or 404 a task just queued)
+- sessions, auth and admin
+- all writes and migrations
+
+Queries that must see the latest commit even for sites pin the primary with
+`.using(DEFAULT_DB_ALIAS)`: the incremental update API (compared against the
+Redis watermark), the Redis count seed, the page validators' updated_at and
+the facet rows cached per version. Pages rendered from the replica within
+REPLICA_LAG_SECONDS of a write are not cached (sites/page_cache.py).
+"""
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_DB = DEFAULT_DB_ALIAS
+REPLICA_DB = 'replica'
+
+REPLICA_MODELS = {('sites', 'heritagesite')}
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (model._meta.app_label, model._meta.model_name) in REPLICA_MODELS:
+            return REPLICA_DB
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DB
@@ -47,12 +47,15 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Local apps
     'sites',
 ]
 
 MIDDLEWARE = [
+    # first, so its timings cover the other middleware (sites/metrics.py)
+    'sites.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,7 +69,8 @@ ROOT_URLCONF = 'heritage_display.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for MetricsMiddleware
+        'BACKEND': 'sites.metrics.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,17 +89,37 @@ WSGI_APPLICATION = 'heritage_display.wsgi.application'
 # Database - PostgreSQL
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'heritage',
-        'USER': 'heritage_user',
-        'PASSWORD': 'heritage_password',
-        'HOST': 'localhost',
-        'PORT': '5432',
+def _database(prefix, **defaults):
+    """Connection settings from `<prefix>_NAME`, `<prefix>_HOST`, ... environment variables"""
+    return {
+        # PostgreSQL in every deployment; DB_ENGINE=django.db.backends.sqlite3 runs the test suite without it
+        'ENGINE': os.environ.get(f'{prefix}_ENGINE', defaults.get('ENGINE', 'django.db.backends.postgresql')),
+        'NAME': os.environ.get(f'{prefix}_NAME', defaults.get('NAME', 'heritage')),
+        'USER': os.environ.get(f'{prefix}_USER', defaults.get('USER', 'heritage_user')),
+        'PASSWORD': os.environ.get(f'{prefix}_PASSWORD', defaults.get('PASSWORD', 'heritage_password')),
+        'HOST': os.environ.get(f'{prefix}_HOST', defaults.get('HOST', 'localhost')),
+        'PORT': os.environ.get(f'{prefix}_PORT', defaults.get('PORT', '5432')),
+        # persistent connections, checked before reuse so a restarted server is survived
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        # set behind PgBouncer in transaction mode (named cursors need a session)
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
     }
+
+
+DATABASES = {
+    'default': _database('DB'),
 }
 
+# Optional streaming replica for page reads (heritage_display/routers.py); any
+# REPLICA_DB_* variable not set falls back to the primary's value
+if os.environ.get('REPLICA_DB_HOST'):
+    DATABASES['replica'] = _database('REPLICA_DB', **DATABASES['default'])
+    DATABASE_ROUTERS = ['heritage_display.routers.PrimaryReplicaRouter']
+# Upper bound on the replica's replay lag: pages are not cached for this long
+# after a write (sites/page_cache.py)
+REPLICA_LAG_SECONDS = int(os.environ.get('REPLICA_LAG_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -141,5 +165,79 @@ LOGOUT_REDIRECT_URL = '/'
 # Redis Configuration
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 
+# Caches: process-local memory by default; set CACHE_REDIS_URL to share them
+# between workers (e.g. redis://localhost:6379/1)
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'heritage',
+        },
+        'markdown': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'heritage',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'heritage-default',
+        },
+        'markdown': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'heritage-markdown',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+    }
+
+# Rendered site descriptions (sites/templatetags/markdown_filters.py). Keys are
+# content hashes, so entries never go stale; the timeout only drops orphans.
+MARKDOWN_CACHE_ALIAS = os.environ.get('MARKDOWN_CACHE_ALIAS', 'markdown')
+MARKDOWN_CACHE_TIMEOUT = int(os.environ.get('MARKDOWN_CACHE_TIMEOUT', str(30 * 24 * 3600)))
+
+# Full-page cache for site_list / site_detail (sites/page_cache.py). Entries are
+# retired by the write counters the crawler increments in Redis (REDIS_URL);
+# bump PAGE_CACHE_GENERATION after changing templates.
+PAGE_CACHE_ALIAS = os.environ.get('PAGE_CACHE_ALIAS', 'default')
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', '3600'))
+PAGE_CACHE_GENERATION = os.environ.get('PAGE_CACHE_GENERATION', '2')
+SITE_VERSION_KEY = 'heritage:sites:version'
+SITE_VERSION_KEY_PREFIX = 'heritage:site:version:'
+
+# Site count / latest-write watermark / deletion log shared with the crawler
+# through Redis (sites/site_state.py); keys must match heritage_pipeline settings
+SITE_COUNT_KEY = 'heritage:sites:count'
+SITE_COUNT_TTL = int(os.environ.get('SITE_COUNT_TTL', '3600'))
+SITE_WATERMARK_KEY = 'heritage:sites:watermark'
+SITE_DELETIONS_KEY = 'heritage:sites:deleted'
+SITE_DELETIONS_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Redis pub/sub channel the crawler publishes task/site events to; streamed to
+# browsers by /events/ (sites/views/event_views.py)
+CRAWL_EVENTS_CHANNEL = os.environ.get('CRAWL_EVENTS_CHANNEL', 'heritage:crawl_events')
+
+# Site list: seconds a (filtered) total count is reused before COUNT(*) runs again
+SITE_COUNT_CACHE_SECONDS = int(os.environ.get('SITE_COUNT_CACHE_SECONDS', '60'))
+
+# Sidebar facet counts (sites/facets.py): the crawler refreshes the
+# heritage_site_facets materialized view on task completion and increments
+# FACETS_VERSION_KEY (must match heritage_pipeline settings)
+FACETS_VERSION_KEY = 'heritage:facets:version'
+FACETS_CACHE_SECONDS = int(os.environ.get('FACETS_CACHE_SECONDS', '3600'))
+
+# Request metrics (sites/metrics.py): per-view latency, queries, template time
+# and cache hit rates, summed across workers in Redis and shown to staff at
+# /metrics/. Requests slower than METRICS_SLOW_REQUEST_MS (0 = off) are
+# logged with their slowest SQL.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', '1000'))
+METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', '10'))
+METRICS_KEY_PREFIX = 'heritage:metrics:'
+
 # Crawler Configuration
 CRAWLER_START_URL = os.environ.get('CRAWLER_START_URL', 'https://whc.unesco.org/en/list/')
@@ -0,0 +1,107 @@
+"""
+Sidebar facet counts from the heritage_site_facets materialized view
+
+The view (migration 0005) holds one row per country x category. The crawler
+refreshes it when a crawl task completes and increments FACETS_VERSION_KEY in
+Redis, so the few hundred rows are read once per refresh and then served from
+the cache; list requests never run a GROUP BY.
+
+Counts are disjunctive: each country shows how many sites it would add under
+the selected categories, and vice versa. The free-text search is not
+reflected in the counts.
+"""
+import logging
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections
+
+from .metrics import record_cache
+from .site_state import get_redis
+
+logger = logging.getLogger(__name__)
+
+FACETS_VIEW = 'heritage_site_facets'
+
+
+def facets_version():
+    try:
+        value = get_redis().get(settings.FACETS_VERSION_KEY)
+    except redis.RedisError:
+        return 'local'
+    return value.decode() if value else '0'
+
+
+def _load_rows():
+    try:
+        # the primary: a lagging replica would be cached under the new version
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'SELECT country, category, site_count FROM {FACETS_VIEW}')
+            return [tuple(row) for row in cursor.fetchall()]
+    except DatabaseError as e:
+        logger.error(f"Facet counts unavailable (has migration 0005 run?): {e}")
+        return None
+
+
+def refresh_facets():
+    """Recompute the view and retire cached counts (`manage.py refresh_facets`)"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {FACETS_VIEW}')
+    try:
+        client = get_redis()
+        client.incr(settings.FACETS_VERSION_KEY)
+        # list pages embed the counts
+        client.incr(settings.SITE_VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Refreshed facets are cached until FACETS_CACHE_SECONDS, Redis unavailable: {e}")
+
+
+class Facets:
+    """Country x category site counts"""
+
+    def __init__(self, rows):
+        self.counts = defaultdict(dict)
+        for country, category, count in rows:
+            self.counts[country][category] = count
+
+    @classmethod
+    def load(cls):
+        key = f'facets:{facets_version()}'
+        rows = cache.get(key)
+        record_cache('facets', rows is not None)
+        if rows is None:
+            rows = _load_rows()
+            if rows is None:
+                return cls([])
+            cache.set(key, rows, settings.FACETS_CACHE_SECONDS)
+        return cls(rows)
+
+    def total(self, countries=(), categories=()):
+        """Number of sites matching the selected countries and categories"""
+        return sum(
+            count
+            for country, by_category in self.counts.items() if not countries or country in countries
+            for category, count in by_category.items() if not categories or category in categories
+        )
+
+    def options(self, countries=(), categories=()):
+        """`{'countries': [...], 'categories': [...]}` of `{value, count, selected}` for the sidebar"""
+        country_counts = defaultdict(int)
+        category_counts = defaultdict(int)
+        for country, by_category in self.counts.items():
+            for category, count in by_category.items():
+                if not categories or category in categories:
+                    country_counts[country] += count
+                if not countries or country in countries:
+                    category_counts[category] += count
+
+        def entries(counts, selected):
+            values = sorted(v for v in set(counts) | set(selected) if v and (counts.get(v) or v in selected))
+            return [{'value': v, 'count': counts.get(v, 0), 'selected': v in selected} for v in values]
+
+        return {
+            'countries': entries(country_counts, set(countries)),
+            'categories': entries(category_counts, set(categories)),
+        }
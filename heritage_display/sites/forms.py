@@ -1,33 +1,35 @@
 from django import forms
 
+CATEGORY_LABELS = {
+    'Cultural': 'Cultural Heritage',
+    'Natural': 'Natural Heritage',
+    'Mixed': 'Mixed Heritage',
+}
+
+
+class FacetChoiceField(forms.MultipleChoiceField):
+    """Multi-select whose options (and counts) come from sites/facets.py
+
+    Any submitted value is accepted: the facet view may lag behind the table,
+    and an unknown value simply matches nothing.
+    """
+
+    def valid_value(self, value):
+        return True
+
+
 class HeritageSiteFilterForm(forms.Form):
     """Heritage site filter form"""
     search = forms.CharField(
         required=False,
         label='Search',
         widget=forms.TextInput(attrs={
-            'placeholder': 'Enter name or country',
+            'placeholder': 'Name, country or description (English / 中文)',
             'class': 'form-control'
         })
     )
     
-    country = forms.CharField(
-        required=False,
-        label='Country',
-        widget=forms.TextInput(attrs={
-            'placeholder': 'Country name',
-            'class': 'form-control'
-        })
-    )
+    # ?country=Kenya&country=Peru
+    country = FacetChoiceField(required=False, label='Country')
     
-    category = forms.ChoiceField(
-        required=False,
-        label='Category',
-        choices=[
-            ('', 'All'),
-            ('Cultural', 'Cultural Heritage'),
-            ('Natural', 'Natural Heritage'),
-            ('Mixed', 'Mixed Heritage'),
-        ],
-        widget=forms.Select(attrs={'class': 'form-control'})
-    )
+    category = FacetChoiceField(required=False, label='Category')
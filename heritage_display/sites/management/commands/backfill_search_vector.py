@@ -0,0 +1,24 @@
+"""
+Fill heritage_site.search_vector for rows that do not have one
+
+Migration 0006 runs this once; run it again if sites were loaded while the
+search trigger was missing (e.g. migrations applied before the first crawl):
+
+    python manage.py backfill_search_vector --batch-size 1000
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from sites.search import BACKFILL_BATCH_SIZE, backfill_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Compute missing full-text search vectors in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE,
+                            help=f'Rows per transaction (default: {BACKFILL_BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        count = backfill_search_vectors(connection, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Filled {count} search vectors'))
@@ -0,0 +1,19 @@
+"""
+Recompute the sidebar facet counts
+
+The crawler refreshes heritage_site_facets when a task completes; run this
+after loading or deleting sites by other means:
+
+    python manage.py refresh_facets
+"""
+from django.core.management.base import BaseCommand
+
+from sites.facets import FACETS_VIEW, refresh_facets
+
+
+class Command(BaseCommand):
+    help = 'Refresh the heritage_site_facets materialized view'
+
+    def handle(self, *args, **options):
+        refresh_facets()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {FACETS_VIEW}'))
@@ -0,0 +1,38 @@
+"""
+Pre-render site descriptions into the markdown cache
+
+Run after a crawl so the first site_detail view of an updated site is a cache hit:
+
+    python manage.py warm_markdown_cache --since-minutes 120
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sites.models import HeritageSite
+from sites.templatetags.markdown_filters import render_markdown_cached
+
+FIELDS = ('description_zh', 'description_en', 'content')
+
+
+class Command(BaseCommand):
+    help = 'Render and cache the Markdown fields of heritage sites'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since-minutes', type=int, default=None,
+                            help='Only sites updated in the last N minutes (default: all)')
+
+    def handle(self, *args, **options):
+        sites = HeritageSite.objects.only(*FIELDS)
+        if options['since_minutes'] is not None:
+            sites = sites.filter(updated_at__gte=timezone.now() - timedelta(minutes=options['since_minutes']))
+
+        count = 0
+        for site in sites.iterator(chunk_size=200):
+            for field in FIELDS:
+                text = getattr(site, field)
+                if text:
+                    render_markdown_cached(text)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rendered {count} sites'))
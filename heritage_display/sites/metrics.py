@@ -0,0 +1,311 @@
+"""
+Request-level performance metrics
+
+`MetricsMiddleware` records, per view (URL name):
+
+- a latency histogram (LATENCY_BUCKETS_MS) with count and total time
+- database queries and time, through `connection.execute_wrapper`
+- template render time, through the InstrumentedDjangoTemplates backend
+- hits and misses of the application caches, reported by the code that
+  reads them via `record_cache(name, hit)` (page, markdown, facets, count)
+
+Totals are kept per process and added to Redis hashes (METRICS_KEY_PREFIX) at
+most every METRICS_FLUSH_SECONDS with one pipelined call, so the cost per
+request is a few counter updates. `metrics_view` (/metrics/, staff only)
+reports the combined figures of all workers.
+
+Requests slower than METRICS_SLOW_REQUEST_MS are logged as warnings with their
+slowest SQL statements. Streaming responses (the export, the event stream) are
+timed only until the view returns, so they are reported as `<view> (stream)`
+apart from the regular pages; queries they run while streaming are not counted.
+
+The middleware runs in both sync (WSGI) and async (ASGI) stacks. Under ASGI the
+query wrappers are installed on the connections of the thread sync views run
+in, and the Redis flush runs off the event loop.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from .site_state import get_redis
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# SQL kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 10
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Figures for the request being served"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.template_ms = 0.0
+        self.queries = []
+
+    def record_query(self, sql, ms):
+        self.query_count += 1
+        self.query_ms += ms
+        self.queries.append((ms, sql))
+        if len(self.queries) > MAX_LOGGED_QUERIES * 2:
+            self.queries = sorted(self.queries, reverse=True)[:MAX_LOGGED_QUERIES]
+
+    def slowest_queries(self):
+        return sorted(self.queries, reverse=True)[:MAX_LOGGED_QUERIES]
+
+
+class _Totals:
+    """Per-process counters not yet flushed to Redis"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(float)
+        self.caches = defaultdict(int)
+        self.flushed_at = time.monotonic()
+
+    def add_request(self, view, total_ms, metrics):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, total_ms)
+        le = LATENCY_BUCKETS_MS[bucket] if bucket < len(LATENCY_BUCKETS_MS) else 'inf'
+        with self.lock:
+            self.views[f'{view}|count'] += 1
+            self.views[f'{view}|ms'] += total_ms
+            self.views[f'{view}|queries'] += metrics.query_count
+            self.views[f'{view}|query_ms'] += metrics.query_ms
+            self.views[f'{view}|template_ms'] += metrics.template_ms
+            self.views[f'{view}|le_{le}'] += 1
+
+    def add_cache(self, name, hit):
+        with self.lock:
+            self.caches[f'{name}|{"hit" if hit else "miss"}'] += 1
+
+    def take(self):
+        with self.lock:
+            views, caches = self.views, self.caches
+            self.views, self.caches = defaultdict(float), defaultdict(int)
+            self.flushed_at = time.monotonic()
+        return views, caches
+
+    def restore(self, views, caches):
+        with self.lock:
+            for field, value in views.items():
+                self.views[field] += value
+            for field, value in caches.items():
+                self.caches[field] += value
+
+    def due(self):
+        return time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_SECONDS
+
+    def flush(self, force=False):
+        """Add the counters to Redis; True on success (they are kept for the next try otherwise)"""
+        if not force and not self.due():
+            return True
+        views, caches = self.take()
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for field, value in views.items():
+                pipe.hincrbyfloat(f'{settings.METRICS_KEY_PREFIX}views', field, value)
+            for field, value in caches.items():
+                pipe.hincrby(f'{settings.METRICS_KEY_PREFIX}caches', field, value)
+            pipe.execute()
+            return True
+        except redis.RedisError as e:
+            logger.warning(f"Metrics kept in process, Redis unavailable: {e}")
+            self.restore(views, caches)
+            return False
+
+
+_totals = _Totals()
+
+
+def record_cache(name, hit):
+    """Count a hit or miss of the cache `name`"""
+    _totals.add_cache(name, hit)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def _query_timer(metrics):
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.record_query(sql, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def _wrap_connections(stack, wrapper):
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(wrapper))
+
+
+class MetricsMiddleware:
+    """Time each request and count its queries (see module docstring)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                _wrap_connections(stack, _query_timer(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, metrics, (time.perf_counter() - start) * 1000)
+        _totals.flush()
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # connections are per thread: wrap those of the thread the sync views run in
+            await sync_to_async(_wrap_connections)(stack, _query_timer(metrics))
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        self._record(request, response, metrics, (time.perf_counter() - start) * 1000)
+        if _totals.due():
+            await sync_to_async(_totals.flush, thread_sensitive=False)()
+        return response
+
+    def _record(self, request, response, metrics, total_ms):
+        view = _view_name(request)
+        if response.streaming:
+            # time to the first byte only; kept out of the page latencies
+            view = f'{view} (stream)'
+        _totals.add_request(view, total_ms, metrics)
+        if settings.METRICS_SLOW_REQUEST_MS and total_ms >= settings.METRICS_SLOW_REQUEST_MS:
+            logger.warning(
+                f"Slow request {request.method} {request.get_full_path()} ({view}): {total_ms:.0f}ms, "
+                f"{metrics.query_count} queries in {metrics.query_ms:.0f}ms, templates {metrics.template_ms:.0f}ms"
+                + ''.join(f"\n  {ms:.1f}ms  {sql}" for ms, sql in metrics.slowest_queries())
+            )
+
+
+class _InstrumentedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_ms += (time.perf_counter() - start) * 1000
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend that adds top-level render time to the request metrics"""
+
+    def from_string(self, template_code):
+        return _InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _InstrumentedTemplate(super().get_template(template_name))
+
+
+def _percentile(buckets, count, fraction):
+    """Upper bound (ms) of the bucket holding the `fraction` percentile"""
+    seen = 0
+    for le in LATENCY_BUCKETS_MS + ('inf',):
+        seen += buckets.get(str(le), 0)
+        if seen >= count * fraction:
+            return le
+    return 'inf'
+
+
+def snapshot():
+    """Combined metrics of all processes (this process only without Redis)"""
+    views = caches = None
+    if _totals.flush(force=True):
+        try:
+            client = get_redis()
+            views = {k.decode(): float(v) for k, v in client.hgetall(f'{settings.METRICS_KEY_PREFIX}views').items()}
+            caches = {k.decode(): int(v) for k, v in client.hgetall(f'{settings.METRICS_KEY_PREFIX}caches').items()}
+            source = 'redis'
+        except redis.RedisError as e:
+            logger.warning(f"Metrics of this process only, Redis unavailable: {e}")
+    if views is None:
+        with _totals.lock:
+            views, caches = dict(_totals.views), dict(_totals.caches)
+        source = 'process'
+
+    by_view = defaultdict(dict)
+    for field, value in views.items():
+        view, name = field.rsplit('|', 1)
+        by_view[view][name] = value
+
+    report = {}
+    for view, values in sorted(by_view.items()):
+        count = values.get('count', 0)
+        if not count:
+            continue
+        buckets = {str(le): int(values[f'le_{le}']) for le in LATENCY_BUCKETS_MS + ('inf',) if f'le_{le}' in values}
+        report[view] = {
+            'requests': int(count),
+            'mean_ms': round(values.get('ms', 0) / count, 1),
+            'p50_ms': _percentile(buckets, count, 0.5),
+            'p95_ms': _percentile(buckets, count, 0.95),
+            'p99_ms': _percentile(buckets, count, 0.99),
+            'queries_per_request': round(values.get('queries', 0) / count, 1),
+            'query_ms_per_request': round(values.get('query_ms', 0) / count, 1),
+            'template_ms_per_request': round(values.get('template_ms', 0) / count, 1),
+            'histogram_ms': buckets,
+        }
+
+    cache_report = {}
+    for field, value in caches.items():
+        name, outcome = field.rsplit('|', 1)
+        cache_report.setdefault(name, {'hit': 0, 'miss': 0})[outcome] = value
+    for stats in cache_report.values():
+        lookups = stats['hit'] + stats['miss']
+        stats['hit_rate'] = round(stats['hit'] / lookups, 3) if lookups else None
+
+    return {'source': source, 'views': report, 'caches': cache_report}
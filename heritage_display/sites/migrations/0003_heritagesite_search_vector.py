@@ -0,0 +1,94 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+from ._site_table import site_table_ready
+
+# heritage_site is owned by the crawler (heritage_pipeline), so the model is
+# unmanaged and the column, trigger and indexes are added with raw SQL. Rows
+# that exist already are filled in batches by migration 0006.
+FORWARD_SQL = r"""
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE heritage_site ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+-- Chinese text has no spaces: index every CJK character and bigram as a word
+CREATE OR REPLACE FUNCTION heritage_cjk_grams(t text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $fn$
+    SELECT coalesce(string_agg(gram, ' '), '')
+    FROM regexp_matches(coalesce(t, ''), '[㐀-䶿一-鿿豈-﫿]+', 'g') AS m(run),
+    LATERAL (
+        SELECT substr(m.run[1], i, 1) FROM generate_series(1, length(m.run[1])) AS i
+        UNION ALL
+        SELECT substr(m.run[1], i, 2) FROM generate_series(1, length(m.run[1]) - 1) AS i
+    ) AS grams(gram)
+$fn$;
+
+CREATE OR REPLACE FUNCTION heritage_site_search_vector(name text, country text, description_en text,
+                                                       description_zh text) RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $fn$
+    SELECT setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+           setweight(to_tsvector('simple', coalesce(country, '')), 'B') ||
+           setweight(to_tsvector('english', coalesce(description_en, '')), 'C') ||
+           setweight(to_tsvector('simple', heritage_cjk_grams(description_zh)), 'C')
+$fn$;
+
+CREATE OR REPLACE FUNCTION heritage_site_search_vector_update() RETURNS trigger
+LANGUAGE plpgsql AS $fn$
+BEGIN
+    NEW.search_vector := heritage_site_search_vector(NEW.name, NEW.country, NEW.description_en, NEW.description_zh);
+    RETURN NEW;
+END
+$fn$;
+
+DROP TRIGGER IF EXISTS heritage_site_search_vector_trigger ON heritage_site;
+CREATE TRIGGER heritage_site_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, country, description_en, description_zh ON heritage_site
+    FOR EACH ROW EXECUTE FUNCTION heritage_site_search_vector_update();
+
+CREATE INDEX IF NOT EXISTS heritage_site_search_vector_idx ON heritage_site USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS heritage_site_name_trgm_idx ON heritage_site USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS heritage_site_country_trgm_idx ON heritage_site USING gin (country gin_trgm_ops);
+"""
+
+REVERSE_SQL = """
+DROP INDEX IF EXISTS heritage_site_country_trgm_idx;
+DROP INDEX IF EXISTS heritage_site_name_trgm_idx;
+DROP INDEX IF EXISTS heritage_site_search_vector_idx;
+DROP TRIGGER IF EXISTS heritage_site_search_vector_trigger ON heritage_site;
+DROP FUNCTION IF EXISTS heritage_site_search_vector_update();
+DROP FUNCTION IF EXISTS heritage_site_search_vector(text, text, text, text);
+DROP FUNCTION IF EXISTS heritage_cjk_grams(text);
+ALTER TABLE heritage_site DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def forwards(apps, schema_editor):
+    if site_table_ready(schema_editor):
+        schema_editor.execute(FORWARD_SQL)
+
+
+def backwards(apps, schema_editor):
+    if site_table_ready(schema_editor, create=False):
+        schema_editor.execute(REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sites', '0002_crawltask_current_item_progress'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='heritagesite',
+                    name='search_vector',
+                    field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(forwards, backwards),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from ._site_table import site_table_ready
+
+
+def forwards(apps, schema_editor):
+    if site_table_ready(schema_editor):
+        schema_editor.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS heritage_site_updated_id_idx '
+                              'ON heritage_site (updated_at DESC, id DESC);')
+
+
+def backwards(apps, schema_editor):
+    if site_table_ready(schema_editor, create=False):
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS heritage_site_updated_id_idx;')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sites', '0003_heritagesite_search_vector'),
+    ]
+
+    operations = [
+        # keyset pagination order, see sites/pagination.py
+        migrations.RunPython(forwards, backwards),
+    ]
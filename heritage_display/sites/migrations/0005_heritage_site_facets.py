@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from ._site_table import site_table_ready
+
+# Site counts per country x category for the sidebar facets (sites/facets.py).
+# Refreshed by the crawler when a crawl task completes and by
+# `manage.py refresh_facets`; the unique index allows REFRESH ... CONCURRENTLY.
+FORWARD_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS heritage_site_facets AS
+    SELECT coalesce(country, '') AS country,
+           coalesce(category, '') AS category,
+           count(*) AS site_count
+    FROM heritage_site
+    GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS heritage_site_facets_key ON heritage_site_facets (country, category);
+"""
+
+REVERSE_SQL = "DROP MATERIALIZED VIEW IF EXISTS heritage_site_facets;"
+
+
+def forwards(apps, schema_editor):
+    if site_table_ready(schema_editor):
+        schema_editor.execute(FORWARD_SQL)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sites', '0004_heritage_site_updated_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from ._site_table import site_table_ready
+
+
+def forwards(apps, schema_editor):
+    if site_table_ready(schema_editor):
+        from sites.search import backfill_search_vectors
+        backfill_search_vectors(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # one transaction per batch instead of one long lock on every row
+    atomic = False
+
+    dependencies = [
+        ('sites', '0005_heritage_site_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
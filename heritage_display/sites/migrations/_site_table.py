@@ -0,0 +1,41 @@
+"""
+Guards for migrations that alter the crawler-owned heritage_site table
+
+The table belongs to heritage_pipeline (SQLAlchemy `create_all`); these
+migrations add search, index and facet objects on top of it, which need
+PostgreSQL and are skipped on any other backend. When `migrate` runs before
+the first crawl the table is created here with the crawler's schema, so the
+migrations are never recorded as applied without their objects;
+`create_all` leaves an existing table alone.
+"""
+
+# mirrors heritage_pipeline/heritage_pipeline/models.py HeritageSiteModel
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS heritage_site (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    country VARCHAR(100),
+    description_en TEXT,
+    description_zh TEXT,
+    content TEXT,
+    category VARCHAR(50),
+    metadata JSONB,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_heritage_country ON heritage_site (country);
+CREATE INDEX IF NOT EXISTS idx_heritage_category ON heritage_site (category);
+"""
+
+
+def site_table_ready(schema_editor, create=True):
+    """True on PostgreSQL once heritage_site exists, creating it unless `create` is False (reverse)"""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return False
+    if 'heritage_site' in connection.introspection.table_names():
+        return True
+    if create:
+        schema_editor.execute(CREATE_SQL)
+    return create
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class HeritageSite(models.Model):
@@ -9,8 +10,11 @@ class HeritageSite(models.Model):
     content = models.TextField(verbose_name='详细内容')
     category = models.CharField(max_length=50, verbose_name='类型')
     metadata = models.JSONField(default=dict, verbose_name='元数据')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 爬虫表中可为空 (见 sites/pagination.py)
+    created_at = models.DateTimeField(auto_now_add=True, null=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, null=True, verbose_name='更新时间')
+    # 由数据库触发器维护 (migration 0003), 见 sites/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         db_table = 'heritage_site'
@@ -0,0 +1,149 @@
+"""
+Conditional GET and full-page caching for the public site pages
+
+Two layers, outermost first:
+
+- `conditional_page`: ETag / Last-Modified from heritage_site.updated_at and
+  the Redis write counters below, so a revalidating browser or crawler gets a
+  304 after one indexed lookup. The counters catch what updated_at cannot: a
+  deleted site or refreshed facet counts.
+- `cached_page`: rendered responses kept in the PAGE_CACHE_ALIAS cache under
+  a key that includes a Redis version counter. The crawler's PostgresPipeline
+  increments SITE_VERSION_KEY on every write and the per-site key
+  `SITE_VERSION_KEY_PREFIX<id>` for the site it wrote, which retires the
+  affected entries without deleting anything. Without Redis pages are simply
+  not cached.
+
+Pages must not contain per-user markup to be cached; the CSRF token is read
+from the cookie by crawl_control.js for that reason.
+
+With a read replica (heritage_display/routers.py) a page rendered right after a
+write may come from a replica that has not replayed it yet, while the counter
+already names the new version. For REPLICA_LAG_SECONDS after this process
+first sees a version, pages are therefore neither cached nor given validators;
+updated_at for the validators is read from the primary.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, router
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .facets import facets_version
+from .metrics import record_cache
+from .models import HeritageSite
+from .site_state import get_redis
+
+logger = logging.getLogger(__name__)
+
+def site_key(pk):
+    return f'{settings.SITE_VERSION_KEY_PREFIX}{pk}'
+
+
+def data_version(pk=None):
+    """Write counter for all sites, or for site `pk`; None if Redis is unreachable"""
+    try:
+        value = get_redis().get(site_key(pk) if pk is not None else settings.SITE_VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Page cache disabled, Redis unavailable: {e}")
+        return None
+    return value.decode() if value else '0'
+
+
+def replica_settled(pk, version):
+    """False while a page built from the replica may predate write counter `version`"""
+    if router.db_for_read(HeritageSite) == DEFAULT_DB_ALIAS:
+        return True
+    if version is None:
+        # no counter to date the replica's data against
+        return False
+    cache = caches[settings.PAGE_CACHE_ALIAS]
+    key = f'page:seen:{pk if pk is not None else "all"}:{version}'
+    now = time.time()
+    # first sighting in this cache, never earlier than the write that set the counter
+    cache.add(key, now, settings.PAGE_CACHE_TIMEOUT)
+    return now - cache.get(key, now) >= settings.REPLICA_LAG_SECONDS
+
+
+def _last_modified(pk=None):
+    """updated_at of site `pk`, or the newest updated_at of any site (from the primary)"""
+    sites = HeritageSite.objects.using(DEFAULT_DB_ALIAS)
+    if pk is not None:
+        return sites.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return sites.aggregate(latest=Max('updated_at'))['latest']
+
+
+def conditional_page(view):
+    """Answer If-None-Match / If-Modified-Since from updated_at before running `view`
+
+    The ETag covers the full URL, so each filter/page combination revalidates on
+    its own; list pages change whenever any site does. Without Redis the write
+    counters are unknown: only the ETag is offered then, since If-Modified-Since
+    alone would keep answering 304 across a deletion.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        pk = kwargs.get('pk')
+        version = data_version(pk)
+        if not replica_settled(pk, version):
+            return view(request, *args, **kwargs)
+        updated_at = _last_modified(pk)
+        if updated_at is None:
+            return view(request, *args, **kwargs)
+
+        # list pages embed the facet counts
+        versions = f'{version}|{facets_version()}' if pk is None and version is not None else version
+        raw = f'{settings.PAGE_CACHE_GENERATION}|{request.get_full_path()}|{updated_at.isoformat()}|{versions}'
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        last_modified = int(updated_at.timestamp()) if version is not None else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.headers.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+        return response
+    return wrapper
+
+
+def cached_page(per_site=False):
+    """Cache the rendered GET response, keyed by URL and the site (or global) write counter"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            pk = kwargs.get('pk') if per_site else None
+            version = data_version(pk)
+            if version is None:
+                return view(request, *args, **kwargs)
+
+            cache = caches[settings.PAGE_CACHE_ALIAS]
+            url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'page:{settings.PAGE_CACHE_GENERATION}:{url}:{version}'
+            response = cache.get(key)
+            record_cache('page', response is not None)
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies and replica_settled(pk, version):
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,191 @@
+"""
+Keyset (cursor) pagination for heritage site lists
+
+Pages are ordered by (updated_at, id) descending and addressed by the key of
+the last/first row shown (`?after=` / `?before=`) instead of an OFFSET, so
+every page is a range scan on heritage_site_updated_id_idx however deep it is.
+Nothing is counted: one extra row is fetched to know whether another page
+exists. Totals come from `cached_count`.
+
+updated_at is nullable in the crawler's table. Rows without it sort first (as
+PostgreSQL's DESC does, so the index order still applies) and their cursor has
+an empty timestamp; a page crossing from those rows to the dated ones, or
+back, is read with a second range scan.
+
+Ranked search results cannot be keyed on (updated_at, id); `paginate_offset`
+pages them by number, capped at SEARCH_MAX_PAGES.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+
+from .metrics import record_cache
+from .site_state import site_total
+
+PAGE_SIZE = 20
+SEARCH_MAX_PAGES = 10
+
+# query parameters owned by the paginator; everything else is kept in page links
+PAGE_PARAMS = ('after', 'before', 'page')
+
+# list order; NULLS FIRST spelled out so SQLite sorts like PostgreSQL
+LIST_ORDER = (F('updated_at').desc(nulls_first=True), F('id').desc())
+
+
+def encode_cursor(site):
+    updated_at = site.updated_at.isoformat() if site.updated_at else ''
+    raw = f'{updated_at}|{site.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(updated_at, id) from a cursor, updated_at None for an undated row; ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        updated_at, pk = raw.rsplit('|', 1)
+        pk = int(pk)
+        if not updated_at:
+            return None, pk
+        updated_at = parse_datetime(updated_at)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if updated_at is None:
+        raise ValueError('Invalid cursor')
+    return updated_at, pk
+
+
+def _rows_after(queryset, updated_at, pk, limit):
+    """Up to `limit` rows following the key (updated_at, pk) in list order"""
+    if updated_at is not None:
+        return list(
+            queryset.filter(updated_at__lte=updated_at)
+            .filter(Q(updated_at__lt=updated_at) | Q(id__lt=pk))
+            .order_by(*LIST_ORDER)[:limit]
+        )
+    rows = list(queryset.filter(updated_at__isnull=True, id__lt=pk).order_by('-id')[:limit])
+    if len(rows) < limit:
+        rows += queryset.filter(updated_at__isnull=False).order_by(*LIST_ORDER)[:limit - len(rows)]
+    return rows
+
+
+def _rows_before(queryset, updated_at, pk, limit):
+    """Up to `limit` rows preceding the key (updated_at, pk), nearest first"""
+    if updated_at is None:
+        return list(queryset.filter(updated_at__isnull=True, id__gt=pk).order_by('id')[:limit])
+    rows = list(
+        queryset.filter(updated_at__gte=updated_at)
+        .filter(Q(updated_at__gt=updated_at) | Q(id__gt=pk))
+        .order_by('updated_at', 'id')[:limit]
+    )
+    if len(rows) < limit:
+        rows += queryset.filter(updated_at__isnull=True).order_by('id')[:limit - len(rows)]
+    return rows
+
+
+class ListPage:
+    """One page of sites plus links to its neighbours
+
+    `next_query` / `previous_query` / `first_query` are ready-made query
+    strings (current filters included), or None when there is no such page.
+    """
+
+    def __init__(self, object_list, next_params=None, previous_params=None, params=None, label=''):
+        self.object_list = object_list
+        self.label = label
+        self._params = params
+        self.next_params = next_params
+        self.previous_params = previous_params
+        self.next_query = self._query(next_params)
+        self.previous_query = self._query(previous_params)
+        self.first_query = self._query({}) if previous_params is not None else None
+
+    def _query(self, page_params):
+        if page_params is None:
+            return None
+        query = self._params.copy() if self._params is not None else QueryDict(mutable=True)
+        for key in PAGE_PARAMS:
+            query.pop(key, None)
+        query.update(page_params)
+        return query.urlencode()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_params is not None
+
+    def has_previous(self):
+        return self.previous_params is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_keyset(queryset, after=None, before=None, per_page=PAGE_SIZE, params=None):
+    """The page after cursor `after`, before cursor `before`, or the first page
+
+    Raises ValueError for a malformed cursor.
+    """
+    if before:
+        rows = _rows_before(queryset, *decode_cursor(before), per_page + 1)
+        more_before = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = bool(rows)
+        has_previous = more_before
+    else:
+        if after:
+            rows = _rows_after(queryset, *decode_cursor(after), per_page + 1)
+        else:
+            rows = list(queryset.order_by(*LIST_ORDER)[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = bool(after) and bool(rows)
+
+    return ListPage(
+        rows,
+        next_params={'after': encode_cursor(rows[-1])} if has_next else None,
+        previous_params={'before': encode_cursor(rows[0])} if has_previous else None,
+        params=params,
+    )
+
+
+def paginate_offset(queryset, page=1, per_page=PAGE_SIZE, max_pages=SEARCH_MAX_PAGES, params=None):
+    """Numbered pages for ranked querysets, without a COUNT"""
+    try:
+        page = min(max(int(page), 1), max_pages)
+    except (TypeError, ValueError):
+        page = 1
+    start = (page - 1) * per_page
+    rows = list(queryset[start:start + per_page + 1])
+    has_next = len(rows) > per_page and page < max_pages
+    return ListPage(
+        rows[:per_page],
+        next_params={'page': page + 1} if has_next else None,
+        previous_params={'page': page - 1} if page > 1 else None,
+        params=params,
+        label=f'Page {page}',
+    )
+
+
+def cached_count(queryset, filters):
+    """COUNT(*) of `queryset`, cached per filter combination for SITE_COUNT_CACHE_SECONDS
+
+    The unfiltered total is the crawler-maintained Redis count instead.
+    """
+    if not filters:
+        return site_total()
+    key = 'sites:count:' + hashlib.md5(repr(sorted(filters.items())).encode()).hexdigest()
+    count = cache.get(key)
+    record_cache('count', count is not None)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.SITE_COUNT_CACHE_SECONDS)
+    return count
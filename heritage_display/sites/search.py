@@ -0,0 +1,96 @@
+"""
+Full-text search over heritage sites
+
+`heritage_site.search_vector` is kept up to date by a trigger (migration 0003)
+and indexed with GIN, alongside pg_trgm indexes on name and country:
+
+- name (weight A) and description_en (C) use the `english` config
+- country (B) uses `simple`
+- description_zh (C) has no word boundaries, so it is indexed as CJK
+  unigrams + bigrams under `simple` (see `heritage_cjk_grams` in SQL);
+  queries are split into bigrams the same way
+
+Results are ordered by ts_rank, then by trigram similarity so typos in
+names/countries ("Machu Pichu") still match.
+
+Rows written before the trigger existed are filled by
+`backfill_search_vectors` (migration 0006, `manage.py backfill_search_vector`).
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+BACKFILL_BATCH_SIZE = 500
+
+BACKFILL_SQL = """
+UPDATE heritage_site
+SET search_vector = heritage_site_search_vector(name, country, description_en, description_zh)
+WHERE id IN (
+    SELECT id FROM heritage_site WHERE search_vector IS NULL ORDER BY id LIMIT %s
+)
+"""
+
+# must match the character class in heritage_cjk_grams()
+CJK_RUN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+
+
+def cjk_query_terms(text):
+    """Bigrams of every CJK run in `text` (a single character stays a unigram)"""
+    terms = []
+    for run in CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def build_search_query(text):
+    """SearchQuery for the Latin and CJK parts of `text`, or None if it has neither"""
+    query = None
+    latin = CJK_RUN_RE.sub(' ', text).strip()
+    if latin:
+        # english stems name/description words, simple keeps country names as typed
+        query = (SearchQuery(latin, config='english', search_type='websearch')
+                 | SearchQuery(latin, config='simple', search_type='websearch'))
+    terms = cjk_query_terms(text)
+    if terms:
+        cjk = SearchQuery(' '.join(terms), config='simple', search_type='plain')
+        query = cjk if query is None else query | cjk
+    return query
+
+
+def search_sites(queryset, text):
+    """Filter `queryset` to sites matching `text`, best matches first"""
+    similarity = Greatest(
+        TrigramWordSimilarity(text, 'name'),
+        TrigramWordSimilarity(text, 'country'),
+    )
+    match = Q(name__trigram_word_similar=text) | Q(country__trigram_word_similar=text)
+    query = build_search_query(text)
+    if query is None:
+        return queryset.annotate(similarity=similarity).filter(match).order_by('-similarity', '-updated_at')
+
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), query),
+        similarity=similarity,
+    ).filter(match | Q(search_vector=query)).order_by('-rank', '-similarity', '-updated_at')
+
+
+def backfill_search_vectors(connection, batch_size=BACKFILL_BATCH_SIZE):
+    """Fill `search_vector` where it is NULL, one short transaction per batch; returns rows updated
+
+    A direct SET of the column (not a no-op update through the trigger) so
+    each batch rewrites only its own rows and the table stays writable.
+    """
+    total = 0
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL, [batch_size])
+            updated = cursor.rowcount
+        total += updated
+        if updated < batch_size:
+            return total
@@ -0,0 +1,23 @@
+"""
+Keep the Redis site state (sites/site_state.py) in step with deletions made
+through Django (admin, shell, management commands). The crawler never deletes.
+"""
+import logging
+
+import redis
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import HeritageSite
+from .site_state import record_deletion
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=HeritageSite)
+def site_deleted(sender, instance, **kwargs):
+    try:
+        record_deletion(instance.pk, timezone.now())
+    except redis.RedisError as e:
+        logger.warning(f"Could not record deletion of site {instance.pk}: {e}")
@@ -0,0 +1,121 @@
+"""
+Site-wide state shared with the crawler through Redis (REDIS_URL)
+
+- SITE_COUNT_KEY       total number of sites; seeded here from COUNT(*) with
+                       a TTL, incremented by PostgresPipeline on insert (only
+                       while seeded) and dropped here on delete
+- SITE_WATERMARK_KEY   updated_at of the latest write (UTC ISO 8601, always
+                       with microseconds, see `watermark_value`), set by
+                       PostgresPipeline after each commit and here on delete;
+                       both advance it only through SET_IF_GREATER
+- SITE_DELETIONS_KEY   sorted set of deleted site ids scored by deletion
+                       time, kept for SITE_DELETIONS_RETENTION_SECONDS
+- SITE_VERSION_KEY...  page cache write counters (see page_cache.py)
+
+Every reader falls back to the database when Redis is unavailable. Seeds and
+fallbacks read the primary, since the crawler's increments assume a seed that
+already includes every committed row.
+"""
+import json
+import logging
+from datetime import timedelta, timezone
+
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from .models import HeritageSite
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+# compare-and-set, the same script as PostgresPipeline's: the watermark never moves back
+SET_IF_GREATER = (
+    "local current = redis.call('get', KEYS[1]) "
+    "if not current or ARGV[1] > current then redis.call('set', KEYS[1], ARGV[1]) return 1 end "
+    "return 0"
+)
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _redis
+
+
+def watermark_value(dt):
+    """Aware datetime as the fixed-width string stored in SITE_WATERMARK_KEY"""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def site_total():
+    """Number of sites, from Redis when seeded"""
+    try:
+        value = get_redis().get(settings.SITE_COUNT_KEY)
+        if value is not None:
+            return int(value)
+    except redis.RedisError as e:
+        logger.warning(f"Site count from database, Redis unavailable: {e}")
+        return HeritageSite.objects.using(DEFAULT_DB_ALIAS).count()
+
+    total = HeritageSite.objects.using(DEFAULT_DB_ALIAS).count()
+    try:
+        # NX: an insert counted by the crawler meanwhile wins
+        get_redis().set(settings.SITE_COUNT_KEY, total, ex=settings.SITE_COUNT_TTL, nx=True)
+    except redis.RedisError:
+        pass
+    return total
+
+
+def site_watermark():
+    """updated_at of the most recent write (aware datetime), or None when there are no sites"""
+    try:
+        value = get_redis().get(settings.SITE_WATERMARK_KEY)
+        if value is not None:
+            return parse_datetime(value.decode())
+    except redis.RedisError as e:
+        logger.warning(f"Watermark from database, Redis unavailable: {e}")
+        return HeritageSite.objects.using(DEFAULT_DB_ALIAS).aggregate(latest=Max('updated_at'))['latest']
+
+    latest = HeritageSite.objects.using(DEFAULT_DB_ALIAS).aggregate(latest=Max('updated_at'))['latest']
+    if latest is not None:
+        try:
+            get_redis().eval(SET_IF_GREATER, 1, settings.SITE_WATERMARK_KEY, watermark_value(latest))
+        except redis.RedisError:
+            pass
+    return latest
+
+
+def deleted_since(since):
+    """Ids of sites deleted after `since` (within the retention window)"""
+    try:
+        members = get_redis().zrangebyscore(settings.SITE_DELETIONS_KEY, f'({since.timestamp()}', '+inf')
+    except redis.RedisError as e:
+        logger.warning(f"Deletions unavailable, Redis unavailable: {e}")
+        return []
+    return [int(m) for m in members]
+
+
+def record_deletion(pk, deleted_at):
+    """Count, watermark, deletion log and page cache bookkeeping for a deleted site"""
+    # the watermark must move forward, or clients already past it miss the deletion
+    current = site_watermark()
+    if current is not None and current >= deleted_at:
+        deleted_at = current + timedelta(microseconds=1)
+    now = deleted_at.timestamp()
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    pipe.zadd(settings.SITE_DELETIONS_KEY, {str(pk): now})
+    pipe.zremrangebyscore(settings.SITE_DELETIONS_KEY, '-inf', now - settings.SITE_DELETIONS_RETENTION_SECONDS)
+    pipe.eval(SET_IF_GREATER, 1, settings.SITE_WATERMARK_KEY, watermark_value(deleted_at))
+    # deletes are rare: recount on the next read instead of decrementing
+    pipe.delete(settings.SITE_COUNT_KEY)
+    pipe.incr(settings.SITE_VERSION_KEY)
+    pipe.incr(f'{settings.SITE_VERSION_KEY_PREFIX}{pk}')
+    pipe.execute()
+    client.publish(settings.CRAWL_EVENTS_CHANNEL,
+                   json.dumps({'type': 'site', 'action': 'deleted', 'site': {'id': pk}}))
@@ -5,11 +5,14 @@
 let currentFullTaskId = null;
 // activeSingleTasks: Array of { taskId: number, siteId: number }
 let activeSingleTasks = [];
-let pollInterval = null;
+let pollInterval = null;  // only without EventSource support
 
-// Incremental update state
-let listUpdateInterval = null;
-let lastUpdateTime = null;
+// Push channel state
+let eventSource = null;
+let eventsConnected = false;
+
+// Incremental update state (used to catch up after an event stream reconnect)
+let lastUpdateTime = new Date().toISOString();
 let displayedSiteIds = new Set();  // Track which sites are currently displayed
 
 const STORAGE_KEY = 'heritage_active_tasks';
@@ -49,8 +52,15 @@ function removeSingleTask(taskId) {
 }
 
 // --- Network Helpers ---
+function getCookie(name) {
+    const match = document.cookie.split('; ').find(row => row.startsWith(`${name}=`));
+    return match ? decodeURIComponent(match.split('=')[1]) : null;
+}
+
 function getCsrfToken() {
-    return document.querySelector('[name=csrfmiddlewaretoken]').value;
+    // The list page is served from a shared cache, so the token comes from the cookie
+    const input = document.querySelector('[name=csrfmiddlewaretoken]');
+    return getCookie('csrftoken') || (input ? input.value : '');
 }
 
 function handleFetchResponse(response) {
@@ -120,6 +130,7 @@ function updateSingleTaskUI(siteId, show, message = '', progress = 100) {
 document.addEventListener('DOMContentLoaded', function () {
     // 1. Load persisted tasks
     loadTasksFromStorage();
+    initializeDisplayedSites();
 
     // 2. Check full crawl status
     const btnFullCrawl = document.getElementById('btn-start-full-crawl');
@@ -134,12 +145,14 @@ document.addEventListener('DOMContentLoaded', function () {
                 } else {
                     toggleCrawlButtons(false);
                 }
-                // Start polling if we have ANY tasks
-                checkPolling();
+                // Sync tasks restored from storage, then follow pushed events
+                refreshTaskStatus();
+                connectEvents();
             })
             .catch(console.error);
     } else {
-        checkPolling();
+        refreshTaskStatus();
+        connectEvents();
     }
 
     // 3. Bind Full Crawl Button
@@ -157,8 +170,6 @@ document.addEventListener('DOMContentLoaded', function () {
                     currentFullTaskId = data.task_id;
                     document.getElementById('total-progress').style.display = 'block';
                     toggleCrawlButtons(true);
-                    startListUpdates();  // Start incremental list updates
-                    checkPolling();
                 })
                 .catch(err => {
                     if (err.message !== 'Session expired' && err.message !== 'Authentication required') {
@@ -192,7 +203,6 @@ document.addEventListener('DOMContentLoaded', function () {
                         document.querySelectorAll('.item-progress').forEach(el => el.style.display = 'none');
 
                         if (pollInterval) clearInterval(pollInterval);
-                        stopListUpdates();  // Stop incremental list updates
                         location.reload();
                     }
                 })
@@ -226,7 +236,6 @@ document.addEventListener('DOMContentLoaded', function () {
                     const taskId = data.task_id;
                     addSingleTask(taskId, siteId);
                     updateSingleTaskUI(siteId, true, `Task Queued (ID: ${taskId})`);
-                    checkPolling();
                 })
                 .catch(err => {
                     this.disabled = false;
@@ -239,29 +248,39 @@ document.addEventListener('DOMContentLoaded', function () {
     });
 });
 
-// --- Polling Logic ---
-function checkPolling() {
-    // If we have tasks to poll and no interval, start one
-    const hasTasks = (currentFullTaskId !== null) || (activeSingleTasks.length > 0);
-
-    if (hasTasks && !pollInterval) {
-        pollInterval = setInterval(pollTasks, 2000);
-    } else if (!hasTasks && pollInterval) {
-        clearInterval(pollInterval);
-        pollInterval = null;
+// --- Progress Events ---
+// Task progress and site changes are pushed over Server-Sent Events (/events/),
+// published to Redis by the crawler. The batch status endpoint is only asked once
+// per (re)connect to pick up anything missed while disconnected.
+function connectEvents() {
+    if (eventSource) return;
+    if (!window.EventSource) {
+        // Very old browsers: fall back to polling
+        if (!pollInterval) pollInterval = setInterval(refreshTaskStatus, 5000);
+        return;
     }
+
+    eventSource = new EventSource('/events/');
+    eventSource.addEventListener('open', () => {
+        if (eventsConnected) {
+            console.log('[Events] Reconnected, catching up');
+            refreshTaskStatus();
+            fetchAndUpdateList();
+        }
+        eventsConnected = true;
+    });
+    eventSource.addEventListener('task', e => applyTaskUpdate(JSON.parse(e.data)));
+    eventSource.addEventListener('site', e => applySiteEvent(JSON.parse(e.data)));
+    eventSource.addEventListener('tasks_stopped', () => location.reload());
 }
 
-function pollTasks() {
+function refreshTaskStatus() {
     // Collect all IDs
     const taskIds = [];
     if (currentFullTaskId) taskIds.push(currentFullTaskId);
     activeSingleTasks.forEach(t => taskIds.push(t.taskId));
 
-    if (taskIds.length === 0) {
-        checkPolling();
-        return;
-    }
+    if (taskIds.length === 0) return;
 
     fetch('/crawl/status/batch/', {
         method: 'POST',
@@ -277,58 +296,68 @@ function pollTasks() {
         })
         .then(dataMap => {
             if (!dataMap) return;
+            Object.values(dataMap).forEach(applyTaskUpdate);
+        })
+        .catch(console.error);
+}
 
-            // 1. Update Full Task
-            if (currentFullTaskId && dataMap[currentFullTaskId]) {
-                const task = dataMap[currentFullTaskId];
-                updateFullTaskUI(task);
+function applyTaskUpdate(task) {
+    // A full crawl started from another tab or by another user
+    if (currentFullTaskId === null && task.task_type === 'full' &&
+        (task.status === 'pending' || task.status === 'running')) {
+        currentFullTaskId = task.task_id;
+        document.getElementById('total-progress').style.display = 'block';
+        toggleCrawlButtons(true);
+    }
 
-                if (task.status === 'completed' || task.status === 'failed') {
-                    currentFullTaskId = null;
-                    // UI cleanup handled inside updateFullTaskUI final check or here
-                    setTimeout(() => location.reload(), 1000);
-                }
-            }
+    // 1. Update Full Task
+    if (task.task_id === currentFullTaskId) {
+        updateFullTaskUI(task);
 
-            // 2. Update Single Tasks
-            // Iterate backwards to allow removal
-            for (let i = activeSingleTasks.length - 1; i >= 0; i--) {
-                const { taskId, siteId } = activeSingleTasks[i];
-                const task = dataMap[taskId];
-
-                if (task) {
-                    // Determine UI state
-                    if (task.status === 'pending') {
-                        updateSingleTaskUI(siteId, true, '<i class="bi bi-clock"></i> Pending...');
-                    } else if (task.status === 'running') {
-                        updateSingleTaskUI(siteId, true, '<i class="bi bi-arrow-repeat spin"></i> Updating...');
-                    } else if (task.status === 'completed') {
-                        updateSingleTaskUI(siteId, true, '<i class="bi bi-check-circle text-success"></i> Done!', 100);
-                        // Remove from list
-                        removeSingleTask(taskId);
-                        // Reload specific row? No easy way, just re-enable button or reload page eventually
-                        // For now, let's refresh page after a short delay to see changes, or just leave "Done"
-                        // If we don't refresh, the data in table is stale.
-                        // Let's reload if it's just a few tasks, or just let user reload?
-                        // Better UX: reload page.
-                        setTimeout(() => location.reload(), 1000);
-                    } else if (task.status === 'failed') {
-                        updateSingleTaskUI(siteId, true, '<i class="bi bi-x-circle text-danger"></i> Failed');
-                        removeSingleTask(taskId);
-                        // Re-enable button
-                        const btn = document.querySelector(`.btn-update-single[data-site-id="${siteId}"]`);
-                        if (btn) btn.disabled = false;
-                    }
-                } else {
-                    // Task ID not returned? Maybe invalid or cleaned up?
-                    // Safety: remove it if not found after some retries?
-                    // For now, ignore.
-                }
-            }
+        if (task.status === 'completed' || task.status === 'failed') {
+            currentFullTaskId = null;
+            setTimeout(() => location.reload(), 1000);
+        }
+        return;
+    }
 
-            checkPolling();
-        })
-        .catch(console.error);
+    // 2. Update Single Tasks
+    const single = activeSingleTasks.find(t => t.taskId === task.task_id);
+    if (!single) return;
+    const { taskId, siteId } = single;
+
+    if (task.status === 'pending') {
+        updateSingleTaskUI(siteId, true, '<i class="bi bi-clock"></i> Pending...');
+    } else if (task.status === 'running') {
+        updateSingleTaskUI(siteId, true, '<i class="bi bi-arrow-repeat spin"></i> Updating...');
+    } else if (task.status === 'completed') {
+        updateSingleTaskUI(siteId, true, '<i class="bi bi-check-circle text-success"></i> Done!', 100);
+        removeSingleTask(taskId);
+        // The updated row also arrives as a 'site' event; re-enable the button
+        const btn = document.querySelector(`.btn-update-single[data-site-id="${siteId}"]`);
+        if (btn) btn.disabled = false;
+        setTimeout(() => updateSingleTaskUI(siteId, false), 2000);
+    } else if (task.status === 'failed') {
+        updateSingleTaskUI(siteId, true, '<i class="bi bi-x-circle text-danger"></i> Failed');
+        removeSingleTask(taskId);
+        // Re-enable button
+        const btn = document.querySelector(`.btn-update-single[data-site-id="${siteId}"]`);
+        if (btn) btn.disabled = false;
+    }
+}
+
+function applySiteEvent(event) {
+    if (!event.site) return;
+    if (event.action === 'deleted') {
+        removeSiteRows([event.site.id]);
+        return;
+    }
+    updateSiteRows([event.site]);
+    if (event.action === 'created') {
+        const countEl = document.querySelector('[data-total-count]');
+        const current = countEl ? parseInt(countEl.textContent, 10) : NaN;
+        if (!isNaN(current)) updateTotalCount(current + 1);
+    }
 }
 
 function updateFullTaskUI(data) {
@@ -357,28 +386,6 @@ function updateFullTaskUI(data) {
 }
 
 // --- Incremental List Update Functions ---
-function startListUpdates() {
-    if (listUpdateInterval) return;
-
-    // Initialize displayed site IDs from current table
-    initializeDisplayedSites();
-
-    // Start polling for updates every 10 seconds
-    listUpdateInterval = setInterval(() => {
-        fetchAndUpdateList();
-    }, 10000);
-
-    // Do an immediate update
-    fetchAndUpdateList();
-}
-
-function stopListUpdates() {
-    if (listUpdateInterval) {
-        clearInterval(listUpdateInterval);
-        listUpdateInterval = null;
-    }
-}
-
 function initializeDisplayedSites() {
     displayedSiteIds.clear();
     const rows = document.querySelectorAll('tbody tr[data-site-id]');
@@ -398,7 +405,7 @@ function fetchAndUpdateList() {
     
     console.log('[List Update] Fetching updates...', lastUpdateTime ? `since ${lastUpdateTime}` : 'initial');
     
-    fetch(`/sites/api/updated/?${params}`)
+    fetch(`/api/updated/?${params}`)
         .then(response => response.json())
         .then(data => {
             console.log('[List Update] Received data:', data);
@@ -406,6 +413,10 @@ function fetchAndUpdateList() {
             // Update total count
             updateTotalCount(data.total_count);
             
+            if (data.deleted_site_ids && data.deleted_site_ids.length > 0) {
+                removeSiteRows(data.deleted_site_ids, false);  // total_count already applied
+            }
+
             // Update list with new/updated sites
             if (data.updated_sites && data.updated_sites.length > 0) {
                 console.log(`[List Update] Updating ${data.updated_sites.length} sites`);
@@ -467,6 +478,18 @@ function updateSiteRows(sites) {
     });
 }
 
+function removeSiteRows(siteIds, adjustCount = true) {
+    siteIds.forEach(id => {
+        const row = document.querySelector(`tr[data-site-id="${id}"]`);
+        if (row) row.remove();
+        displayedSiteIds.delete(id);
+    });
+    if (!adjustCount) return;
+    const countEl = document.querySelector('[data-total-count]');
+    const current = countEl ? parseInt(countEl.textContent, 10) : NaN;
+    if (!isNaN(current)) updateTotalCount(Math.max(current - siteIds.length, 0));
+}
+
 function insertRowInOrder(tbody, row, updatedAt) {
     if (!updatedAt) {
         tbody.appendChild(row);
@@ -568,20 +591,18 @@ function bindSingleUpdateButton(btn) {
         this.disabled = true;
         updateSingleTaskUI(siteId, true, '<i class="bi bi-hourglass-split"></i> Queuing...');
 
-        fetch(`/sites/crawl/start-single/${siteId}/`, {
+        fetch(`/crawl/start-single/${siteId}/`, {
             method: 'POST',
             headers: {
-                'X-CSRFToken': getCookie('csrftoken'),
+                'X-CSRFToken': getCsrfToken(),
                 'Content-Type': 'application/json'
             }
         })
             .then(handleFetchResponse)
             .then(data => {
                 const taskId = data.task_id;
-                activeSingleTasks.push({ taskId, siteId });
-                saveTasksToStorage();
+                addSingleTask(taskId, siteId);
                 updateSingleTaskUI(siteId, true, '<i class="bi bi-arrow-repeat"></i> Updating...');
-                checkPolling();
             })
             .catch(err => {
                 this.disabled = false;
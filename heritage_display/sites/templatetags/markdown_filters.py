@@ -1,12 +1,22 @@
 """
 Markdown 模板过滤器
 用于将 Markdown 格式文本转换为安全的 HTML
+
+渲染结果按内容哈希缓存在 MARKDOWN_CACHE_ALIAS 指定的缓存中 (见 settings.CACHES),
+正文未变化时 site_detail 不再重复解析和清理; `manage.py warm_markdown_cache`
+可在爬取完成后预先填充缓存。
 """
+import hashlib
+import threading
 
 from django import template
+from django.conf import settings
+from django.core.cache import caches
 from django.utils.safestring import mark_safe
 import markdown
-from bleach import clean
+from bleach.sanitizer import Cleaner
+
+from ..metrics import record_cache
 
 register = template.Library()
 
@@ -25,6 +35,52 @@ ALLOWED_ATTRIBUTES = {
     '*': ['class'],
 }
 
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.tables',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.toc',
+    'markdown.extensions.sane_lists',
+]
+
+# bump when the extensions or the allow-lists change, so cached HTML is re-rendered
+RENDER_VERSION = 1
+
+# Markdown and bleach Cleaner instances keep parser state: one of each per thread
+_local = threading.local()
+
+
+def _renderers():
+    if not hasattr(_local, 'markdown'):
+        _local.markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        _local.cleaner = Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+    return _local.markdown, _local.cleaner
+
+
+def render_markdown(text):
+    """Markdown -> sanitized HTML, uncached"""
+    md, cleaner = _renderers()
+    html = md.reset().convert(text)
+    # 清理 HTML，只保留安全的标签和属性
+    return cleaner.clean(html)
+
+
+def cache_key(text):
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return f'markdown:v{RENDER_VERSION}:{digest}'
+
+
+def render_markdown_cached(text):
+    """render_markdown, cached by content hash"""
+    cache = caches[settings.MARKDOWN_CACHE_ALIAS]
+    key = cache_key(text)
+    html = cache.get(key)
+    record_cache('markdown', html is not None)
+    if html is None:
+        html = render_markdown(text)
+        cache.set(key, html, settings.MARKDOWN_CACHE_TIMEOUT)
+    return html
+
+
 @register.filter
 def markdown_to_html(text):
     """
@@ -39,23 +95,4 @@ def markdown_to_html(text):
     if not text:
         return ''
     
-    # 转换 Markdown 为 HTML
-    html = markdown.markdown(
-        text,
-        extensions=[
-            'markdown.extensions.tables',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.toc',
-            'markdown.extensions.sane_lists',
-        ]
-    )
-    
-    # 清理 HTML，只保留安全的标签和属性
-    safe_html = clean(
-        html,
-        tags=ALLOWED_TAGS,
-        attributes=ALLOWED_ATTRIBUTES,
-        strip=True
-    )
-    
-    return mark_safe(safe_html)
+    return mark_safe(render_markdown_cached(text))
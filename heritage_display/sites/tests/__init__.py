@@ -0,0 +1,8 @@
+"""
+Tests for the sites app
+
+    DB_ENGINE=django.db.backends.sqlite3 python manage.py test sites
+
+PostgreSQL-only parts (search ranking, the facet view, migrations 0003-0006)
+are skipped on SQLite; everything else runs on either backend without Redis.
+"""
@@ -0,0 +1,127 @@
+import datetime
+import json
+from unittest import mock
+
+import redis
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+
+from sites.models import CrawlTask
+from sites.views import crawler_views, event_views
+from sites.views.event_views import KEEPALIVE_SECONDS, _format_event
+
+from .utils import SiteTestCase
+
+
+def _message(data):
+    return {'type': 'message', 'channel': settings.CRAWL_EVENTS_CHANNEL.encode(), 'data': data}
+
+
+class FakePubSub:
+    """Replays `(seconds waited, message)` pairs, then fails like a dropped connection"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.clock = 0.0
+        self.subscribed = []
+        self.closed = False
+
+    def subscribe(self, channel):
+        self.subscribed.append(channel)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        if not self.script:
+            raise redis.ConnectionError('connection lost (test)')
+        waited, message = self.script.pop(0)
+        self.clock += waited
+        return message
+
+    def close(self):
+        self.closed = True
+
+
+class FormatEventTests(SimpleTestCase):
+
+    def test_type_names_the_event(self):
+        data = json.dumps({'type': 'site', 'site': {'id': 3}})
+        self.assertEqual(_format_event(_message(data)), f'event: site\ndata: {data}\n\n')
+
+    def test_bytes_are_decoded(self):
+        frame = _format_event(_message('{"type": "task", "current_item": "拉穆古镇"}'.encode()))
+        self.assertEqual(frame, 'event: task\ndata: {"type": "task", "current_item": "拉穆古镇"}\n\n')
+
+    def test_missing_type_is_a_message_event(self):
+        self.assertTrue(_format_event(_message(b'{"id": 1}')).startswith('event: message\n'))
+
+    def test_invalid_or_non_object_payload_is_dropped(self):
+        for data in (b'not json', b'{"type": ', b'[1, 2]', b'"task"', b'42'):
+            with self.subTest(data=data):
+                self.assertIsNone(_format_event(_message(data)))
+
+    def test_crawler_task_event(self):
+        # the shape heritage_pipeline's task_event() publishes, dates through default=str
+        payload = {'type': 'task', 'task_id': 7, 'task_type': 'full', 'status': 'running',
+                   'total_items': 4, 'processed_items': 1, 'current_item': 'Lamu Old Town',
+                   'progress_percentage': 25.0, 'completed_at': datetime.datetime(2024, 5, 1, 12, 0)}
+        frame = _format_event(_message(json.dumps(payload, default=str).encode()))
+        event, data = frame.rstrip('\n').split('\n')
+        self.assertEqual(event, 'event: task')
+        self.assertEqual(json.loads(data.removeprefix('data: '))['completed_at'], '2024-05-01 12:00:00')
+
+
+class SyncStreamTests(SimpleTestCase):
+
+    def _stream(self, script):
+        pubsub = FakePubSub(script)
+        client = mock.Mock(pubsub=mock.Mock(return_value=pubsub))
+        with mock.patch.object(event_views.redis, 'from_url', return_value=client), \
+                mock.patch.object(event_views.time, 'monotonic', side_effect=lambda: pubsub.clock), \
+                self.assertLogs(event_views.logger, 'ERROR'):
+            frames = list(event_views._sync_stream())
+        self.assertEqual(pubsub.subscribed, [settings.CRAWL_EVENTS_CHANNEL])
+        self.assertTrue(pubsub.closed)
+        client.close.assert_called_once()
+        return frames
+
+    def test_retry_header_events_and_keepalive(self):
+        event = json.dumps({'type': 'task', 'task_id': 1})
+        frames = self._stream([
+            (0, _message(event)),
+            # a confirmation or a dropped frame before the keepalive is due: nothing sent
+            (1, None),
+            (1, _message(b'garbage')),
+            (KEEPALIVE_SECONDS, None),
+        ])
+        self.assertEqual(frames, ['retry: 3000\n\n', f'event: task\ndata: {event}\n\n', ': keepalive\n\n'])
+
+    def test_keepalive_interval_restarts_after_each_frame(self):
+        frames = self._stream([
+            (KEEPALIVE_SECONDS - 1, _message(b'{"type": "site"}')),
+            (KEEPALIVE_SECONDS - 1, None),
+            (1, None),
+        ])
+        self.assertEqual(frames[1:], ['event: site\ndata: {"type": "site"}\n\n', ': keepalive\n\n'])
+
+
+class EventViewTests(SiteTestCase):
+
+    def test_crawl_events_is_an_unbuffered_event_stream(self):
+        with mock.patch.object(event_views, '_sync_stream', return_value=iter(['retry: 3000\n\n'])):
+            response = self.client.get('/events/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        self.assertEqual(b''.join(response.streaming_content), b'retry: 3000\n\n')
+
+    def test_stop_all_crawls_publishes_tasks_stopped(self):
+        self.client.force_login(User.objects.create_user('curator'))
+        task = CrawlTask.objects.create(task_type='full', status='running')
+        with mock.patch.object(crawler_views, 'r', self.redis):
+            response = self.client.post('/crawl/stop-all/')
+        self.assertEqual(response.json(), {'status': 'stopped'})
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'stopped')
+        self.assertEqual(self.redis.published,
+                         [(settings.CRAWL_EVENTS_CHANNEL, json.dumps({'type': 'tasks_stopped'}))])
@@ -0,0 +1,61 @@
+import csv
+import gzip
+import io
+import json
+from unittest import mock
+
+from sites.views import export_views
+
+from .utils import SiteTestCase, make_site
+
+
+@mock.patch.object(export_views, 'EXPORT_CHUNK_SIZE', 2)
+class ExportTests(SiteTestCase):
+    url = '/api/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.sites = [make_site(f'Site {i}', metadata={'n': i, 'name': '遗产'}) for i in range(5)]
+        make_site('Machu Picchu', country='Peru')
+
+    def test_unknown_format_or_fields(self):
+        for params in ({'format': 'xml'}, {'fields': 'id,password'}, {'fields': ' , '}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_ndjson(self):
+        response = self.client.get(self.url, {'country': 'Kenya', 'fields': 'id,name,metadata'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('heritage_sites.ndjson', response['Content-Disposition'])
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, [{'id': s.pk, 'name': s.name, 'metadata': s.metadata} for s in self.sites])
+
+    def test_csv(self):
+        response = self.client.get(self.url, {'format': 'csv', 'fields': 'id,metadata,updated_at'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'metadata', 'updated_at'])
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(json.loads(rows[1][1]), {'n': 0, 'name': '遗产'})
+        self.assertEqual(rows[1][2], self.sites[0].updated_at.isoformat())
+
+    def test_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 6)
+
+    def test_wsgi_streams_one_chunk_per_batch(self):
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertFalse(response.is_async)
+        chunks = list(response.streaming_content)
+        # header, then batches of EXPORT_CHUNK_SIZE rows
+        self.assertEqual([len(c.splitlines()) for c in chunks], [1, 2, 2, 2])
+
+    async def test_asgi_streams_batches_asynchronously(self):
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([len(c.splitlines()) for c in chunks], [2, 2, 2])
+        ids = [json.loads(line)['id'] for c in chunks for line in c.splitlines()]
+        self.assertEqual(ids, sorted(ids))
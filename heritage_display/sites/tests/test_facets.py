@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from sites import facets
+from sites.facets import Facets
+
+from .utils import BrokenRedis, SiteTestCase
+
+ROWS = [
+    ('China', 'Cultural', 40),
+    ('China', 'Natural', 14),
+    ('Kenya', 'Cultural', 4),
+    ('Kenya', 'Natural', 3),
+    ('Peru', 'Mixed', 2),
+]
+
+
+def _counts(entries):
+    return {e['value']: (e['count'], e['selected']) for e in entries}
+
+
+class FacetCountTests(SimpleTestCase):
+
+    def setUp(self):
+        self.facets = Facets(ROWS)
+
+    def test_total(self):
+        self.assertEqual(self.facets.total(), 63)
+        self.assertEqual(self.facets.total(['Kenya']), 7)
+        self.assertEqual(self.facets.total(['Kenya', 'Peru'], ['Natural']), 3)
+        self.assertEqual(self.facets.total(['Atlantis']), 0)
+
+    def test_unfiltered_options(self):
+        options = self.facets.options()
+        self.assertEqual(_counts(options['countries']),
+                         {'China': (54, False), 'Kenya': (7, False), 'Peru': (2, False)})
+        self.assertEqual(_counts(options['categories']),
+                         {'Cultural': (44, False), 'Mixed': (2, False), 'Natural': (17, False)})
+        self.assertEqual([e['value'] for e in options['countries']], ['China', 'Kenya', 'Peru'])
+
+    def test_counts_are_disjunctive(self):
+        options = self.facets.options(['Kenya'], ['Natural'])
+        # countries under the selected category, categories under the selected country
+        self.assertEqual(_counts(options['countries']), {'China': (14, False), 'Kenya': (3, True)})
+        self.assertEqual(_counts(options['categories']), {'Cultural': (4, False), 'Natural': (3, True)})
+
+    def test_selected_value_without_sites_stays_listed(self):
+        options = self.facets.options(['Atlantis'])
+        self.assertEqual(_counts(options['countries'])['Atlantis'], (0, True))
+        self.assertEqual(options['categories'], [])
+
+    def test_empty_values_are_dropped(self):
+        options = Facets([('', 'Cultural', 5), ('Kenya', None, 1)]).options()
+        self.assertEqual(_counts(options['countries']), {'Kenya': (1, False)})
+        self.assertEqual(_counts(options['categories']), {'Cultural': (5, False)})
+
+
+class FacetCacheTests(SiteTestCase):
+
+    def test_rows_are_read_once_per_version(self):
+        with mock.patch.object(facets, '_load_rows', return_value=ROWS) as load:
+            Facets.load()
+            self.assertEqual(Facets.load().total(), 63)
+            self.assertEqual(load.call_count, 1)
+            self.redis.incr(settings.FACETS_VERSION_KEY)
+            Facets.load()
+            self.assertEqual(load.call_count, 2)
+
+    def test_unavailable_view_is_not_cached(self):
+        with mock.patch.object(facets, '_load_rows', return_value=None) as load:
+            self.assertEqual(Facets.load().total(), 0)
+            Facets.load()
+            self.assertEqual(load.call_count, 2)
+
+    def test_local_cache_without_redis(self):
+        self.use_redis(BrokenRedis())
+        self.assertEqual(facets.facets_version(), 'local')
+        with mock.patch.object(facets, '_load_rows', return_value=ROWS) as load:
+            Facets.load()
+            Facets.load()
+            self.assertEqual(load.call_count, 1)
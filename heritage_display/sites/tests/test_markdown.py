@@ -0,0 +1,88 @@
+import datetime
+import io
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.utils import timezone
+
+from sites.templatetags import markdown_filters
+from sites.templatetags.markdown_filters import _renderers, cache_key, markdown_to_html, render_markdown_cached
+
+from .utils import SiteTestCase, make_site
+
+UNSAFE = ('# Lamu\n\n<script>alert(1)</script>\n\n'
+          '<a href="https://whc.unesco.org" onclick="steal()">UNESCO</a> <img src="x.png" onerror="steal()">')
+
+
+class MarkdownCacheTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = caches[settings.MARKDOWN_CACHE_ALIAS]
+
+    def test_cache_hit_returns_the_same_html(self):
+        with mock.patch.object(markdown_filters, 'render_markdown', wraps=markdown_filters.render_markdown) as render:
+            first = render_markdown_cached('**Fort Jesus** and *Lamu*')
+            second = render_markdown_cached('**Fort Jesus** and *Lamu*')
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertIn('<strong>Fort Jesus</strong>', second)
+
+    def test_cached_html_is_sanitized(self):
+        render_markdown_cached(UNSAFE)
+        for html in (self.cache.get(cache_key(UNSAFE)), render_markdown_cached(UNSAFE), markdown_to_html(UNSAFE)):
+            with self.subTest(html=html):
+                self.assertNotIn('<script', html)
+                self.assertNotIn('onclick', html)
+                self.assertNotIn('onerror', html)
+                self.assertIn('href="https://whc.unesco.org"', html)
+                self.assertIn('src="x.png"', html)
+
+    def test_key_changes_with_text_and_render_version(self):
+        key = cache_key('Lamu')
+        self.assertEqual(cache_key('Lamu'), key)
+        self.assertNotEqual(cache_key('Lamu Old Town'), key)
+        with mock.patch.object(markdown_filters, 'RENDER_VERSION', markdown_filters.RENDER_VERSION + 1):
+            self.assertNotEqual(cache_key('Lamu'), key)
+
+    def test_empty_text_is_not_rendered(self):
+        self.assertEqual(markdown_to_html(''), '')
+        self.assertEqual(markdown_to_html(None), '')
+
+    def test_renderers_are_per_thread(self):
+        self.assertIs(_renderers()[0], _renderers()[0])
+        other = []
+        thread = threading.Thread(target=lambda: other.extend(_renderers()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], _renderers()[0])
+        self.assertIsNot(other[1], _renderers()[1])
+
+
+class WarmMarkdownCacheTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = caches[settings.MARKDOWN_CACHE_ALIAS]
+        self.old = make_site('Fort Jesus', updated_at=timezone.now() - datetime.timedelta(days=1),
+                             description_en='Old *fort*', content='Old content')
+        self.new = make_site('Lamu Old Town', description_en='New *town*', description_zh='拉穆古镇')
+
+    def _warm(self, *args):
+        out = io.StringIO()
+        call_command('warm_markdown_cache', *args, stdout=out)
+        return out.getvalue()
+
+    def test_only_recently_updated_sites(self):
+        self.assertIn('Rendered 1 sites', self._warm('--since-minutes', '60'))
+        self.assertIsNotNone(self.cache.get(cache_key('New *town*')))
+        self.assertIsNotNone(self.cache.get(cache_key('拉穆古镇')))
+        self.assertIsNone(self.cache.get(cache_key('Old *fort*')))
+        self.assertIsNone(self.cache.get(cache_key('Old content')))
+
+    def test_all_sites_by_default(self):
+        self.assertIn('Rendered 2 sites', self._warm())
+        self.assertIsNotNone(self.cache.get(cache_key('Old *fort*')))
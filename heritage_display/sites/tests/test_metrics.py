@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from sites import metrics
+from sites.metrics import _percentile, record_cache, snapshot
+
+from .utils import BrokenRedis, SiteTestCase, make_site
+
+
+class PercentileTests(SimpleTestCase):
+
+    def test_upper_bound_of_the_bucket(self):
+        buckets = {'5': 50, '10': 45, '25': 5}
+        self.assertEqual(_percentile(buckets, 100, 0.5), 5)
+        self.assertEqual(_percentile(buckets, 100, 0.95), 10)
+        self.assertEqual(_percentile(buckets, 100, 0.99), 25)
+
+    def test_overflow_bucket(self):
+        self.assertEqual(_percentile({'5': 1, 'inf': 1}, 2, 0.99), 'inf')
+        self.assertEqual(_percentile({}, 3, 0.5), 'inf')
+
+
+class MetricsMiddlewareTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(metrics, '_totals', metrics._Totals())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.site = make_site('Lamu Old Town')
+
+    def test_requests_and_caches_are_reported_from_redis(self):
+        for _ in range(3):
+            self.client.get(f'/{self.site.pk}/')
+        record_cache('markdown', True)
+        record_cache('markdown', False)
+        record_cache('markdown', True)
+
+        report = snapshot()
+        self.assertEqual(report['source'], 'redis')
+        detail = report['views']['sites:detail']
+        self.assertEqual(detail['requests'], 3)
+        self.assertEqual(sum(detail['histogram_ms'].values()), 3)
+        self.assertIn(detail['p99_ms'], metrics.LATENCY_BUCKETS_MS + ('inf',))
+        # rendered once, then served from the page cache
+        self.assertGreater(detail['template_ms_per_request'], 0)
+        self.assertEqual(report['caches']['page'], {'hit': 2, 'miss': 1, 'hit_rate': 0.667})
+        self.assertEqual(report['caches']['markdown']['hit_rate'], 0.667)
+        self.assertIn(f'{settings.METRICS_KEY_PREFIX}views', self.redis.hashes)
+
+        # flushed counters are not counted twice
+        self.assertEqual(snapshot()['views']['sites:detail']['requests'], 3)
+
+    def test_queries_are_counted(self):
+        self.client.get('/api/sites/')
+        api = snapshot()['views']['sites:api_list']
+        self.assertGreaterEqual(api['queries_per_request'], 1)
+
+    def test_streaming_responses_get_their_own_label(self):
+        response = self.client.get('/api/export/')
+        b''.join(response.streaming_content)
+        views = snapshot()['views']
+        self.assertIn('sites:export_sites (stream)', views)
+        self.assertNotIn('sites:export_sites', views)
+
+    async def test_async_requests_are_timed_with_their_queries(self):
+        await self.async_client.get('/api/sites/')
+        report = await metrics.sync_to_async(snapshot)()
+        self.assertEqual(report['views']['sites:api_list']['requests'], 1)
+        self.assertGreaterEqual(report['views']['sites:api_list']['queries_per_request'], 1)
+
+    def test_process_totals_without_redis(self):
+        self.use_redis(BrokenRedis())
+        self.client.get(f'/{self.site.pk}/')
+        report = snapshot()
+        self.assertEqual(report['source'], 'process')
+        self.assertEqual(report['views']['sites:detail']['requests'], 1)
+        # kept for the next flush rather than dropped
+        self.assertEqual(snapshot()['views']['sites:detail']['requests'], 1)
+
+    def test_disabled(self):
+        with self.settings(METRICS_ENABLED=False):
+            self.client.get(f'/{self.site.pk}/')
+        self.assertEqual(snapshot()['views'], {})
+
+    def test_middleware_supports_both_stacks(self):
+        self.assertTrue(metrics.MetricsMiddleware.sync_capable)
+        self.assertTrue(metrics.MetricsMiddleware.async_capable)
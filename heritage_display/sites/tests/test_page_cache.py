@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.conf import settings
+from django.shortcuts import render
+
+from sites.page_cache import data_version, site_key
+
+from .utils import BrokenRedis, SiteTestCase, make_site
+
+
+class PageCacheTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.site = make_site('Lamu Old Town')
+        self.url = f'/{self.site.pk}/'
+        patcher = mock.patch('sites.views.detail_views.render', wraps=render)
+        self.render = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_version_counters(self):
+        self.assertEqual(data_version(), '0')
+        self.redis.incr(site_key(self.site.pk))
+        self.assertEqual(data_version(self.site.pk), '1')
+        self.use_redis(BrokenRedis())
+        self.assertIsNone(data_version())
+
+    def test_rendered_page_is_reused_until_the_site_is_written(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(second.content, first.content)
+
+        # another site's write leaves this page's key alone
+        self.redis.incr(site_key(self.site.pk + 1))
+        self.client.get(self.url)
+        self.assertEqual(self.render.call_count, 1)
+
+        self.redis.incr(site_key(self.site.pk))
+        self.client.get(self.url)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get(self.url)
+        self.client.get(self.url, {'lang': 'zh'})
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_nothing_is_cached_without_redis(self):
+        self.use_redis(BrokenRedis())
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_matching_etag_or_date_gets_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_write_counter_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.redis.incr(site_key(self.site.pk))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_follows_deletions_and_facet_refreshes(self):
+        make_site('Fort Jesus')
+        etag = self.client.get('/')['ETag']
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # a deletion leaves max(updated_at) where it was
+        self.redis.incr(settings.SITE_VERSION_KEY)
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.redis.incr(settings.FACETS_VERSION_KEY)
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_no_last_modified_without_redis(self):
+        self.use_redis(BrokenRedis())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
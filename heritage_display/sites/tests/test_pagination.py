@@ -0,0 +1,135 @@
+import base64
+import datetime
+from unittest import mock
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from sites.models import HeritageSite
+from sites.pagination import PAGE_SIZE, decode_cursor, encode_cursor, paginate_keyset
+from sites.views import list_views
+
+from .utils import SiteTestCase, make_site
+
+
+def _cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        updated_at = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        site = HeritageSite(pk=42, updated_at=updated_at)
+        self.assertEqual(decode_cursor(encode_cursor(site)), (updated_at, 42))
+
+    def test_round_trip_without_updated_at(self):
+        self.assertEqual(decode_cursor(encode_cursor(HeritageSite(pk=7, updated_at=None))), (None, 7))
+
+    def test_malformed_or_tampered_cursors_are_rejected(self):
+        for cursor in ('', 'not-base64!', _cursor('2024-05-01T12:00:00'), _cursor('2024-05-01T12:00:00|x'),
+                       _cursor('yesterday|3'), _cursor('2024-13-45T99:00:00|3'), '__8'):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+class KeysetPaginationTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        base = timezone.now() - datetime.timedelta(days=1)
+        # two sites share a timestamp, so the id tie-break is exercised
+        self.dated = [make_site(f'Site {i}', updated_at=base + datetime.timedelta(minutes=i // 2)) for i in range(5)]
+        self.undated = [make_site(f'Undated {i}') for i in range(2)]
+        HeritageSite.objects.filter(pk__in=[s.pk for s in self.undated]).update(updated_at=None)
+        # list order: undated rows first, then newest first, ids descending within a timestamp
+        self.expected = [s.pk for s in reversed(self.undated)] + [s.pk for s in reversed(self.dated)]
+
+    def _walk_forward(self, per_page):
+        pages, after = [], None
+        while True:
+            page = paginate_keyset(HeritageSite.objects.all(), after=after, per_page=per_page)
+            pages.append([s.pk for s in page])
+            if not page.has_next():
+                return pages
+            after = page.next_params['after']
+
+    def test_forward_pages_cover_every_row_once(self):
+        for per_page in (1, 2, 3, 7):
+            with self.subTest(per_page=per_page):
+                pages = self._walk_forward(per_page)
+                self.assertEqual(sum(pages, []), self.expected)
+
+    def test_backward_pages_mirror_forward_pages(self):
+        pages, page = [], paginate_keyset(HeritageSite.objects.all(), per_page=2)
+        while page.has_next():
+            page = paginate_keyset(HeritageSite.objects.all(), after=page.next_params['after'], per_page=2)
+        while True:
+            pages.insert(0, [s.pk for s in page])
+            if not page.has_previous():
+                break
+            page = paginate_keyset(HeritageSite.objects.all(), before=page.previous_params['before'], per_page=2)
+        self.assertEqual(pages, self._walk_forward(2))
+
+    def test_page_links_keep_filters(self):
+        page = paginate_keyset(HeritageSite.objects.all(), per_page=2, params=QueryDict('country=Kenya&after=x'))
+        self.assertTrue(page.next_query.startswith('country=Kenya&after='))
+        self.assertIsNone(page.previous_query)
+
+    def test_api_rejects_a_bad_cursor(self):
+        response = self.client.get('/api/sites/', {'after': _cursor('garbage|1')})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_page_restarts_on_a_bad_cursor(self):
+        response = self.client.get('/', {'after': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s.pk for s in response.context['page_obj']], self.expected)
+
+    def test_api_pages_through_undated_rows(self):
+        url, seen = '/api/sites/?limit=3', []
+        while url:
+            data = self.client.get(url).json()
+            seen += [row['id'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(seen, self.expected)
+
+
+def _name_search(queryset, text):
+    # search_sites needs PostgreSQL; same contract on a plain name match
+    return queryset.filter(name__icontains=text).order_by('-id')
+
+
+@mock.patch.object(list_views, 'search_sites', _name_search)
+@mock.patch.object(list_views, 'SEARCH_MAX_PAGES', 2)
+class SearchTotalTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(PAGE_SIZE * 2 + 5):
+            make_site(f'Fort {i}')
+        make_site('Lamu Old Town')
+
+    def test_total_stops_at_the_reachable_pages(self):
+        response = self.client.get('/', {'search': 'Fort'})
+        self.assertEqual(response.context['total_count'], PAGE_SIZE * 2)
+        self.assertTrue(response.context['results_capped'])
+        self.assertContains(response, 'Showing the top results')
+        # asking past the cap lands on the last reachable page
+        last = self.client.get('/', {'search': 'Fort', 'page': 3}).context['page_obj']
+        self.assertEqual(len(last.object_list), PAGE_SIZE)
+        self.assertFalse(last.has_next())
+
+    def test_small_result_sets_are_counted_exactly(self):
+        response = self.client.get('/', {'search': 'Lamu'})
+        self.assertEqual(response.context['total_count'], 1)
+        self.assertFalse(response.context['results_capped'])
+        self.assertNotContains(response, 'Showing the top results')
+
+    def test_api_caps_by_its_own_page_size(self):
+        data = self.client.get('/api/sites/', {'search': 'Fort', 'limit': 10}).json()
+        self.assertEqual((data['total_count'], data['results_capped']), (20, True))
+        data = self.client.get('/api/sites/', {'search': 'Fort', 'limit': 100}).json()
+        self.assertEqual((data['total_count'], data['results_capped']), (PAGE_SIZE * 2 + 5, False))
+        data = self.client.get('/api/sites/').json()
+        self.assertEqual((data['total_count'], data['results_capped']), (PAGE_SIZE * 2 + 6, False))
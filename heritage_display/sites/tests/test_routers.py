@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.shortcuts import render
+from django.test import SimpleTestCase, override_settings
+
+from heritage_display.routers import PrimaryReplicaRouter
+from sites import page_cache
+from sites.models import CrawlTask, HeritageSite
+
+from .utils import SiteTestCase, make_site
+
+REPLICA_ROUTERS = ['heritage_display.routers.PrimaryReplicaRouter']
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_only_site_reads_go_to_the_replica(self):
+        self.assertEqual(self.router.db_for_read(HeritageSite), 'replica')
+        self.assertEqual(self.router.db_for_read(CrawlTask), 'default')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_writes_and_migrations_use_the_primary(self):
+        for model in (HeritageSite, CrawlTask, User):
+            self.assertEqual(self.router.db_for_write(model), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'sites'))
+        self.assertFalse(self.router.allow_migrate('replica', 'sites'))
+
+
+class ReplicaPageCacheTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.site = make_site('Lamu Old Town')
+        self.url = f'/{self.site.pk}/'
+        self.now = 1_000_000.0
+        for name in ('time', 'router'):
+            patcher = mock.patch.object(page_cache, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        page_cache.time.time.side_effect = lambda: self.now
+        page_cache.router.db_for_read.return_value = 'replica'
+
+    def test_settled_after_the_lag(self):
+        self.assertFalse(page_cache.replica_settled(None, '3'))
+        self.now += 5
+        self.assertFalse(page_cache.replica_settled(None, '3'))
+        self.now += 5
+        self.assertTrue(page_cache.replica_settled(None, '3'))
+        # a new write starts the wait again, per site or for all pages
+        self.assertFalse(page_cache.replica_settled(None, '4'))
+        self.assertFalse(page_cache.replica_settled(self.site.pk, '3'))
+        self.assertFalse(page_cache.replica_settled(None, None))
+
+    def test_always_settled_without_a_replica(self):
+        page_cache.router.db_for_read.return_value = 'default'
+        self.assertTrue(page_cache.replica_settled(None, '3'))
+        self.assertTrue(page_cache.replica_settled(None, None))
+
+    def test_fresh_version_is_neither_cached_nor_validated(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        with mock.patch('sites.views.detail_views.render', wraps=render) as rendered:
+            self.client.get(self.url)
+            self.assertEqual(rendered.call_count, 1)
+
+            self.now += 10
+            response = self.client.get(self.url)
+            self.assertIn('ETag', response)
+            self.client.get(self.url)
+            self.assertEqual(rendered.call_count, 2)
+
+    @override_settings(DATABASE_ROUTERS=REPLICA_ROUTERS)
+    def test_validators_read_the_primary(self):
+        # there is no 'replica' connection here: reaching it would raise
+        self.assertEqual(page_cache._last_modified(self.site.pk), self.site.updated_at)
+        self.assertEqual(page_cache._last_modified(), self.site.updated_at)
@@ -0,0 +1,69 @@
+import importlib
+import unittest
+
+from django.contrib.postgres.search import SearchQueryCombinable
+from django.db import connection
+from django.test import SimpleTestCase
+
+from sites.forms import HeritageSiteFilterForm
+from sites.models import HeritageSite
+from sites.search import backfill_search_vectors, build_search_query, cjk_query_terms, search_sites
+
+from .utils import SiteTestCase, make_site
+
+
+class SearchQueryTests(SimpleTestCase):
+
+    def test_cjk_runs_become_bigrams(self):
+        self.assertEqual(cjk_query_terms('长城 and 故宫博物院'), ['长城', '故宫', '宫博', '博物', '物院'])
+        self.assertEqual(cjk_query_terms('城'), ['城'])
+        self.assertEqual(cjk_query_terms('Great Wall'), [])
+
+    def test_build_search_query(self):
+        self.assertIsNone(build_search_query('   '))
+        self.assertIsInstance(build_search_query('Great Wall'), SearchQueryCombinable)
+        self.assertIsInstance(build_search_query('长城'), SearchQueryCombinable)
+        self.assertIsInstance(build_search_query('Great Wall 长城'), SearchQueryCombinable)
+
+
+class FilterFormTests(SimpleTestCase):
+
+    def test_multiple_facets_and_unknown_values_are_accepted(self):
+        form = HeritageSiteFilterForm({'search': ' wall ', 'country': ['Kenya', 'Peru'], 'category': ['Nope']})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['search'], 'wall')
+        self.assertEqual(form.cleaned_data['country'], ['Kenya', 'Peru'])
+        self.assertEqual(form.cleaned_data['category'], ['Nope'])
+
+    def test_empty_form_is_valid(self):
+        form = HeritageSiteFilterForm({})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['country'], [])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+class SearchRankingTests(SiteTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # migration 0003 skipped the test database, whose heritage_site is created afterwards
+        migration = importlib.import_module('sites.migrations.0003_heritagesite_search_vector')
+        with connection.cursor() as cursor:
+            cursor.execute(migration.FORWARD_SQL)
+
+    def test_ranked_typo_tolerant_and_cjk_search(self):
+        machu = make_site('Historic Sanctuary of Machu Picchu', country='Peru')
+        wall = make_site('The Great Wall', country='China', description_zh='长城是中国古代的军事防御工程')
+        make_site('Lamu Old Town')
+
+        sites = HeritageSite.objects.defer('search_vector')
+        self.assertEqual([s.pk for s in search_sites(sites, 'Machu Pichu')][:1], [machu.pk])
+        self.assertEqual([s.pk for s in search_sites(sites, '长城')], [wall.pk])
+
+    def test_backfill_fills_missing_vectors_in_batches(self):
+        for i in range(5):
+            make_site(f'Site {i}')
+        HeritageSite.objects.update(search_vector=None)
+        self.assertEqual(backfill_search_vectors(connection, batch_size=2), 5)
+        self.assertFalse(HeritageSite.objects.filter(search_vector__isnull=True).exists())
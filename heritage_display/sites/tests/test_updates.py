@@ -0,0 +1,103 @@
+import datetime
+import json
+
+from django.conf import settings
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from sites.site_state import record_deletion, site_total, site_watermark, watermark_value
+
+from .utils import BrokenRedis, SiteTestCase, make_site
+
+UTC = datetime.timezone.utc
+
+
+class WatermarkValueTests(SimpleTestCase):
+
+    def test_fixed_width_utc(self):
+        whole = datetime.datetime(2024, 5, 1, 12, 0, 0, tzinfo=UTC)
+        shanghai = datetime.datetime(2024, 5, 1, 20, 0, 0, 500000, tzinfo=datetime.timezone(datetime.timedelta(hours=8)))
+        self.assertEqual(watermark_value(whole), '2024-05-01T12:00:00.000000Z')
+        self.assertEqual(watermark_value(shanghai), '2024-05-01T12:00:00.500000Z')
+        # string order is time order, which the compare-and-set script relies on
+        self.assertLess(watermark_value(whole), watermark_value(shanghai))
+        self.assertEqual(parse_datetime(watermark_value(shanghai)), shanghai)
+
+
+class UpdatedSitesApiTests(SiteTestCase):
+    url = '/api/updated/'
+
+    def setUp(self):
+        super().setUp()
+        self.base = timezone.now().replace(microsecond=0) - datetime.timedelta(hours=1)
+        self.sites = [make_site(f'Site {i}', updated_at=self.base + datetime.timedelta(minutes=i)) for i in range(3)]
+        self.latest = self.sites[-1].updated_at
+
+    def test_count_and_watermark_are_seeded_from_the_database(self):
+        self.assertEqual(site_total(), 3)
+        self.assertEqual(site_watermark(), self.latest)
+        self.assertEqual(self.redis.data[settings.SITE_COUNT_KEY], 3)
+        self.assertEqual(self.redis.data[settings.SITE_WATERMARK_KEY], watermark_value(self.latest))
+
+    def test_crawler_values_win_over_the_seed(self):
+        newer = watermark_value(self.latest + datetime.timedelta(minutes=5))
+        self.redis.set(settings.SITE_COUNT_KEY, 10)
+        self.redis.set(settings.SITE_WATERMARK_KEY, newer)
+        self.assertEqual(site_total(), 10)
+        self.assertEqual(site_watermark(), parse_datetime(newer))
+
+    def test_latest_sites_without_since(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual([s['id'] for s in data['updated_sites']], [s.pk for s in reversed(self.sites)])
+        self.assertEqual(data['total_count'], 3)
+        self.assertEqual(parse_datetime(data['server_time']), self.latest)
+
+    def test_nothing_new_runs_no_query(self):
+        site_total(), site_watermark()
+        with self.assertNumQueries(0):
+            data = self.client.get(self.url, {'since': self.latest.isoformat()}).json()
+        self.assertEqual(data['updated_sites'], [])
+        self.assertEqual(data['deleted_site_ids'], [])
+        self.assertEqual(parse_datetime(data['server_time']), self.latest)
+
+    def test_sites_written_after_since(self):
+        since = self.sites[0].updated_at
+        data = self.client.get(self.url, {'since': since.isoformat()}).json()
+        self.assertEqual([s['id'] for s in data['updated_sites']], [self.sites[2].pk, self.sites[1].pk])
+        # a naive `since` is UTC
+        naive = since.astimezone(UTC).replace(tzinfo=None).isoformat()
+        self.assertEqual(self.client.get(self.url, {'since': naive}).json(), data)
+
+    def test_deletion_advances_watermark_and_is_reported(self):
+        server_time = self.client.get(self.url).json()['server_time']
+        victim = self.sites[1].pk
+        self.sites[1].delete()
+
+        self.assertNotIn(settings.SITE_COUNT_KEY, self.redis.data)
+        self.assertEqual(self.redis.data[settings.SITE_VERSION_KEY], 1)
+        self.assertEqual(json.loads(self.redis.published[-1][1])['site'], {'id': victim})
+
+        data = self.client.get(self.url, {'since': server_time}).json()
+        self.assertEqual(data['deleted_site_ids'], [victim])
+        self.assertEqual(data['total_count'], 2)
+        self.assertGreater(parse_datetime(data['server_time']), parse_datetime(server_time))
+
+        # a client already past the deletion is not sent it again
+        data = self.client.get(self.url, {'since': data['server_time']}).json()
+        self.assertEqual(data['deleted_site_ids'], [])
+
+    def test_deletion_never_moves_the_watermark_back(self):
+        ahead = self.latest + datetime.timedelta(hours=1)
+        self.redis.set(settings.SITE_WATERMARK_KEY, watermark_value(ahead))
+        record_deletion(self.sites[0].pk, self.base)
+        # bumped past the current watermark rather than set to the deletion time
+        self.assertEqual(site_watermark(), ahead + datetime.timedelta(microseconds=1))
+
+    def test_database_fallback_without_redis(self):
+        self.use_redis(BrokenRedis())
+        data = self.client.get(self.url, {'since': self.sites[0].updated_at.isoformat()}).json()
+        self.assertEqual(data['total_count'], 3)
+        self.assertEqual(len(data['updated_sites']), 2)
+        self.assertEqual(data['deleted_site_ids'], [])
+        self.assertEqual(parse_datetime(data['server_time']), self.latest)
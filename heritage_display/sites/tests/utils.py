@@ -0,0 +1,151 @@
+"""
+Shared test helpers: the crawler-owned heritage_site table and a Redis stand-in
+"""
+from unittest import mock
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+
+from sites import site_state
+from sites.models import HeritageSite
+
+
+def create_site_table():
+    """Create heritage_site (normally done by the crawler) if the test database lacks it"""
+    if HeritageSite._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.create_model(HeritageSite)
+
+
+def make_site(name, updated_at=None, **fields):
+    fields.setdefault('country', 'Kenya')
+    fields.setdefault('category', 'Cultural')
+    fields.setdefault('description_en', '')
+    fields.setdefault('content', '')
+    site = HeritageSite.objects.create(name=name, **fields)
+    if updated_at is not None:
+        HeritageSite.objects.filter(pk=site.pk).update(updated_at=updated_at)
+        site.updated_at = updated_at
+    return site
+
+
+class FakeRedis:
+    """The handful of Redis commands sites/ uses, in a dict"""
+
+    def __init__(self):
+        self.data = {}
+        self.zsets = {}
+        self.hashes = {}
+        self.published = []
+
+    def get(self, key):
+        value = self.data.get(key)
+        return str(value).encode() if value is not None else None
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        low = float('-inf') if low == '-inf' else float(low)
+        zset = self.zsets.get(key, {})
+        for member, score in list(zset.items()):
+            if low <= score <= float(high):
+                del zset[member]
+
+    def zrangebyscore(self, key, low, high):
+        exclusive = str(low).startswith('(')
+        low = float(str(low).lstrip('('))
+        return [m.encode() for m, score in self.zsets.get(key, {}).items()
+                if (score > low if exclusive else score >= low)]
+
+    def hincrbyfloat(self, key, field, value):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = float(bucket.get(field, 0)) + value
+
+    def hincrby(self, key, field, value):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = int(bucket.get(field, 0)) + value
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def eval(self, script, numkeys, *keys_and_args):
+        # only the Lua scripts sites/ sends, reimplemented
+        if script == site_state.SET_IF_GREATER:
+            key, value = keys_and_args
+            current = self.data.get(key)
+            if current is None or value > current:
+                self.data[key] = value
+                return 1
+            return 0
+        raise NotImplementedError(script)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+class BrokenRedis:
+    """Every command fails as if the server were down"""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError('Redis is down (test)')
+        return fail
+
+
+class SiteTestCase(TestCase):
+    """TestCase with the heritage_site table and `self.redis`, a FakeRedis behind get_redis()"""
+
+    @classmethod
+    def setUpClass(cls):
+        # before the class-wide transaction: SQLite cannot change schema inside one
+        create_site_table()
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(site_state, '_redis', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_redis(self, client):
+        site_state._redis = client
+        self.redis = client
@@ -7,6 +7,12 @@ urlpatterns = [
     path('', views.site_list, name='list'),
     path('<int:pk>/', views.site_detail, name='detail'),
     
+    # JSON list API (keyset pagination)
+    path('api/sites/', views.site_list_api, name='api_list'),
+    
+    # Bulk export (streamed NDJSON / CSV)
+    path('api/export/', views.export_sites, name='export_sites'),
+    
     # API for incremental updates
     path('api/updated/', views.get_updated_sites, name='get_updated_sites'),
     
@@ -17,4 +23,10 @@ urlpatterns = [
     path('crawl/active-full/', views.get_active_full_crawl, name='get_active_full_crawl'),
     path('crawl/status/batch/', views.batch_crawl_status, name='batch_crawl_status'),
     path('crawl/stop-all/', views.stop_all_crawls, name='stop_all_crawls'),
+    
+    # 爬取进度推送 (Server-Sent Events)
+    path('events/', views.crawl_events, name='crawl_events'),
+    
+    # 性能指标 (staff only)
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
@@ -5,10 +5,13 @@ This package organizes views into focused modules:
 - list_views: Heritage site listing and filtering
 - detail_views: Individual site detail pages  
 - crawler_views: Crawler control and monitoring
+- event_views: Server-Sent Events stream of crawl progress
+- export_views: Streamed NDJSON / CSV bulk export
+- metrics_views: Request metrics for staff
 """
 
 # Import all views for backward compatibility
-from .list_views import site_list, get_updated_sites
+from .list_views import site_list, site_list_api, get_updated_sites
 from .detail_views import site_detail
 from .crawler_views import (
     start_full_crawl,
@@ -18,9 +21,13 @@ from .crawler_views import (
     stop_all_crawls,
     batch_crawl_status,
 )
+from .event_views import crawl_events
+from .export_views import export_sites
+from .metrics_views import metrics_view
 
 __all__ = [
     'site_list',
+    'site_list_api',
     'get_updated_sites',
     'site_detail',
     'start_full_crawl',
@@ -29,4 +36,7 @@ __all__ = [
     'get_active_full_crawl',
     'stop_all_crawls',
     'batch_crawl_status',
+    'crawl_events',
+    'export_sites',
+    'metrics_view',
 ]
@@ -148,6 +148,9 @@ def stop_all_crawls(request):
             error_message='Stopped by user'
         )
         
+        # 3. Tell open list pages (event stream) to reset
+        r.publish(settings.CRAWL_EVENTS_CHANNEL, json.dumps({'type': 'tasks_stopped'}))
+        
         logger.info("Stopped all crawls and cleared queue")
         return JsonResponse({'status': 'stopped'})
         
@@ -3,8 +3,11 @@ Detail view for heritage sites
 """
 from django.shortcuts import render, get_object_or_404
 from ..models import HeritageSite
+from ..page_cache import cached_page, conditional_page
 
 
+@conditional_page
+@cached_page(per_site=True)
 def site_detail(request, pk):
     """Heritage site detail page
     
@@ -12,7 +15,7 @@ def site_detail(request, pk):
     - description_en, description_zh, content fields have been converted to Markdown using html2text
     - Use markdown_to_html filter in templates for rendering
     """
-    site = get_object_or_404(HeritageSite, pk=pk)
+    site = get_object_or_404(HeritageSite.objects.defer('search_vector'), pk=pk)
     
     context = {
         'site': site,
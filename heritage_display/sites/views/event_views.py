@@ -0,0 +1,101 @@
+"""
+Server-Sent Events stream of crawl progress and site changes
+
+The crawler's pipelines publish JSON events to the Redis channel
+CRAWL_EVENTS_CHANNEL (`task` progress from TaskStatusPipeline, `site` rows
+from PostgresPipeline); each connected browser subscribes to that channel
+here, so following a crawl costs no database queries per tab.
+
+Under ASGI (`uvicorn heritage_display.asgi:application`) the stream is an
+async generator on redis.asyncio; under WSGI (runserver) it falls back to a
+blocking generator, which holds one worker thread per open tab.
+"""
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+logger = logging.getLogger(__name__)
+
+# comment line sent when the channel is quiet, so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+def _format_event(message):
+    """SSE frame for a pub/sub message; the payload's `type` becomes the event name"""
+    data = message['data']
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', 'replace')
+    try:
+        event = json.loads(data).get('type', 'message')
+    except (ValueError, AttributeError):
+        return None
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _async_stream():
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(settings.CRAWL_EVENTS_CHANNEL)
+        yield "retry: 3000\n\n"
+        quiet_since = time.monotonic()
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE_SECONDS)
+            frame = _format_event(message) if message else None
+            if frame:
+                yield frame
+            elif time.monotonic() - quiet_since >= KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+            else:
+                # a (un)subscribe confirmation
+                continue
+            quiet_since = time.monotonic()
+    except redis.RedisError as e:
+        logger.error(f"Event stream lost Redis: {e}")
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+def _sync_stream():
+    client = redis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    try:
+        pubsub.subscribe(settings.CRAWL_EVENTS_CHANNEL)
+        yield "retry: 3000\n\n"
+        quiet_since = time.monotonic()
+        while True:
+            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE_SECONDS)
+            frame = _format_event(message) if message else None
+            if frame:
+                yield frame
+            elif time.monotonic() - quiet_since >= KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+            else:
+                # a (un)subscribe confirmation
+                continue
+            quiet_since = time.monotonic()
+    except redis.RedisError as e:
+        logger.error(f"Event stream lost Redis: {e}")
+    finally:
+        pubsub.close()
+        client.close()
+
+
+@require_http_methods(["GET"])
+def crawl_events(request):
+    """`text/event-stream` of `task` and `site` events (see crawl_control.js)"""
+    stream = _async_stream() if isinstance(request, ASGIRequest) else _sync_stream()
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # disable response buffering in nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
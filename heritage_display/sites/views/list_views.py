@@ -1,88 +1,182 @@
 """
 List view for heritage sites
 """
+import datetime
+
+from django.db import DEFAULT_DB_ALIAS
 from django.shortcuts import render
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
 from ..models import HeritageSite
-from ..forms import HeritageSiteFilterForm
+from ..facets import Facets
+from ..forms import CATEGORY_LABELS, HeritageSiteFilterForm
+from ..page_cache import cached_page, conditional_page
+from ..pagination import PAGE_SIZE, SEARCH_MAX_PAGES, cached_count, paginate_keyset, paginate_offset
+from ..search import search_sites
+from ..site_state import deleted_since, site_total, site_watermark
 
+API_MAX_LIMIT = 100
 
-def site_list(request):
-    """Heritage sites list page with optimized queries"""
-    form = HeritageSiteFilterForm(request.GET)
+
+def _filtered_sites(form):
+    """(queryset, search, filters) for a bound filter form"""
     # Optimize query: only fetch needed fields
     sites = HeritageSite.objects.only(
         'id', 'name', 'country', 'category', 'updated_at', 'metadata'
-    ).order_by('-updated_at')
+    )
+    filters = {}
+    search = ''
     
     # Filter logic
     if form.is_valid():
         search = form.cleaned_data.get('search')
-        country = form.cleaned_data.get('country')
-        category = form.cleaned_data.get('category')
+        countries = form.cleaned_data.get('country')
+        categories = form.cleaned_data.get('category')
         
-        if search:
-            sites = sites.filter(
-                Q(name__icontains=search) | 
-                Q(country__icontains=search)
-            )
+        if countries:
+            sites = sites.filter(country__in=countries)
+            filters['country'] = tuple(sorted(countries))
         
-        if country:
-            sites = sites.filter(country__icontains=country)
+        if categories:
+            sites = sites.filter(category__in=categories)
+            filters['category'] = tuple(sorted(categories))
         
-        if category:
-            sites = sites.filter(category=category)
+        if search:
+            filters['search'] = search
+    
+    return sites, search, filters
+
+
+def _paginate(request, sites, search, per_page):
+    """Ranked search results by page number, everything else by (updated_at, id) cursor"""
+    if search:
+        # ranked full-text + trigram search (sites/search.py)
+        return paginate_offset(search_sites(sites, search), request.GET.get('page', 1),
+                               per_page=per_page, max_pages=SEARCH_MAX_PAGES, params=request.GET)
+    return paginate_keyset(sites, after=request.GET.get('after'), before=request.GET.get('before'),
+                           per_page=per_page, params=request.GET)
+
+
+def _search_total(sites, search, filters, per_page):
+    """(total, capped) for a search, counting only the SEARCH_MAX_PAGES pages that can be reached"""
+    total = cached_count(search_sites(sites, search), filters)
+    reachable = SEARCH_MAX_PAGES * per_page
+    return min(total, reachable), total > reachable
+
+
+UPDATE_FIELDS = ('id', 'name', 'country', 'category', 'updated_at')
+
+
+def _site_data(site):
+    """JSON row for a site instance or a `values(*UPDATE_FIELDS)` dict"""
+    if not isinstance(site, dict):
+        site = {field: getattr(site, field) for field in UPDATE_FIELDS}
+    return dict(site, updated_at=site['updated_at'].isoformat() if site['updated_at'] else None)
+
+
+@ensure_csrf_cookie
+@conditional_page
+@cached_page()
+def site_list(request):
+    """Heritage sites list page with keyset pagination"""
+    form = HeritageSiteFilterForm(request.GET)
+    sites, search, filters = _filtered_sites(form)
     
-    # Pagination
-    paginator = Paginator(sites, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    try:
+        page_obj = _paginate(request, sites, search, PAGE_SIZE)
+    except ValueError:
+        # stale or hand-edited cursor: start over
+        page_obj = paginate_keyset(sites, params=request.GET)
+    
+    facets = Facets.load()
+    countries, categories = filters.get('country', ()), filters.get('category', ())
+    results_capped = False
+    if search:
+        total_count, results_capped = _search_total(sites, search, filters, PAGE_SIZE)
+    else:
+        total_count = facets.total(countries, categories) if filters else site_total()
+    
+    facet_options = facets.options(countries, categories)
+    for option in facet_options['categories']:
+        option['label'] = CATEGORY_LABELS.get(option['value'], option['value'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'total_count': sites.count(),
+        'total_count': total_count,
+        'results_capped': results_capped,
+        'facets': facet_options,
     }
     
     return render(request, 'sites/site_list.html', context)
 
 
+@require_http_methods(["GET"])
+def site_list_api(request):
+    """JSON version of the site list: same filters, `after`/`before` cursors (or `page` when searching)"""
+    form = HeritageSiteFilterForm(request.GET)
+    sites, search, filters = _filtered_sites(form)
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), API_MAX_LIMIT)
+        page = _paginate(request, sites, search, limit)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+    
+    if search:
+        total_count, results_capped = _search_total(sites, search, filters, limit)
+    else:
+        total_count, results_capped = cached_count(sites, filters), False
+    
+    return JsonResponse({
+        'results': [_site_data(site) for site in page],
+        'next': f'{request.path}?{page.next_query}' if page.has_next() else None,
+        'previous': f'{request.path}?{page.previous_query}' if page.has_previous() else None,
+        'total_count': total_count,
+        # a search only pages through its top results; total_count stops there too
+        'results_capped': results_capped,
+    })
+
+
 @require_http_methods(["GET"])
 def get_updated_sites(request):
-    """获取自指定时间后更新的站点（增量更新）"""
-    # 获取客户端最后更新时间
+    """获取自指定时间后更新的站点（增量更新）
+
+    The watermark and total come from Redis (sites/site_state.py); when nothing
+    was written after `since` no database query runs at all, otherwise one
+    range scan on heritage_site_updated_id_idx fetches just the listed columns.
+    Reads the primary: a lagging replica would hand out a `server_time` past
+    rows it has not received yet, and clients would never ask for them again.
+    """
     since = request.GET.get('since')
+    since_dt = parse_datetime(since) if since else None
+    if since_dt is not None and timezone.is_naive(since_dt):
+        since_dt = timezone.make_aware(since_dt, datetime.timezone.utc)
     
-    if since:
-        from django.utils.dateparse import parse_datetime
-        since_dt = parse_datetime(since)
-        if since_dt:
-            # 获取在此时间之后更新的站点
-            updated_sites = HeritageSite.objects.filter(
-                updated_at__gt=since_dt
-            ).order_by('-updated_at')[:50]  # 最多返回50个
-        else:
-            updated_sites = []
-    else:
+    watermark = site_watermark()
+    sites = HeritageSite.objects.using(DEFAULT_DB_ALIAS)
+    updated_sites = []
+    deleted_ids = []
+    if not since:
         # 如果没有提供时间，返回最新的20个
-        updated_sites = HeritageSite.objects.all().order_by('-updated_at')[:20]
-    
-    total_count = HeritageSite.objects.count()
+        updated_sites = sites.order_by('-updated_at', '-id').values(*UPDATE_FIELDS)[:20]
+    elif since_dt is not None and watermark is not None and since_dt < watermark:
+        # 获取在此时间之后更新的站点, 最多返回50个
+        updated_sites = sites.filter(
+            updated_at__gt=since_dt
+        ).order_by('-updated_at', '-id').values(*UPDATE_FIELDS)[:50]
+        deleted_ids = deleted_since(since_dt)
     
-    sites_data = [{
-        'id': site.pk,
-        'name': site.name,
-        'country': site.country,
-        'category': site.category,
-        'updated_at': site.updated_at.isoformat() if site.updated_at else None,
-    } for site in updated_sites]
+    updated_sites = list(updated_sites)
+    newest = updated_sites[0]['updated_at'] if updated_sites else None
+    if newest and (watermark is None or newest > watermark):
+        watermark = newest
     
     return JsonResponse({
-        'total_count': total_count,
-        'updated_sites': sites_data,
-        'server_time': HeritageSite.objects.latest('updated_at').updated_at.isoformat() if HeritageSite.objects.exists() else None,
+        'total_count': site_total(),
+        'updated_sites': [_site_data(site) for site in updated_sites],
+        'deleted_site_ids': deleted_ids,
+        'server_time': watermark.isoformat() if watermark else None,
     })
-
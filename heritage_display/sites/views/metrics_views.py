@@ -0,0 +1,17 @@
+"""
+Performance metrics endpoint for staff (see sites/metrics.py)
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_http_methods
+
+from ..metrics import snapshot
+
+
+@never_cache
+@staff_member_required
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Per-view latency percentiles, query/template time and cache hit rates as JSON"""
+    return JsonResponse(snapshot())
@@ -1,15 +1,24 @@
 import streamlit as st
 import os
-from services import EmbeddingService, VectorStore
+import threading
+from services import EmbeddingService, create_vector_store
 from llm import OllamaLLM
 from pipeline import RAGPipeline
-from db_index import index_from_db
+from cache import AnswerCache
+from filters import FilterExtractor
+from rerank import create_reranker
+from index_versions import BuildStatus, IndexAlias, live_lexical_index, start_background_build
 from config import settings
 
 st.set_page_config(page_title="Heritage Insights", page_icon="🏛️", layout="wide")
 
 st.title("🏛️ Heritage Insights - World Heritage Knowledge Base")
 
+# Shared across sessions so repeated questions skip the LLM
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache()
+
 # Sidebar
 with st.sidebar:
     st.header("System Control")
@@ -20,21 +29,21 @@ with st.sidebar:
     
     st.divider()
     
-    # ETL Control
-    if st.button("🔄 Rebuild Index (ETL)"):
-        with st.status("Indexing in progress...", expanded=True) as status:
-            try:
-                st.write("Initializing database connection...")
-                db_url = settings.DATABASE_URL
-                
-                st.write("Reading data from Postgres and writing to vector store...")
-                # Note: This is a synchronous call, might take time
-                index_from_db(database_url=db_url)
-                status.update(label="Index build completed!", state="complete", expanded=False)
-                st.success("Data synchronization complete")
-            except Exception as e:
-                status.update(label="Index build failed", state="error")
-                st.error(f"Error: {e}")
+    # ETL Control: builds a new index version in the background; queries keep using
+    # the live version until the new one is swapped in
+    build = BuildStatus().read()
+    if st.button("🔄 Rebuild Index (ETL)", disabled=build.get('state') == 'running'):
+        start_background_build(database_url=settings.DATABASE_URL)
+        st.info("Index build started in the background.")
+        build = {'state': 'running', 'done': 0, 'total': None}
+
+    if build.get('state') == 'running':
+        done, total = build.get('done') or 0, build.get('total')
+        st.progress(done / total if total else 0.0,
+                    text=f"Building index v{build.get('version', '?')}: {done}/{total or '?'} sites")
+    elif build.get('state') == 'failed':
+        st.error(f"Last index build failed: {build.get('error')}")
+    st.caption(f"Live index: v{IndexAlias().current()['version']}")
 
     st.divider()
     st.markdown("""
@@ -43,7 +52,7 @@ with st.sidebar:
     
     **Features:**
     - RAG (Retrieval-Augmented Generation)
-    - Vector Search via ChromaDB
+    - Hybrid Search (vector + BM25)
     - LLM via Ollama
     """)
 
@@ -58,11 +67,23 @@ for message in st.session_state.messages:
 
 # Initialization (Lazy load)
 @st.cache_resource
-def get_pipeline(model_name, ollama_url):
-    embedding_service = EmbeddingService(model_name=settings.EMBEDDING_MODEL) 
-    vector_store = VectorStore(collection_name=settings.COLLECTION_NAME)
+def get_embedding_service():
+    return EmbeddingService(model_name=settings.EMBEDDING_MODEL)
+
+# keyed by the live index version, so a swapped-in build gets a fresh pipeline
+@st.cache_resource
+def get_pipeline(model_name, ollama_url, index_version):
+    # cached answers were generated from the previous index
+    get_answer_cache().invalidate()
+    embedding_service = get_embedding_service()
+    vector_store = create_vector_store()
     llm = OllamaLLM(model=model_name, base_url=ollama_url)
-    return RAGPipeline(embedding_service, vector_store, llm)
+    # load/pin the model in Ollama while the embedding side finishes starting up
+    threading.Thread(target=llm.warm, daemon=True).start()
+    return RAGPipeline(embedding_service, vector_store, llm, lexical_index=live_lexical_index(),
+                       answer_cache=get_answer_cache(),
+                       filter_extractor=FilterExtractor.from_vector_store(vector_store),
+                       reranker=create_reranker())
 
 # User Input
 if prompt := st.chat_input("Ask a question about World Heritage sites... (e.g., Where is the Great Wall?)"):
@@ -74,46 +95,40 @@ if prompt := st.chat_input("Ask a question about World Heritage sites... (e.g.,
         full_response = ""
         
         try:
-            pipeline = get_pipeline(model_name, ollama_url)
-            
-            # Step 1: Retrieval (We can do this explicitly if we want to show docs, or just call answer)
-            # For streaming, we need to adapt RAGPipeline a bit or just use llm.stream_generate with the prompt built by pipeline
+            pipeline = get_pipeline(model_name, ollama_url, IndexAlias().current()['version'])
             
-            # Replicating pipeline logic to support streaming:
-            q_emb = pipeline.embedding_service.embed_query(prompt)
-            raw_results = pipeline.vector_store.query(q_emb, n_results=3)
-            
-            # Parse results
+            # Retrieval, caching, prompt assembly and streaming all go through the pipeline
             docs = []
-            ids = raw_results.get('ids', [[]])[0]
-            documents = raw_results.get('documents', [[]])[0]
-            metadatas = raw_results.get('metadatas', [[]])[0]
-            
-            for i in range(len(ids or [])):
-                docs.append({
-                    'id': ids[i],
-                    'text': documents[i] if documents else '',
-                    'metadata': metadatas[i] if metadatas else {},
-                })
+            timings = {}
+            for event in pipeline.stream_answer(prompt, k=3):
+                if event['type'] == 'retrieval':
+                    docs = event['docs']
+                    if event['prompt_stats']:
+                        st.caption(f"Prompt: {event['prompt_stats']['prompt_tokens']} / {event['prompt_stats']['budget_tokens']} tokens")
+                elif event['type'] == 'token':
+                    full_response += event['text']
+                    response_placeholder.markdown(full_response + "▌")
+                elif event['type'] == 'error':
+                    st.error(event['message'])
+                elif event['type'] == 'done':
+                    timings = event['timings']
             
             if not docs:
                 full_response = "I couldn't find any relevant documents in the knowledge base. Please try a different query or rebuild the index."
                 response_placeholder.markdown(full_response)
             else:
-                final_prompt = pipeline._build_prompt(prompt, docs)
-                
-                # Call Streaming LLM
-                for chunk in pipeline.llm.stream_generate(final_prompt):
-                    full_response += chunk
-                    response_placeholder.markdown(full_response + "▌")
-                
                 response_placeholder.markdown(full_response)
+                if timings.get('ttft_ms') is not None:
+                    st.caption(f"Retrieval {timings['retrieval_ms']:.0f} ms · first token {timings['ttft_ms']:.0f} ms · total {timings['total_ms']:.0f} ms")
+                if 'rerank_ms' in timings:
+                    st.caption(f"Embed {timings['embed_ms']:.0f} ms · search {timings['search_ms']:.0f} ms · rerank {timings['rerank_ms']:.0f} ms"
+                               + (" (over budget, kept search order)" if timings['rerank_timed_out'] else ""))
                 
                 # Show sources in an expander
                 with st.expander("📚 View Retrieved Sources", expanded=False):
                     for idx, d in enumerate(docs):
                         st.markdown(f"**{idx+1}. {d.get('metadata', {}).get('source', d['id'])}**")
-                        st.caption(f"Relevance Distance: {raw_results['distances'][0][idx] if 'distances' in raw_results else 'N/A'}")
+                        st.caption(f"Relevance Distance: {d['distance'] if d.get('distance') is not None else 'N/A'}")
                         st.text(d['text'][:500] + "...")
                         
         except Exception as e:
@@ -0,0 +1,109 @@
+"""Batch question answering over a JSONL file of questions.
+
+Input lines look like `{"id": "q1", "q": "Where is the Great Wall?"}` (`question`
+is accepted for `q`; `id` defaults to the line number). Each output line is
+`{"id", "q", "answer", "sources", "prompt_tokens"}`.
+
+Questions are processed in chunks: one batched encode and one batched vector
+query per chunk, then LLM calls on a bounded thread pool. The output file is
+the checkpoint: answers are appended as they complete and ids already present
+are skipped on the next run, so an interrupted run resumes where it stopped.
+"""
+from typing import Dict, Iterator, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+
+
+def read_questions(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, encoding='utf-8') as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            q = row.get('q') or row.get('question')
+            if not q:
+                raise ValueError(f'{path}:{lineno}: missing "q"')
+            yield {'id': str(row.get('id', lineno)), 'q': q}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids answered in the checkpoint at `path`, repairing it for appending.
+
+    An interrupted run can leave a half-written last line (or, after a crash,
+    a corrupt one). Such lines are dropped and the file is rewritten with the
+    intact lines only, so the next append starts on a fresh line and the
+    question is answered again.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    kept, dirty = [], False
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                row_id = str(row['id'])
+            except (ValueError, KeyError, TypeError):
+                dirty = dirty or bool(line.strip())
+                continue
+            if not line.endswith('\n'):
+                # complete JSON but no newline: keep it, terminate it
+                line += '\n'
+                dirty = True
+            done.add(row_id)
+            kept.append(line)
+    if dirty:
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(tmp, path)
+    return done
+
+
+def run_batch(pipeline, input_path: str, output_path: str, k: int = 3, concurrency: int = 2,
+              chunk_size: int = 256, where: Optional[Dict] = None) -> Dict[str, int]:
+    """Answer every not-yet-answered question in `input_path`; returns counts.
+
+    `where` restricts retrieval for every question (see `filters.build_where`).
+    """
+    done = completed_ids(output_path)
+    questions = list(read_questions(input_path))
+    pending = [row for row in questions if row['id'] not in done]
+    stats = {'skipped': len(questions) - len(pending), 'answered': 0, 'failed': 0}
+
+    with open(output_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            queries = [row['q'] for row in chunk]
+            q_embs = pipeline.embedding_service.embed_documents(queries)
+            docs_per_query = pipeline.retrieve_batch(queries, k=k, query_embeddings=q_embs, where=where)
+
+            futures = {
+                pool.submit(pipeline.generate_answer, row['q'], docs, q_emb): (row, docs)
+                for row, docs, q_emb in zip(chunk, docs_per_query, q_embs)
+            }
+            for fut in as_completed(futures):
+                row, docs = futures[fut]
+                try:
+                    answer, prompt_stats = fut.result()
+                except Exception as e:
+                    stats['failed'] += 1
+                    print(f"Question {row['id']} failed: {e}")
+                    continue
+                if answer.startswith('Error'):
+                    # leave it out of the checkpoint so a rerun retries it
+                    stats['failed'] += 1
+                    print(f"Question {row['id']} failed: {answer}")
+                    continue
+                out.write(json.dumps({
+                    'id': row['id'],
+                    'q': row['q'],
+                    'answer': answer,
+                    'sources': [d['id'] for d in docs],
+                    'prompt_tokens': prompt_stats['prompt_tokens'] if prompt_stats else None,
+                }, ensure_ascii=False) + '\n')
+                out.flush()
+                stats['answered'] += 1
+            print(f"Answered {start + len(chunk)}/{len(pending)} pending questions")
+    return stats
@@ -0,0 +1,107 @@
+"""Throughput and retrieval-quality comparison of EmbeddingService backends.
+
+Embeds the heritage corpus with every backend, then for each site uses its name
+as a query and reports:
+  - docs_per_s:        indexing throughput (embed_documents over the corpus)
+  - query_ms_median:   single-query embed latency
+  - hit_at_k:          fraction of name queries whose own site is in the top-k
+  - overlap_at_k:      mean top-k overlap with the torch baseline neighbours
+  - hit_at_k_delta:    hit_at_k minus the torch baseline
+
+Usage:
+    python heritage_insights/benchmarks/bench_embedding_backends.py --database-url postgresql://...
+    python heritage_insights/benchmarks/bench_embedding_backends.py --corpus sites.jsonl --threads 4
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import EmbeddingService  # noqa: E402
+from db_index import fetch_sites, _build_doc_text  # noqa: E402
+
+
+def load_corpus(args):
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as f:
+            sites = [json.loads(line) for line in f if line.strip()]
+    else:
+        sites = list(fetch_sites(args.database_url))
+    if args.limit:
+        sites = sites[: args.limit]
+    return sites
+
+
+def _normalize(mat):
+    mat = np.asarray(mat, dtype=np.float32)
+    return mat / np.maximum(np.linalg.norm(mat, axis=1, keepdims=True), 1e-12)
+
+
+def run_backend(backend, threads, texts, queries, k):
+    emb = EmbeddingService(backend=backend, num_threads=threads)
+    emb.warmup()
+
+    start = time.perf_counter()
+    doc_vecs = _normalize(emb.embed_documents(texts))
+    index_s = time.perf_counter() - start
+
+    lat = []
+    q_vecs = []
+    for q in queries:
+        t0 = time.perf_counter()
+        q_vecs.append(emb.embed_query(q))
+        lat.append((time.perf_counter() - t0) * 1000)
+    q_vecs = _normalize(q_vecs)
+
+    topk = np.argsort(-(q_vecs @ doc_vecs.T), axis=1)[:, :k]
+    return {
+        'docs_per_s': len(texts) / index_s if index_s else None,
+        'query_ms_median': statistics.median(lat),
+        'topk': topk,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--corpus', help='JSONL of heritage_site rows instead of reading the database.')
+    parser.add_argument('--backends', default=','.join(EmbeddingService.BACKENDS))
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=0)
+    parser.add_argument('--output', help='Write results as JSON to this path.')
+    args = parser.parse_args()
+
+    sites = load_corpus(args)
+    texts = [_build_doc_text(s) for s in sites]
+    queries = [s.get('name', '') for s in sites]
+    truth = np.arange(len(sites))[:, None]
+
+    raw = {b: run_backend(b, args.threads, texts, queries, args.k) for b in args.backends.split(',')}
+    baseline = raw.get('torch')
+
+    results = {'corpus_size': len(sites), 'k': args.k, 'threads': args.threads, 'backends': {}}
+    for backend, r in raw.items():
+        hit = float((r['topk'] == truth).any(axis=1).mean())
+        row = {'docs_per_s': r['docs_per_s'], 'query_ms_median': r['query_ms_median'], 'hit_at_k': hit}
+        if baseline is not None:
+            overlap = [len(set(a) & set(b)) / args.k for a, b in zip(r['topk'], baseline['topk'])]
+            row['overlap_at_k'] = float(np.mean(overlap))
+            row['hit_at_k_delta'] = hit - float((baseline['topk'] == truth).any(axis=1).mean())
+        results['backends'][backend] = row
+
+    out = json.dumps(results, indent=2)
+    print(out)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Cold-start benchmark for the heritage_insights CLI.
+
+Measures, in fresh subprocesses:
+  - import_services: `import services` (should stay cheap now that torch/chromadb are lazy)
+  - query_cold:      `cli.py query --no-daemon` (import + model load + query)
+  - query_daemon:    `cli.py query` against a daemon started with `serve --warm`
+
+Usage:
+    python heritage_insights/benchmarks/bench_startup.py --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+INSIGHTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(INSIGHTS_DIR)
+CLI = os.path.join(INSIGHTS_DIR, 'cli.py')
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([REPO_ROOT, INSIGHTS_DIR, env.get('PYTHONPATH', '')])
+    return env
+
+
+def _time_cmd(cmd, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=INSIGHTS_DIR, env=_env(), check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'samples_s': samples}
+
+
+def _wait_for_daemon(socket_path, timeout):
+    sys.path.insert(0, INSIGHTS_DIR)
+    from daemon import request_daemon
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request_daemon({'op': 'ping'}, socket_path=socket_path, timeout=1.0)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f'daemon did not come up on {socket_path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--q', default='What is the Great Wall?')
+    parser.add_argument('--output', help='Write results as JSON to this path.')
+    args = parser.parse_args()
+
+    results = {
+        'import_services': _time_cmd([sys.executable, '-c', 'import services'], args.repeat),
+        'query_cold': _time_cmd([sys.executable, CLI, 'query', '--no-daemon', '--q', args.q], args.repeat),
+    }
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'bench.sock')
+    start = time.perf_counter()
+    daemon = subprocess.Popen([sys.executable, CLI, 'serve', '--warm', '--socket', socket_path],
+                              cwd=INSIGHTS_DIR, env=_env(), stdout=subprocess.DEVNULL)
+    try:
+        _wait_for_daemon(socket_path, timeout=300)
+        results['daemon_warmup_s'] = time.perf_counter() - start
+        results['query_daemon'] = _time_cmd([sys.executable, CLI, 'query', '--socket', socket_path, '--q', args.q], args.repeat)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    out = json.dumps(results, indent=2)
+    print(out)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Query latency of LocalVectorStore (exact / HNSW) against Chroma.
+
+Loads the same random unit vectors into every store and reports p50/p99 query
+latency in milliseconds, with and without a metadata pre-filter. Chroma runs
+with a temporary PersistentClient, or against CHROMA_HOST if that is set.
+
+Usage:
+    python heritage_insights/benchmarks/bench_vector_store.py --docs 5000 --queries 500
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import LocalVectorStore, VectorStore  # noqa: E402
+
+COUNTRIES = ['China', 'Peru', 'Italy', 'Kenya', 'India', 'France', 'Mexico', 'Egypt']
+
+
+def _latencies(store, queries, k, where):
+    lat = []
+    for q in queries:
+        kwargs = {'where': where} if where else {}
+        t0 = time.perf_counter()
+        store.query(q, n_results=k, **kwargs)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return {'p50_ms': float(np.percentile(lat, 50)), 'p99_ms': float(np.percentile(lat, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--skip-chroma', action='store_true')
+    parser.add_argument('--output', help='Write results as JSON to this path.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(args.docs, args.dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    ids = [f'site-{i}' for i in range(args.docs)]
+    texts = [f'Heritage site {i}' for i in range(args.docs)]
+    metas = [{'country': COUNTRIES[i % len(COUNTRIES)], 'source': texts[i]} for i in range(args.docs)]
+    queries = [v.tolist() for v in rng.normal(size=(args.queries, args.dim)).astype(np.float32)]
+    where = {'country': 'Peru'}
+
+    tmp = tempfile.mkdtemp()
+    stores = {
+        'local_exact': LocalVectorStore(persist_directory=os.path.join(tmp, 'exact'), collection_name='bench', hnsw_min_docs=0),
+        'local_hnsw': LocalVectorStore(persist_directory=os.path.join(tmp, 'hnsw'), collection_name='bench', hnsw_min_docs=1),
+    }
+    if not args.skip_chroma:
+        stores['chroma'] = VectorStore(persist_directory=os.path.join(tmp, 'chroma'), collection_name='bench')
+
+    results = {'docs': args.docs, 'dim': args.dim, 'k': args.k, 'stores': {}}
+    for name, store in stores.items():
+        t0 = time.perf_counter()
+        for i in range(0, args.docs, args.batch_size):
+            sl = slice(i, i + args.batch_size)
+            store.add_documents(ids=ids[sl], texts=texts[sl], embeddings=vecs[sl].tolist(), metadatas=metas[sl])
+        results['stores'][name] = {
+            'index_s': time.perf_counter() - t0,
+            'query': _latencies(store, queries, args.k, None),
+            'query_filtered': _latencies(store, queries, args.k, where),
+        }
+
+    out = json.dumps(results, indent=2)
+    print(out)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Deterministic fixture corpus and labeled questions for the benchmark suite.
+
+Rows follow the `heritage_site` schema (id, name, country, category,
+description_en, description_zh, content, metadata, updated_at), so they can be
+fed through `db_index._build_doc_text` exactly like database rows. The first
+rows are real sites; larger corpora are padded with generated distractors.
+"""
+from typing import Dict, List, Tuple
+import random
+
+SITES = [
+    ('Great Wall', 'China', 'Cultural', '长城', 'A series of fortifications built across northern China over many dynasties.'),
+    ('Mogao Caves', 'China', 'Cultural', '莫高窟', 'Buddhist cave temples near Dunhuang with a thousand years of murals.'),
+    ('Jiuzhaigou Valley', 'China', 'Natural', '九寨沟', 'A valley of multi-coloured lakes, waterfalls and karst formations in Sichuan.'),
+    ('Mount Taishan', 'China', 'Mixed', '泰山', 'A sacred mountain that has been a place of imperial worship for millennia.'),
+    ('Machu Picchu', 'Peru', 'Mixed', '马丘比丘', 'An Inca citadel set high in the Andes above the Urubamba valley.'),
+    ('Historic Centre of Lima', 'Peru', 'Cultural', '利马历史中心', 'The colonial capital of the Spanish viceroyalty of Peru.'),
+    ('Huascarán National Park', 'Peru', 'Natural', '瓦斯卡兰国家公园', 'Tropical mountain range with glaciers and the highest peak in Peru.'),
+    ('Kenya Lake System', 'Kenya', 'Natural', '肯尼亚湖泊系统', 'Alkaline lakes of the Great Rift Valley hosting flamingo populations.'),
+    ('Mount Kenya National Park', 'Kenya', 'Natural', '肯尼亚山国家公园', 'The second highest peak in Africa, an extinct volcano with glaciers.'),
+    ('Lamu Old Town', 'Kenya', 'Cultural', '拉穆古镇', 'The oldest and best preserved Swahili settlement in East Africa.'),
+    ('Colosseum', 'Italy', 'Cultural', '罗马斗兽场', 'The great amphitheatre of ancient Rome in the historic centre.'),
+    ('Dolomites', 'Italy', 'Natural', '多洛米蒂山脉', 'Mountain range in the northern Italian Alps with vertical limestone walls.'),
+    ('Venice and its Lagoon', 'Italy', 'Cultural', '威尼斯及其潟湖', 'A city built on islands in a lagoon, with canals instead of streets.'),
+    ('Taj Mahal', 'India', 'Cultural', '泰姬陵', 'A white marble mausoleum in Agra built by a Mughal emperor for his wife.'),
+    ('Kaziranga National Park', 'India', 'Natural', '卡齐兰加国家公园', 'Floodplain grasslands home to the largest population of one-horned rhinoceros.'),
+    ('Ellora Caves', 'India', 'Cultural', '埃洛拉石窟', 'Rock-cut Buddhist, Hindu and Jain monasteries and temples in Maharashtra.'),
+    ('Mont-Saint-Michel', 'France', 'Cultural', '圣米歇尔山', 'A Gothic abbey on a tidal island off the coast of Normandy.'),
+    ('Palace of Versailles', 'France', 'Cultural', '凡尔赛宫', 'The principal royal residence of France with vast formal gardens.'),
+    ('Pre-Hispanic City of Teotihuacán', 'Mexico', 'Cultural', '特奥蒂瓦坎古城', 'An ancient city with the Pyramids of the Sun and the Moon.'),
+    ('Sian Ka’an', 'Mexico', 'Natural', '锡安卡安', 'Tropical forests, mangroves and a barrier reef on the Yucatán coast.'),
+    ('Memphis and its Necropolis', 'Egypt', 'Cultural', '孟菲斯及其墓地', 'The pyramid fields from Giza to Dahshur, capital of the Old Kingdom.'),
+    ('Wadi Al-Hitan', 'Egypt', 'Natural', '鲸鱼峡谷', 'Whale Valley, with fossil remains of the earliest suborder of whales.'),
+    ('Grand Canyon National Park', 'United States of America', 'Natural', '大峡谷国家公园', 'A gorge carved by the Colorado River, over a kilometre deep.'),
+    ('Statue of Liberty', 'United States of America', 'Cultural', '自由女神像', 'A copper statue at the entrance of New York harbour.'),
+    ('Great Barrier Reef', 'Australia', 'Natural', '大堡礁', 'The largest coral reef system in the world, off Queensland.'),
+    ('Sydney Opera House', 'Australia', 'Cultural', '悉尼歌剧院', 'A twentieth-century performing arts centre with sail-like shells.'),
+]
+
+
+def build_corpus(n_sites: int = 0, seed: int = 0) -> List[Dict]:
+    """Return heritage_site-shaped rows: the real sites plus generated distractors up to `n_sites`."""
+    rows = []
+    for i, (name, country, category, name_zh, desc) in enumerate(SITES, start=1):
+        rows.append(_row(i, name, country, category, desc, f'{name_zh}位于{country}。{desc}'))
+
+    rng = random.Random(seed)
+    countries = sorted({s[1] for s in SITES})
+    words = ('ancient', 'temple', 'river', 'forest', 'fortress', 'village', 'terraces', 'monastery',
+             'archaeological', 'landscape', 'coastal', 'desert', 'volcanic', 'royal', 'tombs', 'gardens')
+    for i in range(len(rows) + 1, n_sites + 1):
+        name = f"{rng.choice(words).title()} {rng.choice(words).title()} Site {i}"
+        country = rng.choice(countries)
+        category = rng.choice(('Cultural', 'Natural', 'Mixed'))
+        desc = ' '.join(rng.choice(words) for _ in range(20)) + '.'
+        rows.append(_row(i, name, country, category, desc, f'遗产地{i}位于{country}。'))
+    return rows
+
+
+def _row(i, name, country, category, desc_en, desc_zh) -> Dict:
+    return {
+        'id': str(i),
+        'name': name,
+        'country': country,
+        'category': category,
+        'description_en': desc_en,
+        'description_zh': desc_zh,
+        'content': f'{name} is a World Heritage site in {country}. {desc_en}',
+        'metadata': {'url': f'https://whc.unesco.org/en/list/{i}/'},
+        'updated_at': '2026-01-01T00:00:00',
+    }
+
+
+def build_questions() -> List[Tuple[str, List[str]]]:
+    """Labeled questions over the real sites: `(question, relevant_ids)`."""
+    by_name = {s[0]: str(i) for i, s in enumerate(SITES, start=1)}
+    questions = [
+        ('Where is the Great Wall?', [by_name['Great Wall']]),
+        ('Tell me about the Mogao Caves', [by_name['Mogao Caves']]),
+        ('莫高窟在哪里？', [by_name['Mogao Caves']]),
+        ('Inca citadel in the Andes', [by_name['Machu Picchu']]),
+        ('Which lakes host flamingos in the Rift Valley?', [by_name['Kenya Lake System']]),
+        ('Roman amphitheatre', [by_name['Colosseum']]),
+        ('white marble mausoleum in Agra', [by_name['Taj Mahal']]),
+        ('one-horned rhinoceros habitat', [by_name['Kaziranga National Park']]),
+        ('abbey on a tidal island', [by_name['Mont-Saint-Michel']]),
+        ('Pyramids of the Sun and the Moon', [by_name['Pre-Hispanic City of Teotihuacán']]),
+        ('fossil whales in Egypt', [by_name['Wadi Al-Hitan']]),
+        ('largest coral reef', [by_name['Great Barrier Reef']]),
+        ('泰姬陵', [by_name['Taj Mahal']]),
+        ('Natural heritage sites in Kenya',
+         [str(i) for i, s in enumerate(SITES, start=1) if s[1] == 'Kenya' and s[2] == 'Natural']),
+        ('Heritage sites in Peru', [str(i) for i, s in enumerate(SITES, start=1) if s[1] == 'Peru']),
+    ]
+    return questions
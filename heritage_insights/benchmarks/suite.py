@@ -0,0 +1,197 @@
+"""Retrieval quality and latency benchmark suite.
+
+Indexes the fixture corpus (`fixtures.build_corpus`) with each configuration
+and runs the labeled questions through `RAGPipeline.retrieve`, reporting:
+
+  - recall_at_k, mrr           retrieval quality over the labeled questions
+  - index_docs_per_s           embed + add throughput
+  - query_p50_ms, query_p95_ms retrieve() latency
+  - rss_mb, peak_rss_mb        resident memory after the run and its peak
+
+Each configuration runs in a fresh subprocess (spawned), so the memory figures
+belong to that configuration alone rather than to whichever configuration
+before it used the most; `--in-process` skips this for debugging, at the cost
+of meaningless memory figures.
+
+A configuration is `<embedding>:<store>[:hybrid][:filters][:lang]`, where
+embedding is one of `EmbeddingService.BACKENDS` or `hashing` (a dependency-free
+bag-of-words baseline), store is `local`, `local-hnsw` or `chroma`, `hybrid`
+adds the BM25 index with reciprocal rank fusion, `filters` extracts
+country/category filters from the questions and `lang` indexes per-language
+documents and routes each question to its language (`LANGUAGE_PARTITIONS`).
+Set `EMBEDDING_MODEL` to compare e.g. a multilingual model.
+
+Usage:
+    python heritage_insights/benchmarks/suite.py --configs torch:local,torch:local:hybrid,onnx-int8:chroma \\
+        --sites 2000 --k 5 --output results/$(date +%F).json
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import argparse
+import datetime
+import multiprocessing
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+INSIGHTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, INSIGHTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services import EmbeddingService, LocalVectorStore, VectorStore  # noqa: E402
+from lexical import LexicalIndex, tokenize  # noqa: E402
+from llm import MockLLM  # noqa: E402
+from pipeline import RAGPipeline  # noqa: E402
+from db_index import index_sites  # noqa: E402
+from filters import FilterExtractor  # noqa: E402
+from fixtures import build_corpus, build_questions  # noqa: E402
+
+
+class HashingEmbedding:
+    """Bag-of-words feature hashing; a model-free baseline for the harness."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for tok in tokenize(text):
+                out[row, int(hashlib.md5(tok.encode('utf-8')).hexdigest(), 16) % self.dim] += 1.0
+        return out.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _peak_rss_mb() -> float:
+    # KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _build(config: str, workdir: str):
+    parts = config.split(':')
+    embedding, store = parts[0], parts[1] if len(parts) > 1 else 'local'
+    hybrid = 'hybrid' in parts[2:]
+
+    emb = HashingEmbedding() if embedding == 'hashing' else EmbeddingService(backend=embedding)
+    path = os.path.join(workdir, config.replace(':', '_'))
+    if store == 'local':
+        vs = LocalVectorStore(persist_directory=path, collection_name='bench', hnsw_min_docs=0)
+    elif store == 'local-hnsw':
+        vs = LocalVectorStore(persist_directory=path, collection_name='bench', hnsw_min_docs=1)
+    elif store == 'chroma':
+        vs = VectorStore(persist_directory=path, collection_name='bench')
+    else:
+        raise ValueError(f'unknown store {store!r} in {config!r}')
+    lexical = LexicalIndex(path=None) if hybrid else None
+    return emb, vs, lexical
+
+
+def run_config(config: str, corpus: List[Dict], questions, k: int, workdir: str) -> Dict:
+    emb, vs, lexical = _build(config, workdir)
+
+    options = config.split(':')[2:]
+    start = time.perf_counter()
+    index_sites(corpus, emb, vs, lexical, per_language='lang' in options)
+    index_s = time.perf_counter() - start
+
+    extractor = FilterExtractor.from_vector_store(vs) if 'filters' in options else None
+    pipeline = RAGPipeline(emb, vs, MockLLM(), lexical_index=lexical, filter_extractor=extractor,
+                           language_routing='lang' in options)
+    latencies, hits, reciprocal_ranks = [], [], []
+    for question, relevant in questions:
+        t0 = time.perf_counter()
+        docs = pipeline.retrieve(question, k=k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        # per-language documents are "<site id>:<lang>"; score by site
+        ranked = list(dict.fromkeys(d['metadata'].get('site_id', d['id']) for d in docs))
+        hits.append(len(set(ranked) & set(relevant)) / min(len(relevant), k))
+        first = next((rank for rank, doc_id in enumerate(ranked, start=1) if doc_id in relevant), None)
+        reciprocal_ranks.append(1.0 / first if first else 0.0)
+
+    return {
+        'recall_at_k': float(np.mean(hits)),
+        'mrr': float(np.mean(reciprocal_ranks)),
+        'index_docs_per_s': len(corpus) / index_s if index_s else None,
+        'query_p50_ms': float(np.percentile(latencies, 50)),
+        'query_p95_ms': float(np.percentile(latencies, 95)),
+        'rss_mb': _rss_mb(),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _run_isolated(config: str, n_sites: int, k: int, workdir: str) -> Dict:
+    # runs in a spawned child: build the (deterministic) fixtures here rather than pickling them
+    return run_config(config, build_corpus(n_sites), build_questions(), k, workdir)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=INSIGHTS_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return ''
+
+
+def run_suite(configs: List[str], n_sites: int = 0, k: int = 5, isolate: bool = True) -> Dict:
+    corpus = build_corpus(n_sites)
+    questions = build_questions()
+    workdir = tempfile.mkdtemp(prefix='heritage_bench_')
+    results = {}
+    for config in configs:
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results[config] = pool.submit(_run_isolated, config, n_sites, k, workdir).result()
+        else:
+            results[config] = run_config(config, corpus, questions, k, workdir)
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'corpus_size': len(corpus),
+        'questions': len(questions),
+        'k': k,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default='torch:local,torch:local:hybrid')
+    parser.add_argument('--sites', type=int, default=0, help='Pad the corpus with generated distractors up to this size.')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--output', help='Write results as JSON to this path.')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run every configuration in this process (memory figures are then not comparable).')
+    args = parser.parse_args()
+
+    results = run_suite(args.configs.split(','), n_sites=args.sites, k=args.k, isolate=not args.in_process)
+    out = json.dumps(results, indent=2)
+    print(out)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Answer cache in front of the LLM.
+
+An entry is keyed by the normalized question plus a fingerprint of the
+retrieved context: the ids of the retrieved docs and their `updated_at`
+metadata. A re-crawled site therefore changes the fingerprint and misses the
+cache on its own, without explicit invalidation.
+
+With `similarity_threshold` set, a question that misses exactly can still hit
+an entry with the same context fingerprint whose query embedding has cosine
+similarity >= threshold ("Where is the Great Wall" vs "Where's the Great Wall?").
+
+Entries expire after `ttl_seconds` and the least recently used entry is
+evicted beyond `max_entries`. `invalidate()` drops everything and is called
+when the index is rebuilt.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from config import settings
+
+_TRAILING_PUNCT_RE = re.compile(r'[\s?!.。？！]+$')
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize('NFKC', query or '').lower()
+    text = ' '.join(text.split())
+    return _TRAILING_PUNCT_RE.sub('', text)
+
+
+def context_fingerprint(docs: List[Dict[str, Any]]) -> str:
+    parts = []
+    for d in docs:
+        meta = d.get('metadata') or {}
+        parts.append(f"{d.get('id')}@{meta.get('updated_at', '')}")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    """Thread-safe TTL + LRU cache of generated answers (see module docstring)."""
+
+    def __init__(self, max_entries: int = settings.ANSWER_CACHE_SIZE, ttl_seconds: float = settings.ANSWER_CACHE_TTL,
+                 similarity_threshold: float = settings.ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # key -> (answer, created_at, fingerprint, normalized query embedding or None)
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        v = np.asarray(embedding, dtype=np.float32)
+        return v / max(float(np.linalg.norm(v)), 1e-12)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, query: str, docs: List[Dict[str, Any]], query_embedding=None) -> Optional[str]:
+        fingerprint = context_fingerprint(docs)
+        key = (normalize_query(query), fingerprint)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1], now):
+                del self._entries[key]
+                entry = None
+            if entry is None and self.similarity_threshold and query_embedding is not None:
+                entry_key = self._nearest(fingerprint, self._unit(query_embedding), now)
+                if entry_key is not None:
+                    key, entry = entry_key, self._entries[entry_key]
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _nearest(self, fingerprint: str, q: np.ndarray, now: float) -> Optional[Tuple[str, str]]:
+        best_key, best_sim = None, self.similarity_threshold
+        for key, (_, created_at, fp, emb) in self._entries.items():
+            if fp != fingerprint or emb is None or self._expired(created_at, now):
+                continue
+            sim = float(emb @ q)
+            if sim >= best_sim:
+                best_key, best_sim = key, sim
+        return best_key
+
+    def put(self, query: str, docs: List[Dict[str, Any]], answer: str, query_embedding=None) -> None:
+        fingerprint = context_fingerprint(docs)
+        key = (normalize_query(query), fingerprint)
+        with self._lock:
+            self._entries[key] = (answer, time.time(), fingerprint, self._unit(query_embedding))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,12 +1,17 @@
 """
 Simple CLI to index plain text files and run a query against the local Chroma collection.
+
+`query` talks to a running `serve` daemon when one is listening, so repeated
+queries skip the model load.
 """
 import argparse
 import os
+import sys
 from pathlib import Path
 from typing import List
 
-from heritage_insights.services import EmbeddingService, VectorStore
+from heritage_insights.config import settings
+from heritage_insights.services import EmbeddingService, create_vector_store
 
 
 def load_text_files(data_dir: str) -> List[dict]:
@@ -27,19 +32,83 @@ def cmd_index(args):
     emb = EmbeddingService()
     embeddings = emb.embed_documents(texts)
 
-    vs = VectorStore()
+    vs = create_vector_store()
     vs.add_documents(ids=ids, texts=texts, embeddings=embeddings, metadatas=metadatas)
     print(f"Indexed {len(ids)} documents into collection.")
 
 
 def cmd_query(args):
+    from heritage_insights.filters import build_where
+
+    where = build_where(args.country, args.category, args.language)
+    if not args.no_daemon:
+        # Prefer a warm daemon; fall back to an in-process model load if none is running
+        from heritage_insights.daemon import DaemonError, query_daemon
+        try:
+            print(query_daemon(args.q, k=args.k, socket_path=args.socket, where=where))
+            return
+        except OSError:
+            pass
+        except DaemonError as e:
+            print(f"Daemon error ({e}); querying in-process instead.", file=sys.stderr)
+
     emb = EmbeddingService()
-    vs = VectorStore()
+    vs = create_vector_store()
     q_emb = emb.embed_query(args.q)
-    res = vs.query(q_emb, n_results=args.k)
+    res = vs.query(q_emb, n_results=args.k, where=where)
     print(res)
 
 
+def cmd_serve(args):
+    from heritage_insights.daemon import QueryDaemon
+
+    daemon = QueryDaemon(socket_path=args.socket)
+    if args.warm:
+        daemon.warmup()
+    print(f"Query daemon listening on {args.socket}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_batch(args):
+    from heritage_insights.batch import run_batch
+    from heritage_insights.cache import AnswerCache
+    from heritage_insights.filters import build_where
+    from heritage_insights.index_versions import live_lexical_index
+    from heritage_insights.llm import MockLLM, OllamaLLM
+    from heritage_insights.pipeline import RAGPipeline
+    from heritage_insights.rerank import create_reranker
+
+    llm = MockLLM() if args.llm == 'mock' else OllamaLLM(max_concurrency=args.concurrency)
+    pipeline = RAGPipeline(EmbeddingService(), create_vector_store(), llm,
+                           lexical_index=live_lexical_index(), answer_cache=AnswerCache(),
+                           reranker=create_reranker())
+    stats = run_batch(pipeline, args.input, args.output, k=args.k, concurrency=args.concurrency,
+                      chunk_size=args.chunk_size,
+                      where=build_where(args.country, args.category, args.language))
+    print(f"Done: {stats['answered']} answered, {stats['failed']} failed, {stats['skipped']} already in {args.output}")
+
+
+def cmd_reindex(args):
+    from heritage_insights.index_versions import BuildInProgress, BuildStatus, build_index_version
+
+    if args.status:
+        print(BuildStatus().read())
+        return
+    try:
+        build_index_version(database_url=args.database_url, batch_size=args.batch_size, keep=args.keep)
+    except BuildInProgress as e:
+        raise SystemExit(str(e))
+
+
+def _add_filter_arguments(parser):
+    parser.add_argument('--country', help='Only retrieve sites in this country (as stored, e.g. "Kenya").')
+    parser.add_argument('--category', choices=['Cultural', 'Natural', 'Mixed'])
+    parser.add_argument('--language', choices=['en', 'zh'], help='Only retrieve sites with a description in this language.')
+
+
 def main():
     parser = argparse.ArgumentParser(description="heritage_insights simple CLI")
     sub = parser.add_subparsers(dest='cmd')
@@ -51,9 +120,34 @@ def main():
     p_index_db.add_argument('--database-url', required=False, help='SQLAlchemy database URL. If omitted will read DATABASE_URL env var.')
     p_index_db.add_argument('--batch-size', required=False, type=int, default=64)
 
+    p_reindex = sub.add_parser('reindex', help='Build a new index version from the database and swap it in.')
+    p_reindex.add_argument('--database-url', required=False, help='SQLAlchemy database URL. If omitted will read DATABASE_URL env var.')
+    p_reindex.add_argument('--batch-size', type=int, default=64)
+    p_reindex.add_argument('--keep', type=int, default=settings.INDEX_KEEP_VERSIONS, help='Versions to keep, the live one included.')
+    p_reindex.add_argument('--status', action='store_true', help='Print the progress of the current/last build and exit.')
+
+    p_worker = sub.add_parser('index-worker', help='Rebuild the index whenever a crawl completes (Redis queue).')
+    p_worker.add_argument('--batch-size', type=int, default=64)
+
     p_query = sub.add_parser('query')
     p_query.add_argument('--q', required=True)
     p_query.add_argument('--k', type=int, default=3)
+    p_query.add_argument('--socket', default=settings.QUERY_SOCKET_PATH, help='Unix socket of a running query daemon.')
+    p_query.add_argument('--no-daemon', action='store_true', help='Always load the model in-process.')
+    _add_filter_arguments(p_query)
+
+    p_serve = sub.add_parser('serve', help='Run a long-lived query daemon holding a warm model.')
+    p_serve.add_argument('--socket', default=settings.QUERY_SOCKET_PATH)
+    p_serve.add_argument('--warm', action='store_true', help='Pre-load model and collection and run a dummy encode before serving.')
+
+    p_batch = sub.add_parser('batch', help='Answer a JSONL file of questions; re-running resumes from the output file.')
+    p_batch.add_argument('--input', required=True, help='JSONL with {"id": ..., "q": ...} per line.')
+    p_batch.add_argument('--output', required=True, help='JSONL answers; doubles as the resume checkpoint.')
+    p_batch.add_argument('--k', type=int, default=3)
+    p_batch.add_argument('--concurrency', type=int, default=settings.OLLAMA_MAX_CONCURRENCY, help='Parallel LLM calls.')
+    p_batch.add_argument('--chunk-size', type=int, default=256, help='Questions embedded/retrieved per batch.')
+    p_batch.add_argument('--llm', choices=['ollama', 'mock'], default='ollama')
+    _add_filter_arguments(p_batch)
 
     args = parser.parse_args()
     if args.cmd == 'index':
@@ -62,8 +156,17 @@ def main():
         # index from database directly
         from heritage_insights.db_index import index_from_db
         index_from_db(database_url=getattr(args, 'database_url', None), batch_size=getattr(args, 'batch_size', 64))
+    elif args.cmd == 'reindex':
+        cmd_reindex(args)
+    elif args.cmd == 'index-worker':
+        from heritage_insights.index_versions import run_reindex_worker
+        run_reindex_worker(batch_size=args.batch_size)
     elif args.cmd == 'query':
         cmd_query(args)
+    elif args.cmd == 'serve':
+        cmd_serve(args)
+    elif args.cmd == 'batch':
+        cmd_batch(args)
     else:
         parser.print_help()
 
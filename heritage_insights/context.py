@@ -0,0 +1,136 @@
+"""Token-budgeted context assembly for RAG prompts.
+
+Instead of pasting a fixed number of characters per retrieved document, the
+assembler splits the documents into sentences, drops duplicated sentences
+(overlapping passages from neighbouring docs), ranks the rest by overlap with
+the query and packs the best ones into the model's prompt budget. Prompt size,
+and with it Ollama prefill time, is then bounded by config rather than by `k`.
+
+Token counts are estimated (about 4 characters per token for Latin text, one
+token per CJK character) so no tokenizer has to be loaded; pass
+`token_counter` to use an exact one.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import math
+import re
+
+from config import settings
+from lexical import tokenize
+
+_CJK_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+_SENTENCE_RE = re.compile(r'[^\n.!?。！？]+[.!?。！？]*')
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def context_window_for(model: Optional[str]) -> int:
+    """Context window (tokens) configured for an Ollama model name such as `llama3.2:3b`."""
+    if model:
+        windows = settings.MODEL_CONTEXT_TOKENS
+        if model in windows:
+            return windows[model]
+        base = model.split(':')[0]
+        if base in windows:
+            return windows[base]
+    return settings.DEFAULT_CONTEXT_TOKENS
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.findall(text or '') if s.strip()]
+
+
+class ContextAssembler:
+    """Selects document sentences that fit a prompt token budget (see module docstring)."""
+
+    def __init__(self, context_window: int = settings.DEFAULT_CONTEXT_TOKENS,
+                 reserved_tokens: int = settings.ANSWER_RESERVED_TOKENS,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        self.context_window = context_window
+        self.reserved_tokens = reserved_tokens
+        self.count_tokens = token_counter
+
+    @classmethod
+    def for_model(cls, model: Optional[str], **kwargs) -> 'ContextAssembler':
+        return cls(context_window=context_window_for(model), **kwargs)
+
+    @property
+    def budget(self) -> int:
+        """Tokens available for the whole prompt (window minus room for the answer)."""
+        return max(self.context_window - self.reserved_tokens, 0)
+
+    def select(self, query: str, docs: List[Dict[str, Any]], budget: int) -> Tuple[List[Tuple[Dict[str, Any], str]], Dict[str, int]]:
+        """Return `[(doc, trimmed_text), ...]` in retrieval order plus selection stats."""
+        q_terms = set(tokenize(query))
+        seen = set()
+        candidates = []
+        duplicates = 0
+        for rank, d in enumerate(docs):
+            body = d.get('documents') or d.get('document') or d.get('text') or ''
+            for pos, sent in enumerate(split_sentences(body)):
+                key = ' '.join(sent.lower().split())
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                terms = set(tokenize(sent))
+                score = len(q_terms & terms) / math.sqrt(len(terms) + 1)
+                # lead sentences (name/country lines) and better-ranked docs break ties
+                score += 0.2 / (pos + 1) + 0.1 / (rank + 1)
+                candidates.append((score, rank, pos, sent, self.count_tokens(sent) + 1))
+
+        chosen, used = [], 0
+        for cand in sorted(candidates, key=lambda c: c[0], reverse=True):
+            if used + cand[4] <= budget:
+                chosen.append(cand)
+                used += cand[4]
+
+        by_doc: Dict[int, List[tuple]] = {}
+        for cand in chosen:
+            by_doc.setdefault(cand[1], []).append(cand)
+        selected = []
+        for rank in sorted(by_doc):
+            sents = sorted(by_doc[rank], key=lambda c: c[2])
+            selected.append((docs[rank], ' '.join(c[3] for c in sents)))
+
+        stats = {
+            'sentences_used': len(chosen),
+            'sentences_dropped': len(candidates) - len(chosen),
+            'duplicates_dropped': duplicates,
+            'docs_used': len(selected),
+        }
+        return selected, stats
+
+    def build(self, query: str, docs: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+        """Assemble the full RAG prompt; returns `(prompt, stats)`."""
+        head = [
+            "You are an assistant that answers questions using the supplied documents.",
+            "=== Documents ===",
+        ]
+        tail = [
+            "=== End Documents ===",
+            f"Question: {query}",
+            "Answer concisely and cite sources.",
+        ]
+        overhead = self.count_tokens("\n".join(head + tail))
+        # per-doc "[i] title: " prefixes
+        overhead += sum(self.count_tokens(f"[{i}] {self._title(d)}: ") for i, d in enumerate(docs, start=1))
+
+        selected, stats = self.select(query, docs, max(self.budget - overhead, 0))
+        parts = list(head)
+        for i, (d, text) in enumerate(selected, start=1):
+            parts.append(f"[{i}] {self._title(d)}: {text}")
+        parts.extend(tail)
+        prompt = "\n".join(parts)
+
+        stats.update(prompt_tokens=self.count_tokens(prompt), budget_tokens=self.budget,
+                     context_window=self.context_window)
+        return prompt, stats
+
+    @staticmethod
+    def _title(d: Dict[str, Any]) -> str:
+        return (d.get('metadata') or {}).get('source') or d.get('id')
@@ -0,0 +1,150 @@
+"""Long-lived local query daemon for heritage_insights.
+
+The daemon keeps one `EmbeddingService` and `VectorStore` loaded and answers
+queries over a Unix domain socket, so a CLI invocation only pays for a socket
+round-trip instead of importing torch and loading the model.
+
+Protocol: one JSON object per line in each direction.
+
+    -> {"op": "query", "q": "What is the Great Wall?", "k": 3}
+    <- {"ok": true, "result": {"ids": [[...]], "documents": [[...]], ...}}
+
+    -> {"op": "ping"}
+    <- {"ok": true}
+"""
+from typing import Any, Dict, Optional
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from config import settings
+
+
+def _json_default(obj: Any):
+    # Chroma may hand back numpy arrays (e.g. embeddings) inside the result dict
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+class QueryDaemon:
+    """Holds warm services and dispatches JSON requests to them."""
+
+    def __init__(self, socket_path: str = settings.QUERY_SOCKET_PATH, embedding_service=None, vector_store=None):
+        self.socket_path = socket_path
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self._load_lock = threading.Lock()
+        # encode() already uses every core; serialize callers instead of oversubscribing
+        self._encode_lock = threading.Lock()
+        self._server: Optional[socketserver.BaseServer] = None
+        # a store we opened ourselves follows the index alias; an injected one is left alone
+        self._index_version: Optional[int] = None
+
+    def _ensure_loaded(self):
+        with self._load_lock:
+            from index_versions import IndexAlias
+            from services import EmbeddingService, create_vector_store
+
+            if self.embedding_service is None:
+                self.embedding_service = EmbeddingService()
+            if self.vector_store is None or self._index_version is not None:
+                live = IndexAlias().current()
+                if live['version'] != self._index_version:
+                    self.vector_store = create_vector_store(collection_name=live['collection'])
+                    self._index_version = live['version']
+
+    def warmup(self) -> None:
+        """Load the model and collection up front and run a dummy encode."""
+        self._ensure_loaded()
+        with self._encode_lock:
+            self.embedding_service.warmup()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'query':
+            q = request.get('q')
+            if not q:
+                return {'ok': False, 'error': 'missing "q"'}
+            self._ensure_loaded()
+            with self._encode_lock:
+                q_emb = self.embedding_service.embed_query(q)
+            kwargs = {'where': request['where']} if request.get('where') else {}
+            res = self.vector_store.query(q_emb, n_results=int(request.get('k', 3)), **kwargs)
+            return {'ok': True, 'result': res}
+        return {'ok': False, 'error': f'unknown op: {op}'}
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve until `shutdown()` is called."""
+        if os.path.exists(self.socket_path):
+            # stale socket from a previous run
+            os.unlink(self.socket_path)
+        self._server = _DaemonServer(self.socket_path, _DaemonHandler)
+        self._server.daemon = self
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                resp = self.server.daemon.handle(json.loads(line))
+            except Exception as e:
+                resp = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(resp, default=_json_default).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DaemonError(RuntimeError):
+    """The daemon answered with an error, or with something that is not a response."""
+
+
+def request_daemon(payload: Dict[str, Any], socket_path: str = settings.QUERY_SOCKET_PATH, timeout: float = 60.0) -> Dict[str, Any]:
+    """Send one request to a running daemon.
+
+    Raises:
+        OSError: if no daemon is listening on `socket_path`.
+        DaemonError: if the daemon reports an error or breaks the protocol.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise DaemonError('daemon closed the connection without a response')
+    try:
+        resp = json.loads(line)
+    except ValueError as e:
+        raise DaemonError(f'invalid daemon response: {e}') from e
+    if not isinstance(resp, dict):
+        raise DaemonError('invalid daemon response: not a JSON object')
+    if not resp.get('ok'):
+        raise DaemonError(resp.get('error', 'unknown daemon error'))
+    return resp
+
+
+def query_daemon(q: str, k: int = 3, socket_path: str = settings.QUERY_SOCKET_PATH,
+                 where: Optional[Dict] = None) -> Dict[str, Any]:
+    """Run a vector query through the daemon and return the raw Chroma result."""
+    return request_daemon({'op': 'query', 'q': q, 'k': k, 'where': where}, socket_path=socket_path)['result']
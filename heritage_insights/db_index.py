@@ -1,5 +1,5 @@
 """
-Direct DB indexer: read rows from `heritage_site` table and index into Chroma via `VectorStore`.
+Direct DB indexer: read rows from `heritage_site` table and index into the configured vector store (Chroma or `LocalVectorStore`).
 
 Usage:
     from heritage_insights.db_index import index_from_db
@@ -8,25 +8,27 @@ Usage:
 Environment:
     Pass `DATABASE_URL` or provide `database_url` argument.
 """
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Tuple
 import math
 import os
 from sqlalchemy import create_engine, text
 
-from services import EmbeddingService, VectorStore
+from services import EmbeddingService, create_vector_store
+from lexical import LexicalIndex
+from filters import LANGUAGES
 from config import settings
 
 
 def fetch_sites(db_url: str):
     """Yield site rows from `heritage_site` table as dicts.
 
-    Fields returned: id, name, country, category, description_en, description_zh, content, metadata
+    Fields returned: id, name, country, category, description_en, description_zh, content, metadata, updated_at
     """
     engine = create_engine(db_url)
     with engine.connect() as conn:
         # fetch primary key and text fields
         q = text(
-            "SELECT id, name, country, category, description_en, description_zh, content, metadata FROM heritage_site"
+            "SELECT id, name, country, category, description_en, description_zh, content, metadata, updated_at FROM heritage_site"
         )
         result = conn.execute(q).mappings()
         for row in result:
@@ -39,12 +41,13 @@ def fetch_sites(db_url: str):
                 'description_zh': row['description_zh'] or '',
                 'content': row['content'] or '',
                 'metadata': row['metadata'] or {},
+                'updated_at': row['updated_at'].isoformat() if row['updated_at'] else '',
             }
 
 
 import json
 
-def _build_doc_text(site: Dict) -> str:
+def _build_doc_text(site: Dict, language: Optional[str] = None) -> str:
     # Serialize metadata to string if it exists
     meta_str = ""
     if site.get('metadata'):
@@ -62,16 +65,104 @@ def _build_doc_text(site: Dict) -> str:
         f"Name: {site.get('name', '')}",
         f"Country: {site.get('country', '')}",
         f"Category: {site.get('category', '')}",
-        f"Description (EN): {site.get('description_en', '')}",
-        f"Description (ZH): {site.get('description_zh', '')}",
-        f"Content: {site.get('content', '')}",
-        f"Metadata: {meta_str}"
     ]
+    if language is None:
+        parts += [
+            f"Description (EN): {site.get('description_en', '')}",
+            f"Description (ZH): {site.get('description_zh', '')}",
+            f"Content: {site.get('content', '')}",
+        ]
+    elif language == 'zh':
+        parts.append(f"Description (ZH): {site.get('description_zh', '')}")
+    else:
+        # the crawled page content is English
+        parts += [
+            f"Description (EN): {site.get('description_en', '')}",
+            f"Content: {site.get('content', '')}",
+        ]
+    parts.append(f"Metadata: {meta_str}")
     return "\n".join(part for part in parts if part).strip()
 
 
-def index_from_db(database_url: Optional[str] = None, batch_size: int = 64, collection_name: str = settings.COLLECTION_NAME):
-    """Index all rows from DB into vector store.
+def _build_metadata(site: Dict) -> Dict:
+    # Sanitize metadata: ChromaDB does not support None values
+    raw_meta = site.get('metadata', {})
+    if not isinstance(raw_meta, dict):
+        raw_meta = {}
+    # Filter out None values and ensure types are supported
+    clean_meta = {k: v for k, v in raw_meta.items() if v is not None}
+    # Ensure 'source' exists if possible, or fallback
+    if 'source' not in clean_meta:
+         clean_meta['source'] = site.get('name', str(site.get('id', '')))
+    # lets the answer cache tell when a retrieved site has been re-crawled
+    clean_meta['updated_at'] = site.get('updated_at', '')
+    # structured fields for `where` filters at query time
+    clean_meta['country'] = site.get('country', '')
+    clean_meta['category'] = site.get('category', '')
+    clean_meta['language'] = _doc_language(site)
+    return clean_meta
+
+
+def _doc_language(site: Dict) -> str:
+    has_en, has_zh = bool(site.get('description_en')), bool(site.get('description_zh'))
+    if has_en and has_zh:
+        return 'multi'
+    return 'zh' if has_zh else 'en'
+
+
+def _lexical_fields(site: Dict, language: Optional[str] = None) -> Dict:
+    # BM25 index over the fields users search by exact terms
+    fields = ('name', 'country', 'description_en', 'description_zh')
+    if language is not None:
+        fields = ('name', 'country', f'description_{language}')
+    return {f: site.get(f, '') for f in fields}
+
+
+def _site_documents(site: Dict, per_language: bool) -> List[Tuple[str, str, Dict, Dict]]:
+    """`(doc_id, text, metadata, lexical_fields)` for each vector document of a site.
+
+    Mixed mode stores one bilingual document per site. Per-language mode stores
+    one document per description language, with ids `<site id>:<language>`.
+    """
+    if not per_language:
+        return [(site['id'], _build_doc_text(site), _build_metadata(site), _lexical_fields(site))]
+    languages = [lang for lang in LANGUAGES if site.get(f'description_{lang}')] or ['en']
+    docs = []
+    for lang in languages:
+        meta = dict(_build_metadata(site), language=lang, site_id=site['id'])
+        docs.append((f"{site['id']}:{lang}", _build_doc_text(site, lang), meta, _lexical_fields(site, lang)))
+    return docs
+
+
+def index_sites(sites: List[Dict], emb, vs, lexical: Optional[LexicalIndex] = None, batch_size: int = 64,
+                per_language: bool = settings.LANGUAGE_PARTITIONS,
+                progress: Optional[Callable[[int, int], None]] = None):
+    """Embed and add `sites` (rows shaped like `fetch_sites` output) to `vs` and `lexical` in batches.
+
+    `progress(done_sites, total_sites)` is called after every batch.
+    """
+    total = len(sites)
+    for i in range(0, total, batch_size):
+        batch = [doc for site in sites[i : i + batch_size] for doc in _site_documents(site, per_language)]
+        ids = [d[0] for d in batch]
+        texts = [d[1] for d in batch]
+        metadatas = [d[2] for d in batch]
+
+        embeddings = emb.embed_documents(texts)
+        vs.add_documents(ids=ids, texts=texts, embeddings=embeddings, metadatas=metadatas)
+        if lexical is not None:
+            lexical.add_documents(ids, [d[3] for d in batch])
+        print(f'Indexed batch {i // batch_size + 1}/{math.ceil(total / batch_size)}')
+        if progress is not None:
+            progress(min(i + batch_size, total), total)
+
+
+def index_from_db(database_url: Optional[str] = None, batch_size: int = 64, collection_name: Optional[str] = None):
+    """Index all rows from DB into vector store, in place.
+
+    Writes into `collection_name` (default: the live collection), so readers see a
+    partly updated index while it runs; `index_versions.build_index_version` builds
+    a fresh version and swaps it in instead.
 
     Args:
         database_url: SQLAlchemy DB URL. If not provided, will read `DATABASE_URL` env var.
@@ -82,7 +173,14 @@ def index_from_db(database_url: Optional[str] = None, batch_size: int = 64, coll
         raise ValueError('database_url is required or set DATABASE_URL env var')
 
     emb = EmbeddingService()
-    vs = VectorStore(collection_name=collection_name)
+    if collection_name is None:
+        from index_versions import IndexAlias
+        live = IndexAlias().current()
+        vs = create_vector_store(collection_name=live['collection'])
+        lexical = LexicalIndex(path=live['lexical_path'])
+    else:
+        vs = create_vector_store(collection_name=collection_name)
+        lexical = LexicalIndex()
 
     docs = list(fetch_sites(db_url))
     total = len(docs)
@@ -91,27 +189,7 @@ def index_from_db(database_url: Optional[str] = None, batch_size: int = 64, coll
         return
 
     print(f'Indexing {total} documents (batch_size={batch_size})...')
+    index_sites(docs, emb, vs, lexical, batch_size=batch_size)
 
-    for i in range(0, total, batch_size):
-        batch = docs[i : i + batch_size]
-        ids = [d['id'] for d in batch]
-        texts = [_build_doc_text(d) for d in batch]
-        
-        # Sanitize metadata: ChromaDB does not support None values
-        metadatas = []
-        for d in batch:
-            raw_meta = d.get('metadata', {})
-            if not isinstance(raw_meta, dict):
-                raw_meta = {}
-            # Filter out None values and ensure types are supported
-            clean_meta = {k: v for k, v in raw_meta.items() if v is not None}
-            # Ensure 'source' exists if possible, or fallback
-            if 'source' not in clean_meta:
-                 clean_meta['source'] = d.get('name', str(d.get('id', '')))
-            metadatas.append(clean_meta)
-
-        embeddings = emb.embed_documents(texts)
-        vs.add_documents(ids=ids, texts=texts, embeddings=embeddings, metadatas=metadatas)
-        print(f'Indexed batch {i // batch_size + 1}/{math.ceil(total / batch_size)}')
-
+    lexical.save()
     print('Indexing completed.')
@@ -0,0 +1,120 @@
+"""Structured metadata filters for retrieval.
+
+`index-db` stores `country`, `category` and `language` as vector metadata, so
+"natural sites in Kenya" can be searched within the matching rows only instead
+of ranking the whole collection. `build_where` turns explicit values into a
+Chroma-style `where` clause; `FilterExtractor` picks simple values out of the
+question itself, and `detect_language` picks the language partition to search
+when the index is built with `LANGUAGE_PARTITIONS`.
+"""
+from typing import Dict, Iterable, List, Optional
+import re
+
+from lexical import tokenize
+
+CATEGORIES = ('Cultural', 'Natural', 'Mixed')
+
+# question terms -> stored `category` value
+CATEGORY_TERMS = {
+    'cultural': 'Cultural', '文化遗产': 'Cultural',
+    'natural': 'Natural', '自然遗产': 'Natural',
+    'mixed': 'Mixed', '双重遗产': 'Mixed', '混合遗产': 'Mixed',
+}
+
+# `language` metadata is 'en', 'zh' or 'multi' (a bilingual document, when not partitioned)
+LANGUAGES = ('en', 'zh')
+
+_CJK_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+_LATIN_RE = re.compile(r'[A-Za-z]')
+
+
+def build_where(country: Optional[str] = None, category: Optional[str] = None,
+                language: Optional[str] = None) -> Optional[Dict]:
+    """Combine the given field values into a `where` clause, or None when nothing is set."""
+    clauses: List[Dict] = []
+    if country:
+        clauses.append({'country': country})
+    if category:
+        clauses.append({'category': category})
+    if language:
+        if language not in LANGUAGES:
+            raise ValueError(f'Unknown language {language!r}, expected one of {LANGUAGES}')
+        clauses.append({'language': {'$in': [language, 'multi']}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+def detect_language(text: str) -> str:
+    """'zh' or 'en', by comparing Han characters with Latin letters.
+
+    A Han character carries roughly a word, so each counts as four letters;
+    Chinese questions that embed a Latin site name ("Machu Picchu在哪里")
+    still come out as 'zh'.
+    """
+    han = len(_CJK_RE.findall(text))
+    latin = len(_LATIN_RE.findall(text))
+    return 'zh' if han and han * 4 >= latin else 'en'
+
+
+def _mentions_language(where: Dict) -> bool:
+    return any(k == 'language' or (k == '$and' and any(_mentions_language(sub) for sub in v))
+               for k, v in where.items())
+
+
+def with_language(where: Optional[Dict], language: str) -> Dict:
+    """Add a language clause to `where` unless it already constrains the language."""
+    clause = build_where(language=language)
+    if not where:
+        return clause
+    if _mentions_language(where):
+        return where
+    if set(where) == {'$and'}:
+        return {'$and': where['$and'] + [clause]}
+    return {'$and': [where, clause]}
+
+
+def _latin_tokens(text: str) -> List[str]:
+    return [t for t in tokenize(text) if t.isascii()]
+
+
+class FilterExtractor:
+    """Extract country/category filters from a question.
+
+    Countries are matched against `countries` (the values actually indexed,
+    e.g. from `vector_store.metadata_values('country')`) as whole-word token
+    sequences, longest name first, so "United States of America" wins over a
+    shorter overlapping name.
+    """
+
+    def __init__(self, countries: Iterable[str] = ()):
+        names = {c for c in countries if c}
+        self._countries = sorted(((tuple(_latin_tokens(c)), c) for c in names), key=lambda p: -len(p[0]))
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> 'FilterExtractor':
+        try:
+            return cls(vector_store.metadata_values('country'))
+        except Exception as e:
+            print(f'Could not load country names for query filters: {e}')
+            return cls()
+
+    def extract(self, query: str) -> Dict[str, str]:
+        """Return the recognised fields, e.g. `{'country': 'Kenya', 'category': 'Natural'}`."""
+        found: Dict[str, str] = {}
+        tokens = _latin_tokens(query)
+        for name_tokens, name in self._countries:
+            n = len(name_tokens)
+            if n and any(tuple(tokens[i:i + n]) == name_tokens for i in range(len(tokens) - n + 1)):
+                found['country'] = name
+                break
+
+        lowered = query.lower()
+        for term, category in CATEGORY_TERMS.items():
+            if (term in tokens) if term.isascii() else (term in lowered):
+                found['category'] = category
+                break
+        return found
+
+    def where(self, query: str) -> Optional[Dict]:
+        return build_where(**self.extract(query))
@@ -0,0 +1,220 @@
+"""Versioned index builds with an atomic alias swap.
+
+Rebuilding in place (`db_index.index_from_db`) lets readers see a half-built
+collection. Instead, `build_index_version` writes every build into a fresh
+collection `<COLLECTION_NAME>_v<n>` (and lexical index `<LEXICAL_INDEX_PATH
+stem>_v<n>.json`), then points the alias file at it with one `os.replace`.
+Readers resolve the alias when they open the index (`create_vector_store()`)
+and can poll `IndexAlias.current()['version']` to pick up a new build.
+Versions beyond `INDEX_KEEP_VERSIONS` are deleted after the swap.
+
+Progress goes to `INDEX_STATUS_PATH` as JSON (`state`, `version`, `done`,
+`total`, `error`, timestamps); a file lock allows one build at a time across
+processes. Builds are started from `cli.py reindex`, the app's rebuild button
+(in a background thread) or `cli.py index-worker`, which consumes the Redis
+queue the crawler pushes to when a crawl task completes.
+"""
+from typing import Any, Dict, List, Optional
+import datetime
+import fcntl
+import json
+import os
+import threading
+
+from config import settings
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+class IndexAlias:
+    """The alias file naming the live collection and lexical index, plus the kept versions."""
+
+    def __init__(self, path: str = settings.INDEX_ALIAS_PATH, base_name: str = settings.COLLECTION_NAME,
+                 lexical_path: str = settings.LEXICAL_INDEX_PATH):
+        self.path = path
+        self.base_name = base_name
+        self.lexical_path = lexical_path
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # no versioned build yet: the unversioned collection is live
+            return {'version': 0, 'collection': self.base_name, 'lexical_path': self.lexical_path, 'versions': []}
+
+    def current(self) -> Dict[str, Any]:
+        """`{'version', 'collection', 'lexical_path', ...}` of the live index."""
+        return self._read()
+
+    def entry_for(self, version: int) -> Dict[str, Any]:
+        stem, ext = os.path.splitext(self.lexical_path)
+        return {
+            'version': version,
+            'collection': f'{self.base_name}_v{version}',
+            'lexical_path': f'{stem}_v{version}{ext or ".json"}',
+        }
+
+    def next_version(self) -> int:
+        state = self._read()
+        return max([state['version']] + [v['version'] for v in state.get('versions', [])]) + 1
+
+    def swap(self, entry: Dict[str, Any], keep: int = settings.INDEX_KEEP_VERSIONS) -> List[Dict[str, Any]]:
+        """Make `entry` live; returns the versions that fell out of the `keep` window."""
+        state = self._read()
+        versions = [v for v in state.get('versions', []) if v['version'] != entry['version']]
+        versions.append({'version': entry['version'], 'collection': entry['collection'],
+                         'lexical_path': entry['lexical_path']})
+        versions.sort(key=lambda v: v['version'])
+        keep = max(keep, 1)
+        kept, dropped = versions[-keep:], versions[:-keep]
+        _write_json(self.path, dict(entry, built_at=_now(), versions=kept))
+        return dropped
+
+
+class BuildStatus:
+    """Progress of the current/last build, shared through a JSON file."""
+
+    def __init__(self, path: str = settings.INDEX_STATUS_PATH):
+        self.path = path
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'state': 'idle'}
+
+    def write(self, **fields) -> None:
+        _write_json(self.path, fields)
+
+
+class BuildInProgress(RuntimeError):
+    pass
+
+
+def _drop_version(entry: Dict[str, Any]) -> None:
+    from services import create_vector_store
+
+    try:
+        create_vector_store(collection_name=entry['collection']).drop()
+    except Exception as e:
+        print(f"Could not delete collection {entry['collection']}: {e}")
+    if os.path.exists(entry['lexical_path']):
+        os.remove(entry['lexical_path'])
+
+
+def build_index_version(database_url: Optional[str] = None, batch_size: int = 64,
+                        keep: int = settings.INDEX_KEEP_VERSIONS, alias: Optional[IndexAlias] = None,
+                        status: Optional[BuildStatus] = None, sites=None, embedding_service=None) -> Dict[str, Any]:
+    """Build a new index version from the database, swap the alias to it and GC old versions.
+
+    Returns the new live alias entry. Raises `BuildInProgress` if another build holds
+    the lock; on failure the alias is left unchanged and the partial version deleted.
+    `sites` and `embedding_service` replace the database rows / model (tests, benchmarks).
+    """
+    from db_index import fetch_sites, index_sites
+    from lexical import LexicalIndex
+    from services import EmbeddingService, create_vector_store
+
+    alias = alias or IndexAlias()
+    status = status or BuildStatus()
+    lock = open(alias.path + '.lock', 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        raise BuildInProgress('An index build is already running')
+
+    entry = alias.entry_for(alias.next_version())
+    started = _now()
+    try:
+        status.write(state='running', version=entry['version'], done=0, total=None, started_at=started)
+        if sites is None:
+            db_url = database_url or settings.DATABASE_URL
+            if not db_url:
+                raise ValueError('database_url is required or set DATABASE_URL env var')
+            sites = list(fetch_sites(db_url))
+        if not sites:
+            # never swap an empty index in
+            raise ValueError('No documents found in heritage_site')
+        total = len(sites)
+        emb = embedding_service or EmbeddingService()
+        vs = create_vector_store(collection_name=entry['collection'])
+        lexical = LexicalIndex(path=entry['lexical_path'])
+
+        def progress(done: int, total: int) -> None:
+            status.write(state='running', version=entry['version'], done=done, total=total, started_at=started)
+
+        print(f"Building index v{entry['version']} ({total} sites) into {entry['collection']}...")
+        index_sites(sites, emb, vs, lexical, batch_size=batch_size, progress=progress)
+        lexical.save()
+
+        for old in alias.swap(entry, keep=keep):
+            _drop_version(old)
+        status.write(state='completed', version=entry['version'], done=total, total=total,
+                     started_at=started, finished_at=_now())
+        print(f"Index v{entry['version']} is live.")
+        return alias.current()
+    except Exception as e:
+        status.write(state='failed', version=entry['version'], error=str(e), started_at=started, finished_at=_now())
+        _drop_version(entry)
+        raise
+    finally:
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+
+def start_background_build(**kwargs) -> threading.Thread:
+    """Run `build_index_version` on a daemon thread; follow it through `BuildStatus`."""
+    def run():
+        try:
+            build_index_version(**kwargs)
+        except BuildInProgress as e:
+            print(e)
+        except Exception as e:
+            print(f'Index build failed: {e}')
+
+    thread = threading.Thread(target=run, name='index-build', daemon=True)
+    thread.start()
+    return thread
+
+
+def run_reindex_worker(redis_url: str = settings.REDIS_URL, queue: str = settings.REINDEX_QUEUE, **kwargs) -> None:
+    """Block on the Redis reindex queue and build a new version per request.
+
+    Requests queued while a build runs are coalesced into the next build.
+    """
+    try:
+        import redis
+    except Exception:  # pragma: no cover
+        raise ImportError("redis is required for the index worker. Install with `pip install redis`")
+
+    client = redis.Redis.from_url(redis_url)
+    print(f'Waiting for reindex requests on {queue}...')
+    while True:
+        _, payload = client.brpop(queue)
+        # one build covers every request that arrived before it started
+        while client.rpop(queue) is not None:
+            pass
+        print(f'Reindex requested: {payload.decode("utf-8", "replace")}')
+        try:
+            build_index_version(**kwargs)
+        except Exception as e:
+            print(f'Index build failed: {e}')
+
+
+def live_lexical_index():
+    """The BM25 index belonging to the live version."""
+    from lexical import LexicalIndex
+
+    return LexicalIndex(path=IndexAlias().current()['lexical_path'])
@@ -0,0 +1,133 @@
+"""BM25 lexical index and reciprocal rank fusion for hybrid retrieval.
+
+MiniLM embeddings are weak on exact names ("Mogao Caves") and countries
+("Peru"); a small inverted index over name/country/description catches those
+and is fused with the vector ranking by `reciprocal_rank_fusion`.
+
+Latin text is split into lowercased, accent-folded words. CJK runs (e.g.
+`description_zh`) have no word boundaries, so they are indexed as character
+unigrams plus bigrams, which matches multi-character names without a
+segmentation dictionary.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from config import settings
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+|[㐀-䶿一-鿿豈-﫿]+')
+_CJK_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is', 'it', 'of', 'on',
+    'or', 'tell', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'which', 'who', 'why', 'with',
+    'me', 'about',
+}
+
+# name/country matches matter far more than a passing mention in a description
+FIELD_WEIGHTS = {'name': 3, 'country': 2, 'description_en': 1, 'description_zh': 1, 'text': 1}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into index terms (see module docstring)."""
+    if not text:
+        return []
+    folded = ''.join(c for c in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(c))
+    tokens = []
+    for run in _TOKEN_RE.findall(folded):
+        if _CJK_RE.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif run not in STOPWORDS:
+            tokens.append(run)
+    return tokens
+
+
+class LexicalIndex:
+    """Incrementally built BM25 index persisted as JSON at `path`."""
+
+    def __init__(self, path: Optional[str] = settings.LEXICAL_INDEX_PATH, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # doc_id -> {term: weighted tf}; postings and lengths are derived from it
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.doc_terms = json.load(f)['doc_terms']
+        self._rebuild_stats()
+
+    def _rebuild_stats(self):
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.doc_len: Dict[str, float] = {}
+        for doc_id, terms in self.doc_terms.items():
+            self._index_doc(doc_id, terms)
+
+    def _index_doc(self, doc_id: str, terms: Dict[str, float]):
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        self.doc_len[doc_id] = sum(terms.values())
+
+    def _unindex_doc(self, doc_id: str):
+        for term in self.doc_terms.get(doc_id, {}):
+            self.postings[term].pop(doc_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+        self.doc_len.pop(doc_id, None)
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def add_documents(self, ids: List[str], fields: List[Dict[str, str]]):
+        """Add or replace documents. `fields` maps field name (see FIELD_WEIGHTS) to text."""
+        for doc_id, doc_fields in zip(ids, fields):
+            terms: Counter = Counter()
+            for field, text in doc_fields.items():
+                weight = FIELD_WEIGHTS.get(field, 1)
+                for tok in tokenize(text or ''):
+                    terms[tok] += weight
+            self._unindex_doc(doc_id)
+            self.doc_terms[doc_id] = dict(terms)
+            self._index_doc(doc_id, self.doc_terms[doc_id])
+
+    def clear(self):
+        self.doc_terms = {}
+        self._rebuild_stats()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'doc_terms': self.doc_terms}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """Return `(doc_id, bm25_score)` pairs, best first."""
+        n_docs = len(self.doc_len)
+        if not n_docs:
+            return []
+        avg_len = sum(self.doc_len.values()) / n_docs
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:n_results]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = settings.RRF_K) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists: score(d) = sum over lists of 1 / (k + rank)."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
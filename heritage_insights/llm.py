@@ -1,21 +1,39 @@
 """Lightweight LLM adapter interfaces for heritage_insights.
 
-Provides an abstract `BaseLLM`, `MockLLM`, and `OllamaLLM`.
+Provides an abstract `BaseLLM`, `MockLLM`, `OllamaLLM` and its asyncio
+variant `AsyncOllamaLLM`.
 """
-from typing import Dict, Any, Optional
-import requests
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Iterator, Optional
+import asyncio
 import json
+import re
+import threading
+import requests
+from requests.adapters import HTTPAdapter
 from config import settings
+from context import context_window_for
+
+class LLMError(RuntimeError):
+    """A streamed generation failed or was cut off; the text yielded so far is incomplete."""
+
 
 class BaseLLM:
     """Abstract LLM interface.
 
-    Implementations should provide `generate(prompt, **kwargs)` returning a string.
+    Implementations should provide `generate(prompt, **kwargs)` returning a string
+    and `stream_generate(prompt, **kwargs)` yielding text chunks whose
+    concatenation is the full answer. The default `stream_generate` yields the
+    whole `generate` result as one chunk. A stream that cannot finish raises
+    `LLMError` rather than yielding the failure as text.
     """
 
     def generate(self, prompt: str, **kwargs: Any) -> str:
         raise NotImplementedError()
 
+    def stream_generate(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        yield self.generate(prompt, **kwargs)
+
 
 class MockLLM(BaseLLM):
     """A deterministic mock LLM used for development and tests."""
@@ -33,13 +51,112 @@ class MockLLM(BaseLLM):
         sources_part = ', '.join(sources) if sources else 'no sources'
         return f"MOCK_ANSWER based on: {sources_part}\n---\n{prompt[:100]}"
 
+    def stream_generate(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        # word-sized chunks so streaming consumers see more than one token
+        for piece in re.findall(r'\S+\s*|\s+', self.generate(prompt, **kwargs)):
+            yield piece
+
+
+class _ConcurrencyLimiter:
+    """Bounds in-flight requests to one Ollama server and tracks the wait queue."""
+
+    def __init__(self, limit: int):
+        self._sem = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """Wait for a free slot; raises TimeoutError after `timeout` seconds."""
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        try:
+            acquired = self._sem.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self.queued -= 1
+        if not acquired:
+            raise TimeoutError()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._sem.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'limit': self.limit, 'in_flight': self.in_flight, 'queued': self.queued, 'max_queued': self.max_queued}
+
+
+# One limiter per Ollama server, shared by every OllamaLLM pointing at it
+_limiters: Dict[str, _ConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter_for(base_url: str, limit: int) -> _ConcurrencyLimiter:
+    with _limiters_lock:
+        if base_url not in _limiters:
+            _limiters[base_url] = _ConcurrencyLimiter(limit)
+        return _limiters[base_url]
+
 
 class OllamaLLM(BaseLLM):
-    """Adapter for running LLMs via Ollama."""
+    """Adapter for running LLMs via Ollama.
 
-    def __init__(self, model: str = settings.OLLAMA_MODEL, base_url: Optional[str] = settings.OLLAMA_BASE_URL):
+    Requests go through a pooled keep-alive `requests.Session` and a per-server
+    concurrency limit (`OLLAMA_MAX_CONCURRENCY`); callers beyond the limit wait
+    up to `OLLAMA_QUEUE_TIMEOUT` seconds. `keep_alive` is sent with every
+    request so Ollama keeps the model loaded between bursts.
+    """
+
+    def __init__(self, model: str = settings.OLLAMA_MODEL, base_url: Optional[str] = settings.OLLAMA_BASE_URL,
+                 max_concurrency: int = settings.OLLAMA_MAX_CONCURRENCY, keep_alive: str = settings.OLLAMA_KEEP_ALIVE):
         self.model = model
         self.base_url = base_url
+        self.keep_alive = keep_alive
+        # must match the prompt budget used by the ContextAssembler for this model
+        self.num_ctx = context_window_for(model)
+        self.timeout = (settings.OLLAMA_CONNECT_TIMEOUT, settings.OLLAMA_READ_TIMEOUT)
+        self.queue_timeout = settings.OLLAMA_QUEUE_TIMEOUT or None
+        self.limiter = _limiter_for(base_url, max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(settings.OLLAMA_POOL_SIZE, max_concurrency))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0.1,
+                "num_ctx": self.num_ctx,
+            }
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Concurrency metrics for this Ollama server (in-flight, queue depth)."""
+        return self.limiter.stats()
+
+    def warm(self) -> bool:
+        """Ask Ollama to load the model now (a request without prompt only loads it)."""
+        url = f"{self.base_url}/api/generate"
+        try:
+            payload = {"model": self.model, "keep_alive": self.keep_alive, "options": {"num_ctx": self.num_ctx}}
+            self.session.post(url, json=payload, timeout=self.timeout).raise_for_status()
+            return True
+        except requests.exceptions.RequestException:
+            return False
 
     def generate(self, prompt: str, **kwargs: Any) -> str:
         """Generate text using Ollama API."""
@@ -47,20 +164,15 @@ class OllamaLLM(BaseLLM):
         
         # System prompt instructions can be embedded here or passed in prompt
         # We'll assume the prompt passed in is the full prompt
-        
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.1
-            }
-        }
+        payload = self._payload(prompt, stream=False)
 
         try:
-            response = requests.post(url, json=payload, timeout=120)
+            with self.limiter.slot(self.queue_timeout):
+                response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             return response.json().get("response", "")
+        except TimeoutError:
+            return f"Error: Ollama is busy ({self.limiter.stats()['queued']} requests queued). Please retry."
         except requests.exceptions.Timeout:
             return f"Error: Ollama request timed out ({self.base_url}). Is the model loaded?"
         except requests.exceptions.ConnectionError:
@@ -71,24 +183,143 @@ class OllamaLLM(BaseLLM):
     def stream_generate(self, prompt: str, **kwargs: Any):
         """Generator for streaming responses."""
         url = f"{self.base_url}/api/generate"
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": True,
-            "options": {
-                "temperature": 0.1
-            }
-        }
+        payload = self._payload(prompt, stream=True)
         
         try:
-            with requests.post(url, json=payload, stream=True) as r:
-                r.raise_for_status()
-                for line in r.iter_lines():
-                    if line:
-                        body = json.loads(line)
-                        token = body.get("response", "")
-                        yield token
-                        if body.get("done", False):
-                            break
+            # the slot is held until the stream finishes or the consumer stops iterating
+            with self.limiter.slot(self.queue_timeout):
+                with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as r:
+                    r.raise_for_status()
+                    for line in r.iter_lines():
+                        if line:
+                            body = json.loads(line)
+                            token = body.get("response", "")
+                            yield token
+                            if body.get("done", False):
+                                return
+        except TimeoutError:
+            raise LLMError(f"Error: Ollama is busy ({self.limiter.stats()['queued']} requests queued). Please retry.")
+        except Exception as e:
+            raise LLMError(f"Error calling Ollama: {e}") from e
+        raise LLMError("Error calling Ollama: stream ended before the answer was complete")
+
+
+class AsyncOllamaLLM(BaseLLM):
+    """asyncio variant of `OllamaLLM` built on a pooled `httpx.AsyncClient`.
+
+    Concurrency is bounded by an `asyncio.Semaphore`. The client and semaphore
+    belong to the event loop that first uses them and are recreated for a new
+    loop; `await aclose()` when done. The sync `generate` runs on its own
+    short-lived loop and closes its client before returning.
+    """
+
+    def __init__(self, model: str = settings.OLLAMA_MODEL, base_url: Optional[str] = settings.OLLAMA_BASE_URL,
+                 max_concurrency: int = settings.OLLAMA_MAX_CONCURRENCY, keep_alive: str = settings.OLLAMA_KEEP_ALIVE):
+        try:
+            import httpx
+        except Exception:  # pragma: no cover
+            raise ImportError("httpx is required for AsyncOllamaLLM. Install with `pip install httpx`")
+        self.model = model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.num_ctx = context_window_for(model)
+        self.queue_timeout = settings.OLLAMA_QUEUE_TIMEOUT or None
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self._httpx = httpx
+        self._client = None
+        self._sem = None
+        self._loop = None
+
+    _payload = OllamaLLM._payload
+
+    def _bind_loop(self):
+        """Use the running loop, replacing a client/semaphore left over from another loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                # the old loop is gone (asyncio.run); its connections cannot be reused
+                self._client = None
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.limit)
+        if self._client is None:
+            httpx = self._httpx
+            pool = max(settings.OLLAMA_POOL_SIZE, self.limit)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(settings.OLLAMA_READ_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+            )
+
+    @property
+    def client(self):
+        self._bind_loop()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._bind_loop()
+        self._client = client
+
+    def stats(self) -> Dict[str, int]:
+        return {'limit': self.limit, 'in_flight': self.in_flight, 'queued': self.queued, 'max_queued': self.max_queued}
+
+    @asynccontextmanager
+    async def _slot(self):
+        self._bind_loop()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._sem.release()
+
+    def generate(self, prompt: str, **kwargs: Any) -> str:
+        async def run():
+            try:
+                return await self.agenerate(prompt, **kwargs)
+            finally:
+                await self.aclose()
+        return asyncio.run(run())
+
+    async def agenerate(self, prompt: str, **kwargs: Any) -> str:
+        try:
+            async with self._slot():
+                response = await self.client.post("/api/generate", json=self._payload(prompt, stream=False))
+            response.raise_for_status()
+            return response.json().get("response", "")
+        except asyncio.TimeoutError:
+            return f"Error: Ollama is busy ({self.queued} requests queued). Please retry."
         except Exception as e:
-            yield f"Error calling Ollama: {e}"
+            return f"Error calling Ollama: {e}"
+
+    async def astream_generate(self, prompt: str, **kwargs: Any):
+        """Async generator for streaming responses."""
+        try:
+            async with self._slot():
+                async with self.client.stream("POST", "/api/generate", json=self._payload(prompt, stream=True)) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        if line:
+                            body = json.loads(line)
+                            yield body.get("response", "")
+                            if body.get("done", False):
+                                return
+        except asyncio.TimeoutError:
+            raise LLMError(f"Error: Ollama is busy ({self.queued} requests queued). Please retry.")
+        except Exception as e:
+            raise LLMError(f"Error calling Ollama: {e}") from e
+        raise LLMError("Error calling Ollama: stream ended before the answer was complete")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
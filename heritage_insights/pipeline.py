@@ -1,44 +1,55 @@
 """Retrieval-Augmented Generation (RAG) pipeline implementation.
 
 This module implements `RAGPipeline` which coordinates embedding the query,
-retrieving top documents from the `VectorStore`, and calling a pluggable LLM
-to synthesize an answer.
+retrieving top documents from the `VectorStore` (optionally fused with a BM25
+`LexicalIndex` and narrowed by metadata filters), optionally reranking them
+with a cross-encoder, and calling a pluggable LLM to synthesize an answer.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import time
 
-from services import EmbeddingService, VectorStore
-from llm import BaseLLM
+from services import EmbeddingService, VectorStore, match_where
+from llm import BaseLLM, LLMError
+from lexical import LexicalIndex, reciprocal_rank_fusion
+from cache import AnswerCache
+from context import ContextAssembler
+from filters import FilterExtractor, detect_language, with_language
+from rerank import CrossEncoderReranker
+from config import settings
 
 
 class RAGPipeline:
-    def __init__(self, embedding_service: EmbeddingService, vector_store: VectorStore, llm: BaseLLM):
+    def __init__(self, embedding_service: EmbeddingService, vector_store: VectorStore, llm: BaseLLM,
+                 lexical_index: Optional[LexicalIndex] = None, answer_cache: Optional[AnswerCache] = None,
+                 context_assembler: Optional[ContextAssembler] = None,
+                 filter_extractor: Optional[FilterExtractor] = None,
+                 reranker: Optional[CrossEncoderReranker] = None,
+                 language_routing: bool = settings.LANGUAGE_PARTITIONS):
         self.embedding_service = embedding_service
         self.vector_store = vector_store
         self.llm = llm
+        # optional BM25 index; when present retrieval is hybrid (vector + lexical, RRF-fused)
+        self.lexical_index = lexical_index
+        # optional answer cache consulted before calling the LLM
+        self.answer_cache = answer_cache
+        # token-budgeted prompt assembly sized to the LLM's context window
+        self.context_assembler = context_assembler or ContextAssembler.for_model(getattr(llm, 'model', None))
+        # optional country/category extraction from the question when no explicit `where` is given
+        self.filter_extractor = filter_extractor
+        # optional cross-encoder stage: retrieve RERANK_CANDIDATES, keep the best k
+        self.reranker = reranker
+        # search only the detected query language's documents (index built with LANGUAGE_PARTITIONS)
+        self.language_routing = language_routing
 
-    def _build_prompt(self, query: str, docs: List[Dict[str, Any]]) -> str:
-        # Build a concise prompt that includes the top documents and the user query.
-        parts = ["You are an assistant that answers questions using the supplied documents."]
-        parts.append("=== Documents ===")
-        for i, d in enumerate(docs, start=1):
-            title = d.get('metadata', {}).get('source') or d.get('id')
-            body = (d.get('documents') or d.get('document') or d.get('text') or '')
-            # Keep a preview but allow enough context for RAG
-            preview = body[:2000].replace('\n', ' ')
-            parts.append(f"[{i}] {title}: {preview}")
-
-        parts.append("=== End Documents ===")
-        parts.append(f"Question: {query}")
-        parts.append("Answer concisely and cite sources.")
-        return "\n".join(parts)
-
-    def answer(self, query: str, k: int = 3, return_docs: bool = False) -> Dict[str, Any]:
-        # 1. embed query
-        q_emb = self.embedding_service.embed_query(query)
+    def build_prompt(self, query: str, docs: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+        """Build the prompt within the token budget; returns `(prompt, stats)` with `prompt_tokens` etc."""
+        return self.context_assembler.build(query, docs)
 
-        # 2. retrieve from vector store
-        raw = self.vector_store.query(q_emb, n_results=k)
+    def _build_prompt(self, query: str, docs: List[Dict[str, Any]]) -> str:
+        return self.build_prompt(query, docs)[0]
 
+    @staticmethod
+    def _parse_results(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
         # Chroma's query format: dict with keys like 'ids', 'documents', 'metadatas', 'distances'
         docs = []
         ids = raw.get('ids', [[]])[0] if isinstance(raw.get('ids'), list) else raw.get('ids')
@@ -53,14 +64,240 @@ class RAGPipeline:
                 'metadata': metadatas[i] if metadatas else {},
                 'distance': distances[i] if distances else None,
             })
+        return docs
+
+    def _fuse(self, query: str, vector_docs: List[Dict[str, Any]], k: int,
+              where: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """Fuse vector hits with BM25 hits by reciprocal rank fusion and keep the top k."""
+        lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(query, n_results=settings.HYBRID_CANDIDATES)]
+        fused = reciprocal_rank_fusion([[d['id'] for d in vector_docs], lexical_ids])
+        if not where:
+            fused = fused[:k]
+
+        by_id = {d['id']: d for d in vector_docs}
+        missing = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        if missing:
+            # lexical-only hits: pull their text/metadata from the vector store
+            got = self.vector_store.get_documents(missing)
+            for doc_id, text, meta in zip(got['ids'], got['documents'], got['metadatas']):
+                # the BM25 index has no metadata; apply the filter to lexical-only hits here
+                if where and not match_where(meta or {}, where):
+                    continue
+                by_id[doc_id] = {'id': doc_id, 'text': text or '', 'metadata': meta or {}, 'distance': None}
+
+        docs = []
+        for doc_id, score in fused:
+            if doc_id in by_id:
+                docs.append(dict(by_id[doc_id], rrf_score=score))
+        return docs[:k]
+
+    def _search(self, query: str, q_emb: List[float], k: int, where: Optional[Dict]) -> List[Dict[str, Any]]:
+        # widen the candidate set when fusing
+        hybrid = self.lexical_index is not None and len(self.lexical_index) > 0
+        n_results = max(k, settings.HYBRID_CANDIDATES) if hybrid else k
+        kwargs = {'where': where} if where else {}
+        docs = self._parse_results(self.vector_store.query(q_emb, n_results=n_results, **kwargs))
+
+        if hybrid:
+            docs = self._fuse(query, docs, k, where)
+        return docs
+
+    def _candidates(self, k: int) -> int:
+        return max(k, settings.RERANK_CANDIDATES) if self.reranker is not None else k
+
+    def _rerank(self, query: str, docs: List[Dict[str, Any]], k: int,
+                timings: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.reranker is None or not docs:
+            return docs[:k]
+        docs, stats = self.reranker.rerank(query, docs, k)
+        if timings is not None:
+            timings.update(stats)
+        return docs
+
+    def retrieve(self, query: str, k: int = 3, query_embedding: Optional[List[float]] = None,
+                 where: Optional[Dict] = None, timings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Return the top-k documents for `query` (hybrid when a lexical index is attached).
+
+        `where` is a Chroma-style metadata filter (see `filters.build_where`). Without one,
+        the filter extractor (if any) derives it from the question. With language routing
+        the detected query language is added. Derived filters that match nothing are
+        dropped rather than returning no context.
+
+        If `timings` is given it is filled with `search_ms`, `embed_ms` (when the query is
+        embedded here) and, with a reranker, `rerank_ms` / `rerank_timed_out`.
+        """
+        start = time.perf_counter()
+        # 1. embed query
+        q_emb = query_embedding if query_embedding is not None else self.embedding_service.embed_query(query)
+        embedded = time.perf_counter()
+
+        derived = where
+        if where is None and self.filter_extractor is not None:
+            derived = self.filter_extractor.where(query)
+        if self.language_routing:
+            derived = with_language(derived, detect_language(query))
+
+        # 2. retrieve from vector store
+        n = self._candidates(k)
+        docs = self._search(query, q_emb, n, derived)
+        if not docs and derived != where:
+            docs = self._search(query, q_emb, n, where)
+        if timings is not None:
+            if query_embedding is None:
+                timings['embed_ms'] = (embedded - start) * 1000
+            timings['search_ms'] = (time.perf_counter() - embedded) * 1000
+
+        # 3. rerank candidates
+        return self._rerank(query, docs, k, timings)
+
+    def retrieve_batch(self, queries: List[str], k: int = 3,
+                       query_embeddings: Optional[List[List[float]]] = None,
+                       where: Optional[Dict] = None) -> List[List[Dict[str, Any]]]:
+        """`retrieve` for many queries: one batched encode and one batched vector query.
+
+        `where` applies to every query; per-question filter extraction is not done here.
+        With language routing, queries are grouped by detected language (one vector query each).
+        """
+        if not queries:
+            return []
+        q_embs = query_embeddings if query_embeddings is not None else self.embedding_service.embed_documents(queries)
+        if self.language_routing:
+            groups: Dict[str, List[int]] = {}
+            for i, query in enumerate(queries):
+                groups.setdefault(detect_language(query), []).append(i)
+            results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+            for lang, idx in groups.items():
+                for i, docs in zip(idx, self._retrieve_batch([queries[i] for i in idx], k, [q_embs[i] for i in idx],
+                                                             with_language(where, lang))):
+                    results[i] = docs
+            return results
+        return self._retrieve_batch(queries, k, q_embs, where)
+
+    def _retrieve_batch(self, queries: List[str], k: int, q_embs: List[List[float]],
+                        where: Optional[Dict]) -> List[List[Dict[str, Any]]]:
+        n = self._candidates(k)
+        hybrid = self.lexical_index is not None and len(self.lexical_index) > 0
+        n_results = max(n, settings.HYBRID_CANDIDATES) if hybrid else n
+        kwargs = {'where': where} if where else {}
+        raw = self.vector_store.query_batch(q_embs, n_results=n_results, **kwargs)
+
+        results = []
+        for i, query in enumerate(queries):
+            per_query = {key: [val[i]] for key, val in raw.items() if isinstance(val, list) and len(val) == len(queries)}
+            docs = self._parse_results(per_query)
+            if hybrid:
+                docs = self._fuse(query, docs, n, where)
+            results.append(self._rerank(query, docs, k, None))
+        return results
+
+    def lookup_answer(self, query: str, docs: List[Dict[str, Any]], query_embedding=None) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.get(query, docs, query_embedding=query_embedding)
+
+    def store_answer(self, query: str, docs: List[Dict[str, Any]], answer: str, query_embedding=None) -> None:
+        # OllamaLLM reports failures as "Error..." strings; never cache those
+        if self.answer_cache is None or not answer or answer.startswith('Error'):
+            return
+        self.answer_cache.put(query, docs, answer, query_embedding=query_embedding)
+
+    def generate_answer(self, query: str, docs: List[Dict[str, Any]],
+                        query_embedding=None) -> Tuple[str, Optional[Dict[str, int]]]:
+        """Answer from already retrieved docs (cache first); returns `(answer, prompt_stats)`."""
+        answer = self.lookup_answer(query, docs, query_embedding)
+        if answer is not None:
+            return answer, None
 
         # 3. build prompt
-        prompt = self._build_prompt(query, docs)
+        prompt, prompt_stats = self.build_prompt(query, docs)
 
         # 4. call LLM
         answer = self.llm.generate(prompt, context_docs=docs)
+        self.store_answer(query, docs, answer, query_embedding)
+        return answer, prompt_stats
+
+    def answer(self, query: str, k: int = 3, return_docs: bool = False,
+               query_embedding: Optional[List[float]] = None, where: Optional[Dict] = None) -> Dict[str, Any]:
+        start = time.perf_counter()
+        q_emb, timings = self._embed_timed(query, query_embedding)
+        docs = self.retrieve(query, k=k, query_embedding=q_emb, where=where, timings=timings)
 
-        out = {'answer': answer, 'docs': docs}
+        generate_start = time.perf_counter()
+        answer, prompt_stats = self.generate_answer(query, docs, query_embedding=q_emb)
+        timings['generate_ms'] = (time.perf_counter() - generate_start) * 1000
+        timings['total_ms'] = (time.perf_counter() - start) * 1000
+
+        # prompt_stats is None when the answer came from the cache
+        out = {'answer': answer, 'docs': docs, 'prompt_stats': prompt_stats, 'timings': timings}
         if return_docs:
             return out
-        return {'answer': answer}
+        return {'answer': answer, 'prompt_stats': prompt_stats, 'timings': timings}
+
+    def _embed_timed(self, query: str, query_embedding: Optional[List[float]]) -> Tuple[List[float], Dict[str, Any]]:
+        # per-stage timings start with the query embedding (zero when the caller supplied it)
+        start = time.perf_counter()
+        q_emb = query_embedding if query_embedding is not None else self.embedding_service.embed_query(query)
+        return q_emb, {'embed_ms': (time.perf_counter() - start) * 1000}
+
+    def stream_answer(self, query: str, k: int = 3, query_embedding: Optional[List[float]] = None,
+                      where: Optional[Dict] = None) -> Iterator[Dict[str, Any]]:
+        """Stream an answer as events, sharing retrieval/caching/prompting with `answer`.
+
+        Yields, in order:
+          {'type': 'retrieval', 'docs': [...], 'prompt_stats': {...} or None, 'cached': bool}
+          {'type': 'token', 'text': '...'}            (one or more; a single one on cache hits)
+          {'type': 'error', 'message': '...'}         (only if the LLM stream failed part way)
+          {'type': 'done', 'answer': '...', 'error': None or '...', 'timings': {'retrieval_ms', 'ttft_ms', 'total_ms', ...}}
+
+        `timings` also carries the per-stage `embed_ms`, `search_ms` and `rerank_ms` of `retrieve`.
+
+        No tokens are yielded when retrieval finds nothing. A failed or cut-off
+        stream is never cached.
+        """
+        start = time.perf_counter()
+        q_emb, timings = self._embed_timed(query, query_embedding)
+        docs = self.retrieve(query, k=k, query_embedding=q_emb, where=where, timings=timings)
+        retrieval_ms = (time.perf_counter() - start) * 1000
+
+        cached = self.lookup_answer(query, docs, q_emb) if docs else None
+        prompt = prompt_stats = None
+        if docs and cached is None:
+            prompt, prompt_stats = self.build_prompt(query, docs)
+        yield {'type': 'retrieval', 'docs': docs, 'prompt_stats': prompt_stats, 'cached': cached is not None}
+
+        chunks: List[str] = []
+        ttft_ms = None
+        error = None
+        if cached is not None:
+            chunks.append(cached)
+            ttft_ms = (time.perf_counter() - start) * 1000
+            yield {'type': 'token', 'text': cached}
+        elif docs:
+            # duck-typed LLMs without the BaseLLM streaming contract get one chunk
+            stream = getattr(self.llm, 'stream_generate', None)
+            chunks_iter = stream(prompt, context_docs=docs) if stream else iter([self.llm.generate(prompt, context_docs=docs)])
+            try:
+                for chunk in chunks_iter:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    chunks.append(chunk)
+                    yield {'type': 'token', 'text': chunk}
+            except LLMError as e:
+                error = str(e)
+                yield {'type': 'error', 'message': error}
+            finally:
+                # a consumer that stops early (close()) gives the LLM stream's slot back right away
+                close = getattr(chunks_iter, 'close', None)
+                if close is not None:
+                    close()
+
+        full = ''.join(chunks)
+        if cached is None and docs and error is None:
+            self.store_answer(query, docs, full, q_emb)
+        yield {
+            'type': 'done',
+            'answer': full,
+            'error': error,
+            'timings': dict(timings, retrieval_ms=retrieval_ms, ttft_ms=ttft_ms,
+                            total_ms=(time.perf_counter() - start) * 1000),
+        }
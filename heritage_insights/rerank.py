@@ -0,0 +1,83 @@
+"""Cross-encoder reranking of retrieved candidates under a latency budget.
+
+Vector (or hybrid) search is cheap but coarse, so `RAGPipeline` retrieves
+`RERANK_CANDIDATES` documents and lets a small CPU cross-encoder score each
+(question, document) pair to pick the final k. Scoring runs in batches on a
+worker thread; if it has not finished within `RERANK_BUDGET_MS` the retrieval
+order is kept and the worker stops at the next batch boundary.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import threading
+import time
+
+from config import settings
+
+
+def _import_cross_encoder():
+    try:
+        from sentence_transformers import CrossEncoder
+    except Exception:  # pragma: no cover
+        return None
+    return CrossEncoder
+
+
+class CrossEncoderReranker:
+    """Reorders candidate docs by cross-encoder score, falling back to the input order on timeout.
+
+    `scorer` (a callable taking `[(query, text), ...]` and returning scores) replaces
+    the cross-encoder model, e.g. in tests.
+    """
+
+    def __init__(self, model_name: str = settings.RERANK_MODEL, budget_ms: float = settings.RERANK_BUDGET_MS,
+                 batch_size: int = settings.RERANK_BATCH_SIZE,
+                 scorer: Optional[Callable[[List[Tuple[str, str]]], Sequence[float]]] = None):
+        if scorer is None:
+            CrossEncoder = _import_cross_encoder()
+            if CrossEncoder is None:
+                raise ImportError(
+                    "sentence-transformers is required for reranking. Install with `pip install sentence-transformers`"
+                )
+            model = CrossEncoder(model_name, device="cpu")
+            scorer = lambda pairs: model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        self._scorer = scorer
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        # one model, one worker: concurrent callers queue here and that wait counts against their budget
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rerank')
+
+    def _score(self, query: str, docs: List[Dict[str, Any]], cancelled: threading.Event) -> Optional[List[float]]:
+        pairs = [(query, d.get('text', '')) for d in docs]
+        scores: List[float] = []
+        for start in range(0, len(pairs), self.batch_size):
+            if cancelled.is_set():
+                return None
+            scores.extend(float(s) for s in self._scorer(pairs[start:start + self.batch_size]))
+        return scores
+
+    def rerank(self, query: str, docs: List[Dict[str, Any]], k: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return `(top_k_docs, stats)`; stats has `rerank_ms` and `rerank_timed_out`."""
+        start = time.perf_counter()
+        cancelled = threading.Event()
+        future = self._executor.submit(self._score, query, docs, cancelled)
+        try:
+            scores = future.result(timeout=self.budget_ms / 1000 if self.budget_ms > 0 else None)
+        except FutureTimeout:
+            cancelled.set()
+            scores = None
+        stats = {'rerank_ms': (time.perf_counter() - start) * 1000, 'rerank_timed_out': scores is None}
+        if scores is None:
+            return docs[:k], stats
+
+        order = sorted(range(len(docs)), key=lambda i: -scores[i])[:k]
+        return [dict(docs[i], rerank_score=scores[i]) for i in order], stats
+
+    def warmup(self) -> None:
+        self._score('warmup', [{'text': 'warmup'}], threading.Event())
+
+
+def create_reranker() -> Optional[CrossEncoderReranker]:
+    """The reranker configured by `settings.RERANK_MODEL`, or None when reranking is off."""
+    if not settings.RERANK_MODEL:
+        return None
+    return CrossEncoderReranker(model_name=settings.RERANK_MODEL)
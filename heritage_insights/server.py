@@ -0,0 +1,328 @@
+"""Async HTTP query service for heritage_insights (plain ASGI, no framework).
+
+Shares one warm `RAGPipeline` between all callers (the Django display site,
+scripts, other services) and merges concurrent query embeddings into single
+`encode()` calls via `EmbeddingBatcher`.
+
+Endpoints:
+    GET  /health                       -> {"status": "ok", "batcher": {...}}
+    GET  /search?q=...&k=3             -> {"docs": [...], "timings": {...}}
+    GET  /answer?q=...&k=3             -> text/event-stream of `retrieval`, `token`, `done` events
+    POST /search, POST /answer         -> same, with a JSON body {"q": ..., "k": ...}
+
+`/search` and `/answer` also take optional `country`, `category` and `language`
+(`en`/`zh`) filters; without them filters are extracted from the question.
+
+Run with:
+    python heritage_insights/server.py            # needs `uvicorn`
+"""
+from typing import Any, Dict, List, Optional
+import asyncio
+import copy
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+from config import settings
+from filters import build_where
+
+
+class EmbeddingBatcher:
+    """Collects concurrent `embed()` calls and runs them as one `embed_documents` batch."""
+
+    def __init__(self, embedding_service, max_batch: int = settings.EMBED_BATCH_MAX,
+                 max_wait_ms: float = settings.EMBED_BATCH_WAIT_MS):
+        self.embedding_service = embedding_service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(None, self.embedding_service.embed_documents, texts)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            for (_, fut), vec in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vec)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'texts': self.texts,
+            'avg_batch': self.texts / self.batches if self.batches else 0,
+        }
+
+    async def aclose(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+
+def _json_default(obj: Any):
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+class QueryService:
+    """ASGI application serving `/search` and `/answer` from one shared pipeline."""
+
+    def __init__(self, pipeline, batcher: Optional[EmbeddingBatcher] = None, index_alias=None,
+                 index_check_seconds: float = settings.INDEX_ALIAS_CHECK_SECONDS):
+        self.pipeline = pipeline
+        self.batcher = batcher or EmbeddingBatcher(pipeline.embedding_service)
+        # when set, switch to a newly swapped-in index version between requests
+        self.index_alias = index_alias
+        self.index_version = index_alias.current()['version'] if index_alias is not None else None
+        self.index_check_seconds = index_check_seconds
+        self._index_checked_at = time.monotonic()
+        self._index_mtime = self._alias_mtime()
+        self._index_switch: Optional[asyncio.Task] = None
+
+    def _alias_mtime(self) -> Optional[float]:
+        if self.index_alias is None:
+            return None
+        try:
+            return os.stat(self.index_alias.path).st_mtime
+        except OSError:
+            return None
+
+    def _follow_index(self):
+        """Start loading a newly swapped-in index version, at most every `index_check_seconds`
+
+        Only the alias file's mtime is checked on the event loop; reading it and
+        opening the new stores happen in a worker thread, and requests keep using
+        the current pipeline until the new one is published.
+        """
+        if self.index_alias is None or (self._index_switch is not None and not self._index_switch.done()):
+            return
+        now = time.monotonic()
+        if now - self._index_checked_at < self.index_check_seconds:
+            return
+        self._index_checked_at = now
+        mtime = self._alias_mtime()
+        if mtime == self._index_mtime:
+            return
+        self._index_mtime = mtime
+        self._index_switch = asyncio.get_running_loop().create_task(self._switch_index())
+
+    def _load_index(self):
+        """(alias entry, pipeline using it), or None if the live version is already served"""
+        from services import create_vector_store
+        from lexical import LexicalIndex
+        from filters import FilterExtractor
+
+        live = self.index_alias.current()
+        if live['version'] == self.index_version:
+            return None
+        pipeline = copy.copy(self.pipeline)
+        pipeline.vector_store = create_vector_store(collection_name=live['collection'])
+        pipeline.lexical_index = LexicalIndex(path=live['lexical_path'])
+        if pipeline.filter_extractor is not None:
+            pipeline.filter_extractor = FilterExtractor.from_vector_store(pipeline.vector_store)
+        return live, pipeline
+
+    async def _switch_index(self):
+        try:
+            loaded = await asyncio.get_running_loop().run_in_executor(None, self._load_index)
+        except Exception as e:
+            # retried at the next check
+            self._index_mtime = None
+            print(f"Failed to load the swapped-in index: {e}")
+            return
+        if loaded is None:
+            return
+        live, pipeline = loaded
+        # one assignment: a request sees either the old stores or the new ones, never a mix
+        self.pipeline = pipeline
+        if pipeline.answer_cache is not None:
+            pipeline.answer_cache.invalidate()
+        self.index_version = live['version']
+        print(f"Switched to index v{live['version']} ({live['collection']})")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        path = scope['path'].rstrip('/') or '/'
+        try:
+            params = await self._params(scope, receive)
+            self._follow_index()
+            if path == '/health':
+                await self._send_json(send, 200, {'status': 'ok', 'batcher': self.batcher.stats()})
+            elif path == '/search':
+                await self._search(send, params)
+            elif path == '/answer':
+                await self._answer(send, params)
+            else:
+                await self._send_json(send, 404, {'error': 'not found'})
+        except ValueError as e:
+            await self._send_json(send, 400, {'error': str(e)})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.batcher.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _params(scope, receive) -> Dict[str, Any]:
+        params = {k: v[0] for k, v in parse_qs(scope.get('query_string', b'').decode('utf-8')).items()}
+        if scope['method'] == 'POST':
+            body = b''
+            while True:
+                message = await receive()
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    break
+            if body:
+                try:
+                    params.update(json.loads(body))
+                except json.JSONDecodeError:
+                    raise ValueError('invalid JSON body')
+        if not params.get('q'):
+            if scope['path'].rstrip('/') in ('/search', '/answer'):
+                raise ValueError('missing "q"')
+        try:
+            params['k'] = int(params.get('k', 3))
+        except (TypeError, ValueError):
+            raise ValueError('"k" must be an integer')
+        # explicit filters; None leaves filter extraction to the pipeline
+        params['where'] = build_where(params.get('country'), params.get('category'), params.get('language'))
+        return params
+
+    async def _search(self, send, params):
+        pipeline = self.pipeline
+        q_emb = await self.batcher.embed(params['q'])
+        loop = asyncio.get_running_loop()
+        timings: Dict[str, Any] = {}
+        docs = await loop.run_in_executor(
+            None, lambda: pipeline.retrieve(params['q'], k=params['k'], query_embedding=q_emb,
+                                                 where=params['where'], timings=timings))
+        await self._send_json(send, 200, {'docs': docs, 'timings': timings})
+
+    async def _answer(self, send, params):
+        q_emb = await self.batcher.embed(params['q'])
+        loop = asyncio.get_running_loop()
+        events = self.pipeline.stream_answer(params['q'], k=params['k'], query_embedding=q_emb,
+                                             where=params['where'])
+        # close() must not run while a worker thread is inside next()
+        lock = threading.Lock()
+        done = object()
+
+        def pull():
+            with lock:
+                return next(events, done)
+
+        def close():
+            with lock:
+                events.close()
+
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')],
+            })
+            while True:
+                # the pipeline (vector query, LLM stream) is blocking; pull each event in a worker thread
+                try:
+                    event = await loop.run_in_executor(None, pull)
+                except Exception as e:
+                    # headers are sent: report it in the stream (LLM failures already arrive as `error`)
+                    event = {'type': 'error', 'message': f'Error answering: {e}'}
+                    await self._send_event(send, event)
+                    break
+                if event is done:
+                    break
+                await self._send_event(send, event)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            # releases the LLM slot now if the client went away or sending failed
+            await loop.run_in_executor(None, close)
+
+    @staticmethod
+    async def _send_event(send, event: Dict[str, Any]):
+        data = json.dumps(event, default=_json_default, ensure_ascii=False)
+        chunk = f"event: {event['type']}\ndata: {data}\n\n".encode('utf-8')
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, default=_json_default, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def build_default_service() -> QueryService:
+    from services import EmbeddingService, create_vector_store
+    from llm import OllamaLLM
+    from cache import AnswerCache
+    from filters import FilterExtractor
+    from index_versions import IndexAlias, live_lexical_index
+    from rerank import create_reranker
+    from pipeline import RAGPipeline
+
+    embedding_service = EmbeddingService()
+    embedding_service.warmup()
+    llm = OllamaLLM()
+    llm.warm()
+    vector_store = create_vector_store()
+    reranker = create_reranker()
+    if reranker is not None:
+        reranker.warmup()
+    pipeline = RAGPipeline(embedding_service, vector_store, llm,
+                           lexical_index=live_lexical_index(), answer_cache=AnswerCache(),
+                           filter_extractor=FilterExtractor.from_vector_store(vector_store),
+                           reranker=reranker)
+    return QueryService(pipeline, index_alias=IndexAlias())
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except Exception:  # pragma: no cover
+        raise SystemExit("uvicorn is required to run the query service. Install with `pip install uvicorn`")
+    uvicorn.run(build_default_service(), host=settings.SERVER_HOST, port=settings.SERVER_PORT)
@@ -3,31 +3,79 @@ Embedding and VectorStore helpers for heritage_insights.
 
 This is a minimal implementation intended as a starting point.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
+import json
+import os
+import shutil
 import numpy as np
 from config import settings
 
-try:
-    from sentence_transformers import SentenceTransformer
-except Exception:  # pragma: no cover
-    SentenceTransformer = None
+# `sentence_transformers` (torch) and `chromadb` are imported lazily inside the
+# constructors below: importing them costs several seconds, which every CLI
+# invocation would otherwise pay even when it never touches a model.
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-except Exception:  # pragma: no cover
-    chromadb = None
+
+def _import_sentence_transformer():
+    try:
+        from sentence_transformers import SentenceTransformer
+    except Exception:  # pragma: no cover
+        return None
+    return SentenceTransformer
+
+
+def _import_chromadb():
+    try:
+        import chromadb
+    except Exception:  # pragma: no cover
+        return None
+    return chromadb
 
 
 class EmbeddingService:
-    """Wraps a sentence-transformers model to produce embeddings."""
+    """Wraps a sentence-transformers model to produce embeddings.
+
+    `backend` selects full-precision PyTorch, ONNX Runtime, or the int8-quantized
+    ONNX export of the model (see `settings.EMBEDDING_BACKEND`).
+    """
 
-    def __init__(self, model_name: str = settings.EMBEDDING_MODEL):
+    BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL, backend: str = settings.EMBEDDING_BACKEND,
+                 num_threads: int = settings.EMBEDDING_THREADS):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {self.BACKENDS}")
+        SentenceTransformer = _import_sentence_transformer()
         if SentenceTransformer is None:
             raise ImportError(
                 "sentence-transformers is required. Install with `pip install sentence-transformers`"
             )
-        self.model = SentenceTransformer(model_name, device="cpu")
+        self.backend = backend
+        if backend == 'torch':
+            if num_threads:
+                import torch
+                torch.set_num_threads(num_threads)
+            self.model = SentenceTransformer(model_name, device="cpu")
+        else:
+            self.model = SentenceTransformer(
+                model_name, device="cpu", backend="onnx", model_kwargs=self._onnx_model_kwargs(backend, num_threads)
+            )
+
+    @staticmethod
+    def _onnx_model_kwargs(backend: str, num_threads: int) -> Dict:
+        try:
+            import onnxruntime
+        except Exception:  # pragma: no cover
+            raise ImportError(
+                "onnxruntime is required for ONNX backends. Install with `pip install sentence-transformers[onnx]`"
+            )
+        kwargs = {'provider': 'CPUExecutionProvider'}
+        if backend == 'onnx-int8':
+            kwargs['file_name'] = settings.EMBEDDING_ONNX_INT8_FILE
+        if num_threads:
+            opts = onnxruntime.SessionOptions()
+            opts.intra_op_num_threads = num_threads
+            kwargs['session_options'] = opts
+        return kwargs
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Return a list of vector embeddings for the input texts."""
@@ -40,11 +88,16 @@ class EmbeddingService:
     def embed_query(self, text: str) -> List[float]:
         return self.embed_documents([text])[0]
 
+    def warmup(self) -> None:
+        """Run a dummy encode so lazy kernels/allocations happen before the first real query."""
+        self.embed_query("warmup")
+
 
 class VectorStore:
     """A small wrapper around ChromaDB for add/query operations."""
 
     def __init__(self, persist_directory: Optional[str] = None, collection_name: str = settings.COLLECTION_NAME):
+        chromadb = _import_chromadb()
         if chromadb is None:
             raise ImportError("chromadb is required. Install with `pip install chromadb`")
         
@@ -78,7 +131,294 @@ class VectorStore:
             metadatas = [{} for _ in ids]
         self.collection.add(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
 
-    def query(self, query_embedding: List[float], n_results: int = 3):
-        res = self.collection.query(query_embeddings=[query_embedding], n_results=n_results)
+    def query(self, query_embedding: List[float], n_results: int = 3, where: Optional[Dict] = None):
+        kwargs = {'where': where} if where else {}
+        res = self.collection.query(query_embeddings=[query_embedding], n_results=n_results, **kwargs)
         # chroma returns dict with ids, distances, documents, metadatas
         return res
+
+    def query_batch(self, query_embeddings: List[List[float]], n_results: int = 3, where: Optional[Dict] = None):
+        """Query several embeddings in one round-trip; result lists have one entry per query."""
+        kwargs = {'where': where} if where else {}
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, **kwargs)
+
+    def get_documents(self, ids: List[str]):
+        """Fetch documents by id; returns dict with flat `ids`, `documents`, `metadatas` lists."""
+        if not ids:
+            return {'ids': [], 'documents': [], 'metadatas': []}
+        res = self.collection.get(ids=ids, include=['documents', 'metadatas'])
+        return {'ids': res['ids'], 'documents': res['documents'], 'metadatas': res['metadatas']}
+
+    def metadata_values(self, key: str) -> Set[str]:
+        """Distinct non-empty values of metadata field `key` across the collection."""
+        res = self.collection.get(include=['metadatas'])
+        return {m[key] for m in res['metadatas'] or [] if m and m.get(key)}
+
+    def drop(self) -> None:
+        """Delete the whole collection."""
+        self.client.delete_collection(self.collection.name)
+
+
+def _import_hnswlib():
+    try:
+        import hnswlib
+    except Exception:  # pragma: no cover
+        return None
+    return hnswlib
+
+
+def match_where(meta: Dict, where: Dict) -> bool:
+    """Evaluate the Chroma `where` subset we use: equality, `$eq`, `$in` and `$and`."""
+    for key, cond in where.items():
+        if key == '$and':
+            if not all(match_where(meta, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            if '$eq' in cond and meta.get(key) != cond['$eq']:
+                return False
+            if '$in' in cond and meta.get(key) not in cond['$in']:
+                return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+class LocalVectorStore:
+    """In-process vector store over a memory-mapped float32 matrix.
+
+    Vectors are L2-normalized on insert and searched with an exact BLAS dot
+    product; distances are cosine distances (`1 - cos`). When the collection
+    holds at least `hnsw_min_docs` vectors (and `hnswlib` is installed) an HNSW
+    graph is used instead. Everything persists under
+    `<persist_directory>/<collection_name>/`:
+
+        vectors.f32   append-only row-major float32 matrix
+        store.json    dim, ids, documents and metadatas (row order)
+        hnsw.bin      optional HNSW graph
+    """
+
+    def __init__(self, persist_directory: Optional[str] = None, collection_name: str = settings.COLLECTION_NAME,
+                 hnsw_min_docs: int = settings.LOCAL_INDEX_HNSW_MIN_DOCS):
+        self.path = os.path.join(persist_directory or settings.LOCAL_INDEX_DIR, collection_name)
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, 'vectors.f32')
+        self._store_path = os.path.join(self.path, 'store.json')
+        self._hnsw_path = os.path.join(self.path, 'hnsw.bin')
+        self.hnsw_min_docs = hnsw_min_docs
+
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        if os.path.exists(self._store_path):
+            with open(self._store_path, encoding='utf-8') as f:
+                state = json.load(f)
+            self.dim = state['dim']
+            self.ids = state['ids']
+            self.documents = state['documents']
+            self.metadatas = state['metadatas']
+        self._row = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._hnsw = None
+        self._open_matrix()
+
+    def _open_matrix(self):
+        if self.ids:
+            self.matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(len(self.ids), self.dim))
+        else:
+            self.matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._columns.clear()
+
+    def _save_state(self):
+        tmp = self._store_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'ids': self.ids, 'documents': self.documents, 'metadatas': self.metadatas},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self._store_path)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def add_documents(self, ids: List[str], texts: List[str], embeddings: List[List[float]], metadatas: Optional[List[Dict]] = None):
+        """Add or replace documents. All lists must be same length."""
+        if not ids:
+            return
+        if metadatas is None:
+            metadatas = [{} for _ in ids]
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        if self.dim is not None and vecs.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vecs.shape[1]} does not match collection dimension {self.dim}")
+        dim = vecs.shape[1]
+
+        # an id repeated within the batch: the last occurrence wins
+        latest = {}
+        for j, doc_id in enumerate(ids):
+            latest[doc_id] = j
+        new_rows = [j for doc_id, j in latest.items() if doc_id not in self._row]
+        replaced = [(self._row[doc_id], j) for doc_id, j in latest.items() if doc_id in self._row]
+
+        # release the read-only map before touching the file; the id map and
+        # documents only change once the vectors are written
+        self.matrix = None
+        try:
+            if replaced:
+                mm = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(len(self.ids), dim))
+                for row, j in replaced:
+                    mm[row] = vecs[j]
+                mm.flush()
+                del mm
+            if new_rows:
+                with open(self._vectors_path, 'ab') as f:
+                    f.write(vecs[new_rows].tobytes())
+        except BaseException:
+            self._open_matrix()
+            raise
+
+        self.dim = dim
+        for row, j in replaced:
+            self.documents[row] = texts[j]
+            self.metadatas[row] = metadatas[j] or {}
+        for j in new_rows:
+            self._row[ids[j]] = len(self.ids)
+            self.ids.append(ids[j])
+            self.documents.append(texts[j])
+            self.metadatas.append(metadatas[j] or {})
+        self._save_state()
+        self._open_matrix()
+        rows = list(latest.values())
+        self._update_hnsw([self._row[ids[j]] for j in rows], vecs[rows])
+
+    def _update_hnsw(self, rows: List[int], vecs: np.ndarray):
+        if not self.hnsw_min_docs or len(self.ids) < self.hnsw_min_docs:
+            return
+        hnswlib = _import_hnswlib()
+        if hnswlib is None:
+            return
+        index = self._load_hnsw()
+        if index is None:
+            # first time over the threshold: index every row
+            index = hnswlib.Index(space='ip', dim=self.dim)
+            index.init_index(max_elements=len(self.ids) * 2, ef_construction=200, M=16)
+            rows, vecs = list(range(len(self.ids))), np.asarray(self.matrix)
+        elif len(self.ids) > index.get_max_elements():
+            index.resize_index(len(self.ids) * 2)
+        index.add_items(vecs, np.asarray(rows))
+        index.save_index(self._hnsw_path)
+        self._hnsw = index
+
+    def _load_hnsw(self):
+        if self._hnsw is None and os.path.exists(self._hnsw_path):
+            hnswlib = _import_hnswlib()
+            if hnswlib is not None:
+                index = hnswlib.Index(space='ip', dim=self.dim)
+                index.load_index(self._hnsw_path, max_elements=len(self.ids))
+                self._hnsw = index
+        return self._hnsw
+
+    def _column(self, key: str) -> np.ndarray:
+        col = self._columns.get(key)
+        if col is None:
+            col = np.array([m.get(key) for m in self.metadatas], dtype=object)
+            self._columns[key] = col
+        return col
+
+    def _filter_rows(self, where: Dict) -> np.ndarray:
+        """Return matching row indices, using cached metadata columns for plain equality filters."""
+        if all(not k.startswith('$') and not isinstance(v, dict) for k, v in where.items()):
+            mask = np.ones(len(self.ids), dtype=bool)
+            for key, value in where.items():
+                mask &= self._column(key) == value
+            return np.flatnonzero(mask)
+        return np.array([i for i, m in enumerate(self.metadatas) if match_where(m, where)], dtype=np.int64)
+
+    def query(self, query_embedding: List[float], n_results: int = 3, where: Optional[Dict] = None):
+        """Return the nearest documents in Chroma's query result format."""
+        empty = {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        if not self.ids:
+            return empty
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        rows = self._filter_rows(where) if where else None
+        if rows is not None and len(rows) == 0:
+            return empty
+
+        index = self._load_hnsw() if (self.hnsw_min_docs and len(self.ids) >= self.hnsw_min_docs) else None
+        if index is not None:
+            allowed = set(rows.tolist()) if rows is not None else None
+            k = min(n_results, len(allowed) if allowed is not None else len(self.ids))
+            index.set_ef(max(50, k * 2))
+            labels, dists = index.knn_query(q, k=k, filter=(allowed.__contains__ if allowed is not None else None))
+            top, top_dist = labels[0].tolist(), dists[0].tolist()
+        else:
+            candidates = self.matrix if rows is None else self.matrix[rows]
+            scores = candidates @ q
+            k = min(n_results, len(scores))
+            part = np.argpartition(-scores, k - 1)[:k]
+            part = part[np.argsort(-scores[part])]
+            top = part.tolist() if rows is None else rows[part].tolist()
+            top_dist = (1.0 - scores[part]).tolist()
+
+        return {
+            'ids': [[self.ids[i] for i in top]],
+            'documents': [[self.documents[i] for i in top]],
+            'metadatas': [[self.metadatas[i] for i in top]],
+            'distances': [[float(d) for d in top_dist]],
+        }
+
+    def query_batch(self, query_embeddings: List[List[float]], n_results: int = 3, where: Optional[Dict] = None):
+        """Query several embeddings; result lists have one entry per query."""
+        if self.ids and not where and (not self.hnsw_min_docs or len(self.ids) < self.hnsw_min_docs):
+            # exact search for all queries in a single matrix product
+            q = np.asarray(query_embeddings, dtype=np.float32)
+            q /= np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+            scores = q @ np.asarray(self.matrix).T
+            k = min(n_results, scores.shape[1])
+            top = np.argsort(-scores, axis=1)[:, :k]
+            return {
+                'ids': [[self.ids[i] for i in row] for row in top],
+                'documents': [[self.documents[i] for i in row] for row in top],
+                'metadatas': [[self.metadatas[i] for i in row] for row in top],
+                'distances': [[float(1.0 - scores[r, i]) for i in row] for r, row in enumerate(top)],
+            }
+        out = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for emb in query_embeddings:
+            res = self.query(emb, n_results=n_results, where=where)
+            for key in out:
+                out[key].append(res[key][0])
+        return out
+
+    def get_documents(self, ids: List[str]):
+        """Fetch documents by id; returns dict with flat `ids`, `documents`, `metadatas` lists."""
+        rows = [self._row[i] for i in ids if i in self._row]
+        return {
+            'ids': [self.ids[r] for r in rows],
+            'documents': [self.documents[r] for r in rows],
+            'metadatas': [self.metadatas[r] for r in rows],
+        }
+
+    def metadata_values(self, key: str) -> Set[str]:
+        """Distinct non-empty values of metadata field `key` across the collection."""
+        return {m[key] for m in self.metadatas if m.get(key)}
+
+    def drop(self) -> None:
+        """Delete the collection directory."""
+        self._hnsw = None
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def create_vector_store(persist_directory: Optional[str] = None, collection_name: Optional[str] = None):
+    """Build the vector store selected by `settings.VECTOR_BACKEND` ("chroma" or "local").
+
+    Without `collection_name` the live collection named by the index alias is opened.
+    """
+    if collection_name is None:
+        from index_versions import IndexAlias
+        collection_name = IndexAlias().current()['collection']
+    if settings.VECTOR_BACKEND == 'local':
+        return LocalVectorStore(persist_directory=persist_directory, collection_name=collection_name)
+    if settings.VECTOR_BACKEND != 'chroma':
+        raise ValueError(f"Unknown VECTOR_BACKEND {settings.VECTOR_BACKEND!r}, expected 'chroma' or 'local'")
+    return VectorStore(persist_directory=persist_directory, collection_name=collection_name)
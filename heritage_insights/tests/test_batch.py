@@ -0,0 +1,78 @@
+"""Tests for batch question answering with checkpoint/resume, using mocks."""
+import json
+
+from heritage_insights.batch import run_batch
+from heritage_insights.pipeline import RAGPipeline
+
+
+class MockEmbedding:
+    def __init__(self):
+        self.encode_calls = 0
+
+    def embed_documents(self, texts):
+        self.encode_calls += 1
+        return [[float(len(t))] for t in texts]
+
+
+class MockVectorStore:
+    def __init__(self):
+        self.batch_calls = 0
+
+    def query_batch(self, query_embeddings, n_results=3):
+        self.batch_calls += 1
+        n = len(query_embeddings)
+        return {'ids': [['doc1']] * n, 'documents': [['Great Wall text.']] * n,
+                'metadatas': [[{'source': 'doc1.txt'}]] * n, 'distances': [[0.1]] * n}
+
+
+class CountingLLM:
+    def __init__(self, fail_on=None):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail_on and self.fail_on in prompt:
+            return 'Error: Could not connect to Ollama'
+        return 'ANSWER'
+
+
+def _write_questions(path, n):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(json.dumps({'id': f'q{i}', 'q': f'Question number {i}?'}) + '\n')
+
+
+def test_batch_uses_batched_calls_and_resumes(tmp_path):
+    src, dst = tmp_path / 'q.jsonl', tmp_path / 'a.jsonl'
+    _write_questions(src, 5)
+
+    emb, vs = MockEmbedding(), MockVectorStore()
+    llm = CountingLLM(fail_on='number 3')
+    stats = run_batch(RAGPipeline(emb, vs, llm), str(src), str(dst), concurrency=2)
+    assert stats == {'skipped': 0, 'answered': 4, 'failed': 1}
+    assert emb.encode_calls == 1 and vs.batch_calls == 1
+
+    rows = [json.loads(line) for line in dst.read_text().splitlines()]
+    assert {r['id'] for r in rows} == {'q0', 'q1', 'q2', 'q4'}
+    assert rows[0]['sources'] == ['doc1']
+
+    # resume: only the failed question is retried
+    llm2 = CountingLLM()
+    stats = run_batch(RAGPipeline(MockEmbedding(), MockVectorStore(), llm2), str(src), str(dst))
+    assert stats == {'skipped': 4, 'answered': 1, 'failed': 0}
+    assert llm2.calls == 1
+
+
+def test_resume_drops_half_written_line(tmp_path):
+    src, dst = tmp_path / 'q.jsonl', tmp_path / 'a.jsonl'
+    _write_questions(src, 3)
+    good = json.dumps({'id': 'q0', 'q': 'Question number 0?', 'answer': 'ANSWER'})
+    dst.write_text(good + '\n' + '{"id": "q1", "q": "Quest', encoding='utf-8')
+
+    llm = CountingLLM()
+    stats = run_batch(RAGPipeline(MockEmbedding(), MockVectorStore(), llm), str(src), str(dst))
+    assert stats == {'skipped': 1, 'answered': 2, 'failed': 0}
+
+    rows = [json.loads(line) for line in dst.read_text().splitlines()]
+    assert sorted(r['id'] for r in rows) == ['q0', 'q1', 'q2']
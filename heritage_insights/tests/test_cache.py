@@ -0,0 +1,68 @@
+"""Tests for the answer cache and its use in RAGPipeline.answer."""
+import time
+
+from heritage_insights.cache import AnswerCache, normalize_query
+from heritage_insights.pipeline import RAGPipeline
+
+DOCS = [{'id': '1', 'metadata': {'updated_at': '2026-01-01T00:00:00'}}]
+
+
+def test_normalize_query():
+    assert normalize_query('  Where is  the Great Wall?? ') == 'where is the great wall'
+
+
+def test_exact_hit_and_updated_at_miss():
+    cache = AnswerCache(max_entries=10, ttl_seconds=0)
+    cache.put('Where is the Great Wall?', DOCS, 'China')
+    assert cache.get('where is the great wall', DOCS) == 'China'
+    recrawled = [{'id': '1', 'metadata': {'updated_at': '2026-02-01T00:00:00'}}]
+    assert cache.get('where is the great wall', recrawled) is None
+
+
+def test_lru_ttl_and_invalidate():
+    cache = AnswerCache(max_entries=2, ttl_seconds=0)
+    for q in ('a', 'b', 'c'):
+        cache.put(q, DOCS, q.upper())
+    assert cache.get('a', DOCS) is None
+    assert cache.get('c', DOCS) == 'C'
+    cache.invalidate()
+    assert len(cache) == 0
+
+    short = AnswerCache(ttl_seconds=0.01)
+    short.put('a', DOCS, 'A')
+    time.sleep(0.02)
+    assert short.get('a', DOCS) is None
+
+
+def test_near_duplicate_lookup():
+    cache = AnswerCache(similarity_threshold=0.95)
+    cache.put('Where is the Great Wall', DOCS, 'China', query_embedding=[1.0, 0.0])
+    assert cache.get("Where's the Great Wall", DOCS, query_embedding=[0.99, 0.05]) == 'China'
+    assert cache.get('Something else', DOCS, query_embedding=[0.0, 1.0]) is None
+
+
+class MockEmbedding:
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+class MockVectorStore:
+    def query(self, query_embedding, n_results=3):
+        return {'ids': [['1']], 'documents': [['Great Wall']], 'metadatas': [[{'source': '1'}]], 'distances': [[0.1]]}
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return 'ANSWER'
+
+
+def test_pipeline_serves_cached_answer():
+    llm = CountingLLM()
+    pipe = RAGPipeline(MockEmbedding(), MockVectorStore(), llm, answer_cache=AnswerCache())
+    assert pipe.answer('Where is the Great Wall?')['answer'] == 'ANSWER'
+    assert pipe.answer('where is the great wall')['answer'] == 'ANSWER'
+    assert llm.calls == 1
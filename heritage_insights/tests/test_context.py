@@ -0,0 +1,34 @@
+"""Tests for token-budgeted prompt assembly."""
+from heritage_insights.context import ContextAssembler, context_window_for, estimate_tokens
+
+
+def _doc(i, text):
+    return {'id': f'doc{i}', 'text': text, 'metadata': {'source': f'site{i}'}}
+
+
+def test_estimate_tokens_and_model_windows():
+    assert estimate_tokens('abcdefgh') == 2
+    assert estimate_tokens('长城') == 2
+    assert context_window_for('llama3.2:3b') == context_window_for('llama3.2')
+    assert context_window_for('unknown-model') > 0
+
+
+def test_prompt_fits_budget_and_keeps_relevant_sentences():
+    filler = ' '.join(f'Unrelated sentence number {n} about weather.' for n in range(200))
+    docs = [_doc(1, filler + ' The Mogao Caves are in Dunhuang.'), _doc(2, filler)]
+    assembler = ContextAssembler(context_window=300, reserved_tokens=100)
+    prompt, stats = assembler.build('Where are the Mogao Caves?', docs)
+
+    assert stats['prompt_tokens'] <= stats['budget_tokens'] == 200
+    assert 'The Mogao Caves are in Dunhuang.' in prompt
+    assert stats['sentences_dropped'] > 0
+    assert prompt.rstrip().endswith('Answer concisely and cite sources.')
+
+
+def test_overlapping_passages_are_deduplicated():
+    shared = 'The Great Wall stretches across northern China.'
+    docs = [_doc(1, shared + ' Built over centuries.'), _doc(2, shared + ' Visited by millions.')]
+    prompt, stats = ContextAssembler(context_window=4096).build('Great Wall', docs)
+    assert prompt.count(shared) == 1
+    assert stats['duplicates_dropped'] == 1
+    assert stats['docs_used'] == 2
@@ -0,0 +1,98 @@
+"""Round-trip tests for the query daemon over a real Unix socket, using mocks."""
+import os
+import threading
+import time
+
+from heritage_insights.daemon import DaemonError, QueryDaemon, query_daemon, request_daemon
+
+
+class MockEmbedding:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [0.0] * 384
+
+    def warmup(self):
+        self.embed_query('warmup')
+
+
+class MockVectorStore:
+    def query(self, query_embedding, n_results=3):
+        ids = ['doc1', 'doc2', 'doc3'][:n_results]
+        return {'ids': [ids], 'documents': [[f'text of {i}' for i in ids]], 'distances': [[0.1] * len(ids)]}
+
+
+def _start(tmp_path, emb):
+    socket_path = str(tmp_path / 'q.sock')
+    daemon = QueryDaemon(socket_path=socket_path, embedding_service=emb, vector_store=MockVectorStore())
+    t = threading.Thread(target=daemon.serve_forever, daemon=True)
+    t.start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+    return daemon, socket_path
+
+
+def test_query_round_trip(tmp_path):
+    emb = MockEmbedding()
+    daemon, socket_path = _start(tmp_path, emb)
+    try:
+        assert request_daemon({'op': 'ping'}, socket_path=socket_path) == {'ok': True}
+        res = query_daemon('Great Wall', k=2, socket_path=socket_path)
+        assert res['ids'] == [['doc1', 'doc2']]
+        assert emb.calls == 1
+    finally:
+        daemon.shutdown()
+
+
+def test_warmup_runs_dummy_encode(tmp_path):
+    emb = MockEmbedding()
+    daemon = QueryDaemon(socket_path=str(tmp_path / 'q.sock'), embedding_service=emb, vector_store=MockVectorStore())
+    daemon.warmup()
+    assert emb.calls == 1
+
+
+def test_missing_daemon_raises_oserror(tmp_path):
+    try:
+        query_daemon('x', socket_path=str(tmp_path / 'none.sock'))
+    except OSError:
+        pass
+    else:
+        raise AssertionError('expected OSError')
+
+
+def test_daemon_error_raises_daemon_error(tmp_path):
+    daemon, socket_path = _start(tmp_path, MockEmbedding())
+    try:
+        request_daemon({'op': 'nope'}, socket_path=socket_path)
+    except DaemonError as e:
+        assert 'unknown op' in str(e)
+    else:
+        raise AssertionError('expected DaemonError')
+    finally:
+        daemon.shutdown()
+
+
+def test_cli_query_falls_back_on_daemon_error(tmp_path, monkeypatch, capsys):
+    import argparse
+    from heritage_insights import cli, daemon as daemon_module
+
+    def broken(*args, **kwargs):
+        raise DaemonError('boom')
+
+    class Store:
+        def query(self, q_emb, n_results=3, where=None):
+            return {'ids': [['local']]}
+
+    monkeypatch.setattr(daemon_module, 'query_daemon', broken)
+    monkeypatch.setattr(cli, 'EmbeddingService', MockEmbedding)
+    monkeypatch.setattr(cli, 'create_vector_store', Store)
+    args = argparse.Namespace(q='x', k=1, socket=str(tmp_path / 'q.sock'), no_daemon=False,
+                              country=None, category=None, language=None)
+    cli.cmd_query(args)
+    out = capsys.readouterr()
+    assert 'local' in out.out
+    assert 'Daemon error (boom)' in out.err
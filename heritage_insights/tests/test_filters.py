@@ -0,0 +1,86 @@
+"""Tests for metadata filter construction/extraction and filtered retrieval."""
+from heritage_insights.db_index import index_sites
+from heritage_insights.filters import FilterExtractor, build_where, detect_language, with_language
+from heritage_insights.llm import MockLLM
+from heritage_insights.pipeline import RAGPipeline
+from heritage_insights.services import LocalVectorStore
+
+
+class FixedEmbedding:
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0, 0.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def _store(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    store.add_documents(
+        ids=['wall', 'lake', 'lamu', 'machu'],
+        texts=['Great Wall', 'Kenya Lake System', 'Lamu Old Town', 'Machu Picchu'],
+        embeddings=[[1.0, 0, 0, 0], [0.8, 0.2, 0, 0], [0.7, 0.3, 0, 0], [0.9, 0.1, 0, 0]],
+        metadatas=[
+            {'country': 'China', 'category': 'Cultural', 'language': 'multi'},
+            {'country': 'Kenya', 'category': 'Natural', 'language': 'en'},
+            {'country': 'Kenya', 'category': 'Cultural', 'language': 'zh'},
+            {'country': 'Peru', 'category': 'Mixed', 'language': 'en'},
+        ],
+    )
+    return store
+
+
+def test_build_where():
+    assert build_where() is None
+    assert build_where(country='Kenya') == {'country': 'Kenya'}
+    assert build_where(country='Kenya', language='zh') == {
+        '$and': [{'country': 'Kenya'}, {'language': {'$in': ['zh', 'multi']}}]}
+
+
+def test_extractor_matches_whole_country_names():
+    ex = FilterExtractor(['Kenya', 'United States of America', 'India'])
+    assert ex.extract('Natural heritage sites in Kenya') == {'country': 'Kenya', 'category': 'Natural'}
+    assert ex.extract('parks in the United States of America') == {'country': 'United States of America'}
+    # "Indiana" is not "India"
+    assert ex.extract('sites near Indiana') == {}
+    assert ex.extract('肯尼亚的自然遗产') == {'category': 'Natural'}
+
+
+def test_pipeline_filters_explicitly_and_from_question(tmp_path):
+    store = _store(tmp_path)
+    pipe = RAGPipeline(FixedEmbedding(), store, MockLLM(), filter_extractor=FilterExtractor.from_vector_store(store))
+
+    docs = pipe.retrieve('natural sites in Kenya', k=3)
+    assert [d['id'] for d in docs] == ['lake']
+
+    docs = pipe.retrieve('anything', k=3, where=build_where(language='zh'))
+    assert [d['id'] for d in docs] == ['wall', 'lamu']
+
+    # an extracted filter that matches nothing falls back to an unfiltered search
+    docs = pipe.retrieve('mixed sites in China', k=2)
+    assert [d['id'] for d in docs] == ['wall', 'machu']
+
+
+def test_detect_language_and_with_language():
+    assert detect_language('Where is the Great Wall?') == 'en'
+    assert detect_language('长城在哪里？') == 'zh'
+    assert detect_language('Machu Picchu在哪里') == 'zh'
+    assert with_language(None, 'zh') == {'language': {'$in': ['zh', 'multi']}}
+    assert with_language({'country': 'Peru'}, 'en') == {
+        '$and': [{'country': 'Peru'}, {'language': {'$in': ['en', 'multi']}}]}
+    explicit = build_where(language='en')
+    assert with_language(explicit, 'zh') == explicit
+
+
+def test_per_language_index_routes_queries_by_language(tmp_path):
+    site = {'id': '7', 'name': 'Mogao Caves', 'country': 'China', 'category': 'Cultural',
+            'description_en': 'Buddhist cave temples.', 'description_zh': '莫高窟是佛教石窟。',
+            'content': '', 'metadata': {}, 'updated_at': ''}
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    index_sites([site], FixedEmbedding(), store, per_language=True)
+    assert sorted(store.ids) == ['7:en', '7:zh']
+
+    pipe = RAGPipeline(FixedEmbedding(), store, MockLLM(), language_routing=True)
+    assert [d['id'] for d in pipe.retrieve('莫高窟在哪里？', k=2)] == ['7:zh']
+    en, zh = pipe.retrieve_batch(['Mogao Caves', '莫高窟'], k=2)
+    assert [d['id'] for d in en] == ['7:en'] and [d['id'] for d in zh] == ['7:zh']
@@ -0,0 +1,56 @@
+"""Tests for versioned index builds and the alias swap, on the local vector store."""
+import pytest
+
+from heritage_insights import index_versions
+from heritage_insights.index_versions import BuildStatus, IndexAlias, build_index_version
+from heritage_insights.services import create_vector_store
+
+
+class MockEmbedding:
+    def embed_documents(self, texts):
+        return [[1.0, float(len(t) % 7), 0.0] for t in texts]
+
+
+def _sites(n):
+    return [{'id': str(i), 'name': f'Site {i}', 'country': 'Peru', 'category': 'Cultural',
+             'description_en': f'Description {i}', 'description_zh': '', 'content': '', 'metadata': {},
+             'updated_at': ''} for i in range(n)]
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions.settings, 'VECTOR_BACKEND', 'local')
+    monkeypatch.setattr(index_versions.settings, 'LOCAL_INDEX_DIR', str(tmp_path / 'index'))
+    alias = IndexAlias(path=str(tmp_path / 'alias.json'), base_name='kb', lexical_path=str(tmp_path / 'lex.json'))
+    return alias, BuildStatus(path=str(tmp_path / 'status.json'))
+
+
+def test_builds_swap_alias_and_gc_old_versions(local_backend, tmp_path):
+    alias, status = local_backend
+    assert alias.current()['collection'] == 'kb'
+
+    for n in (3, 4, 5):
+        live = build_index_version(alias=alias, status=status, sites=_sites(n), embedding_service=MockEmbedding(),
+                                   batch_size=2, keep=2)
+        assert create_vector_store(collection_name=live['collection']).count() == n
+
+    assert live['version'] == 3 and live['collection'] == 'kb_v3'
+    assert [v['version'] for v in live['versions']] == [2, 3]
+    assert not (tmp_path / 'index' / 'kb_v1').exists()
+    assert (tmp_path / 'index' / 'kb_v2').exists()
+    assert status.read()['state'] == 'completed' and status.read()['done'] == 5
+
+
+def test_failed_build_leaves_alias_unchanged(local_backend, tmp_path):
+    alias, status = local_backend
+    build_index_version(alias=alias, status=status, sites=_sites(2), embedding_service=MockEmbedding())
+
+    class Broken:
+        def embed_documents(self, texts):
+            raise RuntimeError('model crashed')
+
+    with pytest.raises(RuntimeError):
+        build_index_version(alias=alias, status=status, sites=_sites(2), embedding_service=Broken())
+    assert alias.current()['version'] == 1
+    assert status.read()['state'] == 'failed'
+    assert not (tmp_path / 'index' / 'kb_v2').exists()
@@ -0,0 +1,71 @@
+"""Tests for the BM25 lexical index and hybrid retrieval in RAGPipeline."""
+from heritage_insights.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+from heritage_insights.pipeline import RAGPipeline
+
+
+def test_tokenize_latin_and_cjk():
+    assert tokenize('What is the Mogao Caves?') == ['mogao', 'caves']
+    assert tokenize('Teotihuacán') == ['teotihuacan']
+    assert tokenize('莫高窟') == ['莫', '高', '窟', '莫高', '高窟']
+
+
+def _index(path=None):
+    idx = LexicalIndex(path=path)
+    idx.add_documents(['1', '2', '3'], [
+        {'name': 'Mogao Caves', 'country': 'China', 'description_zh': '莫高窟位于敦煌'},
+        {'name': 'Machu Picchu', 'country': 'Peru', 'description_en': 'Inca citadel'},
+        {'name': 'Great Wall', 'country': 'China', 'description_en': 'Defensive wall near the caves of Mogao? no'},
+    ])
+    return idx
+
+
+def test_bm25_prefers_name_match_and_persists(tmp_path):
+    path = str(tmp_path / 'lex.json')
+    idx = _index(path)
+    assert idx.search('Mogao Caves')[0][0] == '1'
+    assert idx.search('莫高窟')[0][0] == '1'
+    idx.save()
+
+    reopened = LexicalIndex(path=path)
+    assert len(reopened) == 3
+    assert reopened.search('Peru')[0][0] == '2'
+
+    reopened.add_documents(['2'], [{'name': 'Machu Picchu', 'country': 'Chile'}])
+    assert reopened.search('Peru') == []
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['c', 'a']], k=60)
+    assert [doc_id for doc_id, _ in fused] == ['a', 'c', 'b']
+
+
+class MockEmbedding:
+    def embed_query(self, text):
+        return [0.0] * 384
+
+
+class MockVectorStore:
+    """Vector search that misses the exact-name match entirely."""
+    texts = {'1': 'Mogao Caves text', '2': 'Machu Picchu text', '3': 'Great Wall text'}
+
+    def query(self, query_embedding, n_results=3):
+        ids = ['3', '2'][:n_results]
+        return {'ids': [ids], 'documents': [[self.texts[i] for i in ids]],
+                'metadatas': [[{'source': i} for i in ids]], 'distances': [[0.1, 0.2][:len(ids)]]}
+
+    def get_documents(self, ids):
+        return {'ids': ids, 'documents': [self.texts[i] for i in ids], 'metadatas': [{'source': i} for i in ids]}
+
+
+class MockLLM:
+    def generate(self, prompt, **kwargs):
+        return 'MOCK'
+
+
+def test_hybrid_retrieve_recovers_lexical_hit():
+    pipe = RAGPipeline(MockEmbedding(), MockVectorStore(), MockLLM(), lexical_index=_index())
+    docs = pipe.retrieve('Mogao Caves', k=2)
+    # '3' ranks high in both lists; '1' is only found lexically
+    assert [d['id'] for d in docs] == ['3', '1']
+    assert docs[1]['text'] == 'Mogao Caves text'
+    assert docs[1]['distance'] is None
@@ -0,0 +1,121 @@
+"""Tests for the pooled Ollama clients, using fake transports (no network)."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from heritage_insights.llm import AsyncOllamaLLM, LLMError, OllamaLLM, _ConcurrencyLimiter
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self._body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+def test_generate_sends_keep_alive_and_timeout(monkeypatch):
+    llm = OllamaLLM(model='m', base_url='http://fake-ollama-1', keep_alive='10m')
+    seen = {}
+
+    def fake_post(url, json=None, timeout=None, **kwargs):
+        seen.update(url=url, payload=json, timeout=timeout)
+        return FakeResponse({'response': 'hi'})
+
+    monkeypatch.setattr(llm.session, 'post', fake_post)
+    assert llm.generate('hello') == 'hi'
+    assert seen['payload']['keep_alive'] == '10m'
+    assert seen['timeout'] == llm.timeout
+    assert llm.stats()['in_flight'] == 0
+
+
+def test_limiter_bounds_concurrency_and_reports_queue():
+    limiter = _ConcurrencyLimiter(1)
+    release = threading.Event()
+    entered = threading.Event()
+
+    def hold():
+        with limiter.slot():
+            entered.set()
+            release.wait()
+
+    t = threading.Thread(target=hold)
+    t.start()
+    entered.wait()
+    def wait_turn():
+        with limiter.slot():
+            pass
+
+    waiter = threading.Thread(target=wait_turn)
+    waiter.start()
+    for _ in range(100):
+        if limiter.stats()['queued'] == 1:
+            break
+        threading.Event().wait(0.01)
+    assert limiter.stats()['in_flight'] == 1
+    assert limiter.stats()['queued'] == 1
+
+    with pytest.raises(TimeoutError):
+        with limiter.slot(timeout=0.01):
+            pass
+    release.set()
+    t.join()
+    waiter.join()
+    assert limiter.stats()['max_queued'] == 2
+
+
+def test_async_stream_generate():
+    httpx = pytest.importorskip('httpx')
+
+    def handler(request):
+        lines = [json.dumps({'response': tok, 'done': tok == 'b'}) for tok in ('a', 'b')]
+        return httpx.Response(200, text='\n'.join(lines))
+
+    async def run():
+        llm = AsyncOllamaLLM(model='m', base_url='http://fake-ollama-2', max_concurrency=1)
+        llm.client = httpx.AsyncClient(base_url='http://fake-ollama-2', transport=httpx.MockTransport(handler))
+        tokens = [tok async for tok in llm.astream_generate('hi')]
+        await llm.aclose()
+        return tokens, llm.stats()
+
+    tokens, stats = asyncio.run(run())
+    assert tokens == ['a', 'b']
+    assert stats['in_flight'] == 0
+
+
+def test_async_generate_from_sync_twice():
+    httpx = pytest.importorskip('httpx')
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={'response': 'ok'}))
+    real_client = httpx.AsyncClient
+    llm = AsyncOllamaLLM(model='m', base_url='http://fake-ollama-3', max_concurrency=1)
+    llm._httpx = type('httpx', (), {
+        'AsyncClient': lambda **kwargs: real_client(transport=transport, **kwargs),
+        'Timeout': httpx.Timeout, 'Limits': httpx.Limits,
+    })
+    # each call runs on a new event loop and must not reuse the previous loop's client
+    assert llm.generate('a') == 'ok'
+    assert llm.generate('b') == 'ok'
+
+
+def test_async_stream_cut_off_raises():
+    httpx = pytest.importorskip('httpx')
+
+    def handler(request):
+        return httpx.Response(200, text=json.dumps({'response': 'a', 'done': False}))
+
+    async def run():
+        llm = AsyncOllamaLLM(model='m', base_url='http://fake-ollama-4', max_concurrency=1)
+        llm.client = httpx.AsyncClient(base_url='http://fake-ollama-4', transport=httpx.MockTransport(handler))
+        tokens = []
+        with pytest.raises(LLMError):
+            async for tok in llm.astream_generate('hi'):
+                tokens.append(tok)
+        await llm.aclose()
+        return tokens
+
+    assert asyncio.run(run()) == ['a']
@@ -0,0 +1,88 @@
+"""Tests for the in-process LocalVectorStore backend."""
+import numpy as np
+import pytest
+
+from heritage_insights.services import LocalVectorStore
+
+
+def _vec(*xs):
+    return list(xs) + [0.0] * (4 - len(xs))
+
+
+def _populate(store):
+    store.add_documents(
+        ids=['wall', 'mogao', 'machu'],
+        texts=['Great Wall', 'Mogao Caves', 'Machu Picchu'],
+        embeddings=[_vec(1.0), _vec(0.9, 0.1), _vec(0.0, 1.0)],
+        metadatas=[{'country': 'China'}, {'country': 'China'}, {'country': 'Peru'}],
+    )
+
+
+def test_exact_query_orders_by_cosine(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    _populate(store)
+    res = store.query(_vec(1.0), n_results=2)
+    assert res['ids'] == [['wall', 'mogao']]
+    assert res['distances'][0][0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_where_prefilter(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    _populate(store)
+    assert store.query(_vec(1.0), n_results=3, where={'country': 'Peru'})['ids'] == [['machu']]
+    res = store.query(_vec(1.0), n_results=3, where={'country': {'$in': ['Peru', 'China']}})
+    assert len(res['ids'][0]) == 3
+    assert store.query(_vec(1.0), where={'country': 'Kenya'})['ids'] == [[]]
+
+
+def test_persists_and_replaces(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    _populate(store)
+    store.add_documents(ids=['machu'], texts=['Machu Picchu v2'], embeddings=[_vec(1.0)], metadatas=[{'country': 'Peru'}])
+
+    reopened = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    assert reopened.count() == 3
+    res = reopened.query(_vec(1.0), n_results=1, where={'country': 'Peru'})
+    assert res['documents'] == [['Machu Picchu v2']]
+    assert res['distances'][0][0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_duplicate_ids_in_batch_last_wins(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    _populate(store)
+    store.add_documents(ids=['nazca', 'wall', 'nazca', 'wall'],
+                        texts=['Nazca v1', 'Great Wall v1', 'Nazca v2', 'Great Wall v2'],
+                        embeddings=[_vec(1.0), _vec(1.0), _vec(0.0, 0.0, 1.0), _vec(0.0, 0.0, 0.0, 1.0)])
+    assert store.count() == 4
+    assert store.query(_vec(0.0, 0.0, 1.0), n_results=1)['documents'] == [['Nazca v2']]
+    assert store.query(_vec(0.0, 0.0, 0.0, 1.0), n_results=1)['documents'] == [['Great Wall v2']]
+
+    reopened = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    assert reopened.count() == 4
+    assert reopened.query(_vec(0.0, 0.0, 1.0), n_results=1)['ids'] == [['nazca']]
+
+
+def test_dimension_mismatch_leaves_store_usable(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), collection_name='c')
+    _populate(store)
+    with pytest.raises(ValueError):
+        store.add_documents(ids=['x'], texts=['x'], embeddings=[[1.0, 0.0]])
+    assert store.count() == 3
+    assert store.query(_vec(1.0), n_results=1)['ids'] == [['wall']]
+
+
+def test_hnsw_matches_exact(tmp_path):
+    pytest.importorskip('hnswlib')
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(200, 16)).astype(np.float32)
+    ids = [str(i) for i in range(200)]
+    metas = [{'country': 'A' if i % 2 else 'B'} for i in range(200)]
+
+    exact = LocalVectorStore(persist_directory=str(tmp_path / 'e'), collection_name='c', hnsw_min_docs=0)
+    ann = LocalVectorStore(persist_directory=str(tmp_path / 'a'), collection_name='c', hnsw_min_docs=50)
+    for store in (exact, ann):
+        store.add_documents(ids=ids, texts=ids, embeddings=vecs.tolist(), metadatas=metas)
+
+    q = vecs[3].tolist()
+    assert ann.query(q, n_results=1)['ids'] == exact.query(q, n_results=1)['ids'] == [['3']]
+    assert all(int(i) % 2 == 0 for i in ann.query(q, n_results=5, where={'country': 'B'})['ids'][0])
@@ -55,3 +55,54 @@ def test_pipeline_answer_returns_answer_and_docs():
     assert 'docs' in out
     assert len(out['docs']) == 2
     assert out['answer'].startswith('MOCK_RESPONSE')
+
+
+def test_stream_answer_yields_retrieval_then_tokens():
+    from heritage_insights.llm import MockLLM as StreamingMockLLM
+
+    pipe = RAGPipeline(MockEmbedding(), MockVectorStore(), StreamingMockLLM())
+    events = list(pipe.stream_answer('What is the Great Wall?', k=2))
+
+    assert events[0]['type'] == 'retrieval'
+    assert [d['distance'] for d in events[0]['docs']] == [0.1, 0.2]
+    tokens = [e['text'] for e in events if e['type'] == 'token']
+    assert len(tokens) > 1
+    done = events[-1]
+    assert done['type'] == 'done'
+    assert done['answer'] == ''.join(tokens)
+    assert done['answer'].startswith('MOCK_ANSWER based on: doc1.txt, doc2.txt')
+    assert done['timings']['ttft_ms'] <= done['timings']['total_ms']
+
+
+def test_base_llm_stream_falls_back_to_generate():
+    pipe = RAGPipeline(MockEmbedding(), MockVectorStore(), MockLLM())
+    tokens = [e['text'] for e in pipe.stream_answer('Great Wall', k=1) if e['type'] == 'token']
+    # this MockLLM has no stream_generate; the pipeline falls back to one generate() chunk
+    assert tokens and tokens[0].startswith('MOCK_RESPONSE')
+
+
+def test_failed_stream_is_reported_and_not_cached():
+    from heritage_insights import pipeline as pipeline_module
+
+    class CutOffLLM:
+        def stream_generate(self, prompt, **kwargs):
+            yield 'The Great Wall is'
+            raise pipeline_module.LLMError('Error calling Ollama: connection reset')
+
+    class Cache:
+        def __init__(self):
+            self.stored = []
+
+        def get(self, query, docs, query_embedding=None):
+            return None
+
+        def put(self, query, docs, answer, query_embedding=None):
+            self.stored.append(answer)
+
+    cache = Cache()
+    pipe = RAGPipeline(MockEmbedding(), MockVectorStore(), CutOffLLM(), answer_cache=cache)
+    events = list(pipe.stream_answer('Great Wall', k=1))
+    assert [e['type'] for e in events] == ['retrieval', 'token', 'error', 'done']
+    assert events[-1]['error'] == 'Error calling Ollama: connection reset'
+    assert events[-1]['answer'] == 'The Great Wall is'
+    assert cache.stored == []
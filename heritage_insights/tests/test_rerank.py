@@ -0,0 +1,53 @@
+"""Tests for the cross-encoder rerank stage, with a fake scorer instead of a model."""
+import time
+
+from heritage_insights.llm import MockLLM
+from heritage_insights.pipeline import RAGPipeline
+from heritage_insights.rerank import CrossEncoderReranker
+
+
+class MockEmbedding:
+    def embed_query(self, text):
+        return [0.0] * 4
+
+
+class MockVectorStore:
+    def __init__(self, n=6):
+        self.ids = [f'doc{i}' for i in range(n)]
+        self.requested = None
+
+    def query(self, query_embedding, n_results=3):
+        self.requested = n_results
+        ids = self.ids[:n_results]
+        return {'ids': [ids], 'documents': [[f'text {i}' for i in ids]],
+                'metadatas': [[{'source': i} for i in ids]], 'distances': [[0.1] * len(ids)]}
+
+
+def _reverse_scorer(pairs):
+    # later docs score higher, so reranking reverses the vector order
+    return [float(text.split('doc')[1]) for _, text in pairs]
+
+
+def test_rerank_picks_top_k_from_wide_candidate_set():
+    vs = MockVectorStore()
+    pipe = RAGPipeline(MockEmbedding(), vs, MockLLM(), reranker=CrossEncoderReranker(scorer=_reverse_scorer, batch_size=2))
+    out = pipe.answer('q', k=2, return_docs=True)
+    assert vs.requested >= 6
+    assert [d['id'] for d in out['docs']] == ['doc5', 'doc4']
+    timings = out['timings']
+    assert {'embed_ms', 'search_ms', 'rerank_ms', 'generate_ms', 'total_ms'} <= set(timings)
+    assert timings['rerank_timed_out'] is False
+
+
+def test_rerank_over_budget_keeps_vector_order():
+    def slow_scorer(pairs):
+        time.sleep(0.2)
+        return _reverse_scorer(pairs)
+
+    reranker = CrossEncoderReranker(scorer=slow_scorer, budget_ms=20, batch_size=2)
+    docs = [{'id': f'doc{i}', 'text': f'text doc{i}'} for i in range(6)]
+    start = time.perf_counter()
+    top, stats = reranker.rerank('q', docs, k=2)
+    assert time.perf_counter() - start < 0.15
+    assert [d['id'] for d in top] == ['doc0', 'doc1']
+    assert stats['rerank_timed_out'] is True
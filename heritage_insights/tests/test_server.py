@@ -0,0 +1,183 @@
+"""Tests for the ASGI query service, driven in-process with the existing mocks."""
+import asyncio
+import json
+
+from heritage_insights.llm import MockLLM
+from heritage_insights.pipeline import RAGPipeline
+from heritage_insights.server import QueryService
+
+
+class BatchCountingEmbedding:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def embed_documents(self, texts):
+        self.batch_sizes.append(len(texts))
+        return [[0.0] * 384 for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class MockVectorStore:
+    def query(self, query_embedding, n_results=3):
+        ids = ['doc1', 'doc2'][:n_results]
+        return {'ids': [ids], 'documents': [[f'{i} is about the Great Wall.' for i in ids]],
+                'metadatas': [[{'source': f'{i}.txt'} for i in ids]], 'distances': [[0.1, 0.2][:n_results]]}
+
+
+async def _call(app, method, path, query=b'', body=b''):
+    sent = []
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': []}
+    await app(scope, receive, send)
+    status = sent[0]['status']
+    payload = b''.join(m.get('body', b'') for m in sent[1:])
+    return status, payload
+
+
+def _service():
+    emb = BatchCountingEmbedding()
+    return QueryService(RAGPipeline(emb, MockVectorStore(), MockLLM())), emb
+
+
+def test_concurrent_searches_share_one_encode():
+    app, emb = _service()
+
+    async def run():
+        return await asyncio.gather(*[_call(app, 'GET', '/search', f'q=wall{i}&k=2'.encode()) for i in range(5)])
+
+    results = asyncio.run(run())
+    assert all(status == 200 for status, _ in results)
+    assert len(json.loads(results[0][1])['docs']) == 2
+    assert sum(emb.batch_sizes) == 5
+    assert len(emb.batch_sizes) < 5
+
+
+def test_answer_streams_sse_events():
+    app, _ = _service()
+    status, payload = asyncio.run(_call(app, 'POST', '/answer', body=json.dumps({'q': 'Great Wall', 'k': 1}).encode()))
+    assert status == 200
+    events = [line[len('event: '):] for line in payload.decode().splitlines() if line.startswith('event: ')]
+    assert events[0] == 'retrieval'
+    assert 'token' in events
+    assert events[-1] == 'done'
+
+
+def test_bad_requests():
+    app, _ = _service()
+    assert asyncio.run(_call(app, 'GET', '/search'))[0] == 400
+    assert asyncio.run(_call(app, 'GET', '/nope', b'q=x'))[0] == 404
+
+
+def _switching_service(tmp_path, monkeypatch, check_seconds):
+    import threading
+    import lexical
+    import services
+    from heritage_insights.index_versions import IndexAlias
+
+    loads = []
+
+    def fake_store(collection_name):
+        loads.append((collection_name, threading.current_thread() is threading.main_thread()))
+        return MockVectorStore()
+
+    monkeypatch.setattr(services, 'create_vector_store', fake_store)
+    monkeypatch.setattr(lexical, 'LexicalIndex', lambda path: ('lexical', path))
+    alias = IndexAlias(path=str(tmp_path / 'alias.json'), base_name='kb', lexical_path=str(tmp_path / 'lex.json'))
+    app = QueryService(RAGPipeline(BatchCountingEmbedding(), MockVectorStore(), MockLLM()),
+                       index_alias=alias, index_check_seconds=check_seconds)
+    return app, alias, loads
+
+
+def test_swapped_index_is_loaded_off_the_loop_and_published_whole(tmp_path, monkeypatch):
+    app, alias, loads = _switching_service(tmp_path, monkeypatch, check_seconds=0)
+    old = app.pipeline
+    old_store = old.vector_store
+
+    async def run():
+        alias.swap(alias.entry_for(1))
+        status, _ = await _call(app, 'GET', '/health')
+        assert status == 200
+        await app._index_switch
+        # unchanged mtime: nothing reloaded
+        await _call(app, 'GET', '/health')
+        assert app._index_switch.done()
+
+    asyncio.run(run())
+    assert loads == [('kb_v1', False)]
+    assert app.index_version == 1
+    assert app.pipeline is not old and old.vector_store is old_store
+    assert app.pipeline.lexical_index == ('lexical', alias.entry_for(1)['lexical_path'])
+
+
+def test_alias_is_checked_at_most_every_interval(tmp_path, monkeypatch):
+    app, alias, loads = _switching_service(tmp_path, monkeypatch, check_seconds=60)
+
+    async def run():
+        alias.swap(alias.entry_for(1))
+        await _call(app, 'GET', '/health')
+
+    asyncio.run(run())
+    assert app._index_switch is None and loads == []
+    assert app.index_version == 0
+
+
+class SlotLLM:
+    """Streams a few tokens and records whether the stream (and its slot) was released"""
+
+    def __init__(self):
+        self.released = False
+
+    def generate(self, prompt, **kwargs):
+        return 'a b c'
+
+    def stream_generate(self, prompt, **kwargs):
+        try:
+            for token in ('a', ' b', ' c'):
+                yield token
+        finally:
+            self.released = True
+
+
+def test_disconnected_client_releases_the_llm_stream():
+    llm = SlotLLM()
+    app = QueryService(RAGPipeline(BatchCountingEmbedding(), MockVectorStore(), llm))
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if len(sent) == 2:
+            raise OSError('client went away')
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/answer', 'query_string': b'q=wall&k=1', 'headers': []}
+    try:
+        asyncio.run(app(scope, receive, send))
+    except OSError:
+        # checked while the traceback still keeps the generator alive: closed, not garbage-collected
+        assert llm.released
+    else:
+        raise AssertionError('the send failure should propagate')
+
+
+def test_pipeline_failure_ends_the_stream_with_an_error_event():
+    class FailingStore(MockVectorStore):
+        def query(self, query_embedding, n_results=3):
+            raise RuntimeError('vector store down')
+
+    app = QueryService(RAGPipeline(BatchCountingEmbedding(), FailingStore(), MockLLM()))
+    status, payload = asyncio.run(_call(app, 'GET', '/answer', b'q=wall'))
+    assert status == 200
+    lines = payload.decode().splitlines()
+    assert lines[0] == 'event: error'
+    assert 'vector store down' in json.loads(lines[1][len('data: '):])['message']
@@ -1,12 +1,15 @@
 from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime, Index
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 import datetime
 
 Base = declarative_base()
 
 class HeritageSiteModel(Base):
+    # keep in step with heritage_display/sites/migrations/_site_table.py, which creates
+    # the same table when Django's migrate runs before the first crawl
     __tablename__ = 'heritage_site'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -19,10 +22,14 @@ class HeritageSiteModel(Base):
     metadata_ = Column("metadata", JSONB) # metadata is reserved in some contexts, mapping it explicitly
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # filled by the heritage_site trigger from heritage_display migration 0003; never written here
+    search_vector = deferred(Column(TSVECTOR))
 
     __table_args__ = (
         Index('idx_heritage_country', 'country'),
         Index('idx_heritage_category', 'category'),
+        # keyset pagination order of the Django site list
+        Index('heritage_site_updated_id_idx', updated_at.desc(), id.desc()),
     )
 
     def __repr__(self):
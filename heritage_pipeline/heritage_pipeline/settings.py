@@ -71,6 +71,8 @@ ITEM_PIPELINES = {
    "heritage_pipeline.pipelines.CleanPipeline": 100,
    "heritage_pipeline.pipelines.TaskStatusPipeline": 200,
    "heritage_pipeline.pipelines.PostgresPipeline": 300,
+   "heritage_pipeline.pipelines.FacetRefreshPipeline": 350,
+   "heritage_pipeline.pipelines.ReindexTriggerPipeline": 400,
 }
 
 # Scrapy-Playwright Settings
@@ -149,3 +151,27 @@ REDIS_URL = 'redis://localhost:6379'
 # Or use REDIS_HOST and REDIS_PORT
 # REDIS_HOST = 'localhost'
 # REDIS_PORT = 6379
+
+# Write counters PostgresPipeline increments so heritage_display drops cached
+# pages (must match SITE_VERSION_KEY / SITE_VERSION_KEY_PREFIX there)
+SITE_VERSION_KEY = 'heritage:sites:version'
+SITE_VERSION_KEY_PREFIX = 'heritage:site:version:'
+# Site count (incremented on insert once seeded) and latest-write watermark
+# behind heritage_display's incremental list API
+SITE_COUNT_KEY = 'heritage:sites:count'
+SITE_WATERMARK_KEY = 'heritage:sites:watermark'
+
+# Redis pub/sub channel for task progress and site change events, streamed to
+# browsers by heritage_display's /events/ (must match CRAWL_EVENTS_CHANNEL there)
+CRAWL_EVENTS_CHANNEL = 'heritage:crawl_events'
+
+# Materialized view behind heritage_display's sidebar facet counts, refreshed by
+# FacetRefreshPipeline when a task completes; FACETS_VERSION_KEY must match there
+FACETS_VIEW = 'heritage_site_facets'
+FACETS_VERSION_KEY = 'heritage:facets:version'
+
+# Queue a heritage_insights index rebuild (Redis list read by `cli.py index-worker`)
+# when a crawl task of one of these types completes
+REINDEX_ON_CRAWL_COMPLETE = True
+REINDEX_QUEUE = 'heritage_insights:reindex'
+REINDEX_TASK_TYPES = ['full']